@@ -20,19 +20,28 @@ def sidebar_active(request):
             'export_excel_anggota',
             'export_pdf_anggota',
             'import_excel_anggota',
+            'status_import_anggota',
         ],
 
         # Menu Simpanan
         'menu_simpanan_urls': [
             'daftar_simpanan',
             'simpanan_form',
+            'upload_setoran',
             'simpanan_anggota',
+            'detail_simpanan',
+            'export_daftar_simpanan',
+            'export_history',
         ],
 
         # Menu Pinjaman
         'menu_pinjaman_urls': [
             'pinjaman_list',
             'pinjaman_form',
+            'export_pinjaman',
+            'tagihan_bulanan',
+            'posting_angsuran',
+            'bayar_angsuran',
         ],
 
         # Tambahkan menu lain jika ada
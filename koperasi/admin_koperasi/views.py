@@ -3,10 +3,12 @@ from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
+from koperasi.query_budget import query_budget
 
 User = get_user_model()
 
 
+@query_budget(get=6, post=11)
 def admin_login(request):
     if request.method == 'POST':
         username = request.POST.get('username')
@@ -34,18 +36,20 @@ def admin_login(request):
 
     return render(request, 'admin_koperasi/login.html')
 
+@query_budget(4)
 @login_required
 def admin_dashboard(request):
     if request.user.role != 'admin':
-        return redirect('admin_login')
+        return redirect('admin_koperasi:admin_login')
 
     return render(request, 'admin_koperasi/dashboard.html')
 
 
+@query_budget(get=4, post=6)
 @login_required
 def createpengurus(request):
     if request.user.role != 'admin':
-        return redirect('admin_login')
+        return redirect('admin_koperasi:admin_login')
 
     if request.method == 'POST':
         username = request.POST.get('username')
@@ -61,11 +65,12 @@ def createpengurus(request):
                 role=role
             )
             messages.success(request, 'Akun pengurus berhasil dibuat')
-            return redirect('admin_dashboard')
+            return redirect('admin_koperasi:admin_dashboard')
 
     return render(request, 'admin_koperasi/createpengurus.html')
 
 
+@query_budget(6)
 def admin_logout(request):
     logout(request)
     return redirect('admin_koperasi:admin_login') 
\ No newline at end of file
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from .models import Anggota
+from .validasi import sudah_dipakai
 
 User = get_user_model()
 
@@ -134,6 +135,25 @@ class AnggotaForm(forms.ModelForm):
             "placeholder": "Pekerjaan"
         })
 
+    # ===============================
+    # CEK KEUNIKAN (email / nip / no telp)
+    # ===============================
+    def _cek_unik(self, kolom, label):
+        nilai = self.cleaned_data.get(kolom)
+        kecuali = None if self.instance._state.adding else self.instance.pk
+        if sudah_dipakai(kolom, nilai, kecuali=kecuali):
+            raise forms.ValidationError(f"{label} sudah dipakai anggota lain.")
+        return nilai
+
+    def clean_email(self):
+        return self._cek_unik("email", "Email")
+
+    def clean_nip(self):
+        return self._cek_unik("nip", "NIP")
+
+    def clean_no_telp(self):
+        return self._cek_unik("no_telp", "Nomor telepon")
+
     def save(self, commit=True):
         anggota = super().save(commit=False)
 
@@ -0,0 +1,90 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from anggota.models import Anggota, TokenAnggota
+from anggota.search import _cari, cari_anggota, filter_anggota
+
+NAMA_DEPAN = ["Siti", "Budi", "Agus", "Dewi", "Rina", "Andi", "Sri", "Joko", "Nur", "Putri", "Eko", "Wahyu"]
+NAMA_BELAKANG = ["Rahayu", "Santoso", "Wijaya", "Lestari", "Hidayat", "Saputra", "Kurniawan", "Utami", "Pratama"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Bandingkan latency pencarian anggota (icontains vs tabel token). "
+        "Data dummy dibuat di dalam transaksi lalu di-rollback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jumlah", type=int, default=50000)
+        parser.add_argument("--ulang", type=int, default=200)
+
+    def handle(self, *args, **options):
+        jumlah, ulang = options["jumlah"], options["ulang"]
+        rng = random.Random(1)
+
+        with transaction.atomic():
+            anggota = [
+                Anggota(
+                    nomor_anggota=f"BM {i}",
+                    nama=f"{rng.choice(NAMA_DEPAN)} {rng.choice(NAMA_BELAKANG)} {i}",
+                    jenis_kelamin="Laki-laki",
+                    status="aktif",
+                )
+                for i in range(jumlah)
+            ]
+            Anggota.objects.bulk_create(anggota, batch_size=2000)
+            TokenAnggota.perbarui(anggota)
+
+            # statistik index supaya planner memilih rencana seperti di DB
+            # produksi (ANALYZE TABLE di MySQL memaksa commit, jadi dilewati;
+            # MySQL memakai index dive untuk range token)
+            if connection.vendor in ("sqlite", "postgresql"):
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+
+            term = [
+                rng.choice(NAMA_DEPAN + NAMA_BELAKANG)[:rng.randint(2, 5)]
+                for _ in range(ulang)
+            ] + [f"BM {rng.randrange(jumlah)}" for _ in range(ulang)]
+
+            def icontains(t):
+                return list(
+                    Anggota.objects.filter(status="aktif")
+                    .filter(Q(nama__icontains=t) | Q(nomor_anggota__icontains=t))
+                    .order_by("nama", "nomor_anggota")
+                    .values_list("nomor_anggota", "nama")[:10]
+                )
+
+            def token(t):
+                return list(
+                    filter_anggota(Anggota.objects.filter(status="aktif"), t)
+                    .order_by("nama", "nomor_anggota")
+                    .values_list("nomor_anggota", "nama")[:10]
+                )
+
+            _cari.cache_clear()
+            for label, fungsi in (
+                ("icontains", icontains),
+                ("token", token),
+                ("token + LRU", cari_anggota),
+            ):
+                self._ukur(label, fungsi, term)
+
+            transaction.set_rollback(True)
+
+    def _ukur(self, label, fungsi, term):
+        waktu = []
+        for t in term:
+            mulai = time.perf_counter()
+            fungsi(t)
+            waktu.append((time.perf_counter() - mulai) * 1000)
+        waktu.sort()
+        self.stdout.write(
+            f"{label:<12} p50={waktu[len(waktu) // 2]:.2f}ms "
+            f"p95={waktu[int(len(waktu) * 0.95)]:.2f}ms "
+            f"maks={waktu[-1]:.2f}ms"
+        )
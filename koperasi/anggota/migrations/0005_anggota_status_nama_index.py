@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0004_alter_anggota_nomor_anggota'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='anggota',
+            index=models.Index(fields=['status', 'nama'], name='idx_anggota_status_nama'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0005_anggota_status_nama_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportAnggota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nama_file', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('menunggu', 'Menunggu'), ('berjalan', 'Berjalan'), ('selesai', 'Selesai'), ('gagal', 'Gagal')], default='menunggu', max_length=10)),
+                ('baris_diproses', models.PositiveIntegerField(default=0)),
+                ('jumlah_baru', models.PositiveIntegerField(default=0)),
+                ('jumlah_update', models.PositiveIntegerField(default=0)),
+                ('jumlah_gagal', models.PositiveIntegerField(default=0)),
+                ('error', models.JSONField(blank=True, default=list)),
+                ('pesan', models.CharField(blank=True, default='', max_length=255)),
+                ('dibuat_pada', models.DateTimeField(auto_now_add=True)),
+                ('selesai_pada', models.DateTimeField(blank=True, null=True)),
+                ('dibuat_oleh', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'import_anggota',
+                'ordering': ['-dibuat_pada'],
+            },
+        ),
+    ]
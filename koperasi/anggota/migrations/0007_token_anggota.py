@@ -0,0 +1,43 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from anggota.search import token_anggota
+
+
+def isi_token(apps, schema_editor):
+    Anggota = apps.get_model('anggota', 'Anggota')
+    TokenAnggota = apps.get_model('anggota', 'TokenAnggota')
+
+    batch = []
+    for nomor, nama in Anggota.objects.values_list('nomor_anggota', 'nama').iterator(chunk_size=2000):
+        batch += [TokenAnggota(anggota_id=nomor, token=t) for t in token_anggota(nomor, nama)]
+        if len(batch) >= 5000:
+            TokenAnggota.objects.bulk_create(batch)
+            batch = []
+    TokenAnggota.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0006_import_anggota'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenAnggota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('anggota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='token_pencarian', to='anggota.anggota')),
+            ],
+            options={
+                'db_table': 'anggota_token',
+                'indexes': [models.Index(fields=['token', 'anggota'], name='idx_token_anggota')],
+                'constraints': [models.UniqueConstraint(fields=('anggota', 'token'), name='uniq_token_anggota')],
+            },
+        ),
+        migrations.RunPython(isi_token, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:35
+
+from django.db import migrations, models
+
+
+def isi_urutan_status(apps, schema_editor):
+    Anggota = apps.get_model('anggota', 'Anggota')
+    Anggota.objects.filter(status__iexact='nonaktif').update(urutan_status=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0007_token_anggota'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='anggota',
+            name='urutan_status',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='anggota',
+            index=models.Index(fields=['urutan_status', 'nomor_anggota'], name='idx_anggota_urutan_status'),
+        ),
+        migrations.RunPython(isi_urutan_status, migrations.RunPython.noop),
+    ]
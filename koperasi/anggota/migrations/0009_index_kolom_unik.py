@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0008_urutan_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='anggota',
+            index=models.Index(fields=['email'], name='idx_anggota_email'),
+        ),
+        migrations.AddIndex(
+            model_name='anggota',
+            index=models.Index(fields=['nip'], name='idx_anggota_nip'),
+        ),
+        migrations.AddIndex(
+            model_name='anggota',
+            index=models.Index(fields=['no_telp'], name='idx_anggota_no_telp'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:58
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0009_index_kolom_unik'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importanggota',
+            name='diperbarui_pada',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.9 on 2026-10-18 18:12
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0010_import_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='anggota',
+            name='idx_anggota_email',
+        ),
+        migrations.RemoveIndex(
+            model_name='anggota',
+            name='idx_anggota_nip',
+        ),
+        migrations.RemoveIndex(
+            model_name='anggota',
+            name='idx_anggota_no_telp',
+        ),
+        migrations.AddIndex(
+            model_name='anggota',
+            index=models.Index(django.db.models.functions.text.Lower('nomor_anggota'), name='idx_anggota_nomor_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='anggota',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='idx_anggota_email_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='anggota',
+            index=models.Index(django.db.models.functions.text.Lower('nip'), name='idx_anggota_nip_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='anggota',
+            index=models.Index(django.db.models.functions.text.Lower('no_telp'), name='idx_anggota_no_telp_lower'),
+        ),
+    ]
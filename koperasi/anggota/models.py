@@ -1,7 +1,86 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.hashers import make_password, check_password
-from datetime import datetime
-from django.db.models import Sum
+from datetime import datetime, timedelta
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Lower
+from django.utils import timezone
+
+from .utils import naikkan_versi_anggota
+
+
+def _jumlah_per_anggota(queryset, field, anggota_field="anggota"):
+    """Subquery SUM(field) untuk anggota di OuterRef, 0 kalau tidak ada baris."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{anggota_field: OuterRef("pk")})
+            .order_by()
+            .values(anggota_field)
+            .annotate(total=Sum(field))
+            .values("total")[:1]
+        ),
+        Value(0),
+        output_field=DecimalField(max_digits=18, decimal_places=2),
+    )
+
+
+class AnggotaQuerySet(models.QuerySet):
+    """
+    Anotasi saldo / pinjaman per anggota lewat subquery, jadi satu query
+    untuk banyak anggota (bukan aggregate per instance di loop template).
+
+    Semua angka simpanan dibaca dari ringkasan saldo_simpanan, sama dengan
+    fallback get_total_* di model, jadi hasilnya tidak tergantung jalurnya.
+    """
+
+    def with_saldo(self):
+        """total_simpanan, total_penarikan, saldo (dari ringkasan saldo_simpanan)."""
+        from simpanan.models import SaldoSimpanan
+
+        return self.annotate(
+            total_simpanan=_jumlah_per_anggota(SaldoSimpanan.objects.all(), "total_setor"),
+            total_penarikan=_jumlah_per_anggota(SaldoSimpanan.objects.all(), "total_tarik"),
+            saldo=_jumlah_per_anggota(SaldoSimpanan.objects.all(), "saldo"),
+        )
+
+    def with_saldo_per_jenis(self):
+        """saldo_pokok, saldo_wajib, saldo_sukarela."""
+        from simpanan.models import JenisSimpanan, SaldoSimpanan
+
+        return self.annotate(**{
+            f"saldo_{jenis.lower()}": _jumlah_per_anggota(
+                SaldoSimpanan.objects.filter(jenis_simpanan__nama_jenis=jenis), "saldo"
+            )
+            for jenis, _ in JenisSimpanan.JENIS_CHOICES
+        })
+
+    def with_total_per_jenis(self):
+        """
+        total_pokok, total_wajib, total_sukarela (total setor per jenis) dan
+        total_dana_sosial (rekap dana_sosial_anggota). Dipakai daftar simpanan.
+        """
+        from simpanan.models import DanaSosialAnggota, JenisSimpanan, SaldoSimpanan
+
+        return self.annotate(
+            **{
+                f"total_{jenis.lower()}": _jumlah_per_anggota(
+                    SaldoSimpanan.objects.filter(jenis_simpanan__nama_jenis=jenis), "total_setor"
+                )
+                for jenis, _ in JenisSimpanan.JENIS_CHOICES
+            },
+            total_dana_sosial=_jumlah_per_anggota(DanaSosialAnggota.objects.all(), "total"),
+        )
+
+    def with_outstanding_pinjaman(self):
+        """sisa_pinjaman_aktif: total sisa pinjaman berstatus aktif."""
+        from pinjaman.models import Pinjaman
+
+        return self.annotate(
+            sisa_pinjaman_aktif=_jumlah_per_anggota(
+                Pinjaman.objects.filter(status="aktif"), "sisa_pinjaman", "nomor_anggota"
+            ),
+        )
+
 
 class Anggota(models.Model):
     JK_CHOICES = [
@@ -28,27 +107,190 @@ class Anggota(models.Model):
     tanggal_nonaktif = models.DateField(blank=True, null=True)
     password_hash = models.CharField(max_length=255)
 
+    objects = AnggotaQuerySet.as_manager()
+
+    # kunci urut kelola akun: 0 = aktif, 1 = nonaktif (diisi di save)
+    urutan_status = models.PositiveSmallIntegerField(default=0, editable=False)
+
     class Meta:
         db_table = 'Anggota'
+        indexes = [
+            # autocomplete anggota aktif (prefix nama)
+            models.Index(fields=['status', 'nama'], name='idx_anggota_status_nama'),
+            # kelola akun: aktif dulu, lalu nomor anggota
+            models.Index(fields=['urutan_status', 'nomor_anggota'], name='idx_anggota_urutan_status'),
+            # cek keunikan tanpa beda huruf besar/kecil (lihat validasi.py)
+            models.Index(Lower('nomor_anggota'), name='idx_anggota_nomor_lower'),
+            models.Index(Lower('email'), name='idx_anggota_email_lower'),
+            models.Index(Lower('nip'), name='idx_anggota_nip_lower'),
+            models.Index(Lower('no_telp'), name='idx_anggota_no_telp_lower'),
+        ]
 
     def __str__(self):
         return f"{self.nomor_anggota} - {self.nama}"
 
+    def isi_urutan_status(self):
+        self.urutan_status = 1 if (self.status or "").lower() == "nonaktif" else 0
+
+    def save(self, *args, **kwargs):
+        self.isi_urutan_status()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "status" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "urutan_status"}
+        super().save(*args, **kwargs)
+        TokenAnggota.perbarui([self])
+        naikkan_versi_anggota()
+
+    def delete(self, *args, **kwargs):
+        hasil = super().delete(*args, **kwargs)
+        naikkan_versi_anggota()
+        return hasil
+
     def set_password(self, raw_password: str):
         self.password_hash = make_password(raw_password)
 
     def check_password(self, raw_password: str) -> bool:
         return check_password(raw_password, self.password_hash)
 
+    # nilai dari with_saldo() dipakai kalau ada, selain itu aggregate per
+    # instance ke sumber yang sama (saldo_simpanan)
+    def _total_saldo_simpanan(self, field):
+        return self.saldo_simpanan.aggregate(total=Sum(field))['total'] or 0
+
     def get_total_simpanan(self):
-        return self.simpanan.aggregate(
-            total=Sum('jumlah')
-        )['total'] or 0
+        if hasattr(self, "total_simpanan"):
+            return self.total_simpanan
+        return self._total_saldo_simpanan('total_setor')
 
     def get_total_penarikan(self):
-        return self.penarikan.aggregate(
-            total=Sum('jumlah')
-        )['total'] or 0
+        if hasattr(self, "total_penarikan"):
+            return self.total_penarikan
+        return self._total_saldo_simpanan('total_tarik')
 
     def get_saldo(self):
-        return self.get_total_simpanan() - self.get_total_penarikan()
\ No newline at end of file
+        if hasattr(self, "saldo"):
+            return self.saldo
+        return self._total_saldo_simpanan('saldo')
+
+# ======================
+# Token pencarian anggota (prefix per kata nama + nomor anggota)
+# ======================
+class TokenAnggota(models.Model):
+    anggota = models.ForeignKey(
+        Anggota,
+        on_delete=models.CASCADE,
+        related_name='token_pencarian'
+    )
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        db_table = 'anggota_token'
+        indexes = [
+            # covering: range prefix token langsung dapat anggota_id
+            models.Index(fields=['token', 'anggota'], name='idx_token_anggota'),
+        ]
+        constraints = [
+            # (anggota, token) juga dipakai EXISTS untuk kata kedua dst.
+            models.UniqueConstraint(fields=['anggota', 'token'], name='uniq_token_anggota'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} → {self.anggota_id}"
+
+    @classmethod
+    def perbarui(cls, anggota_list):
+        """Tulis ulang token sekumpulan anggota (dipanggil saat save / import)."""
+        from .search import token_anggota
+
+        anggota_list = list(anggota_list)
+        cls.objects.filter(anggota__in=[a.pk for a in anggota_list]).delete()
+        cls.objects.bulk_create(
+            [
+                cls(anggota_id=a.pk, token=token)
+                for a in anggota_list
+                for token in token_anggota(a.nomor_anggota, a.nama)
+            ],
+            batch_size=1000,
+        )
+
+
+# ======================
+# Import Excel anggota (dijalankan di background)
+# ======================
+class ImportAnggota(models.Model):
+    MENUNGGU = 'menunggu'
+    BERJALAN = 'berjalan'
+    SELESAI = 'selesai'
+    GAGAL = 'gagal'
+
+    STATUS_CHOICES = [
+        (MENUNGGU, 'Menunggu'),
+        (BERJALAN, 'Berjalan'),
+        (SELESAI, 'Selesai'),
+        (GAGAL, 'Gagal'),
+    ]
+
+    nama_file = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=MENUNGGU)
+
+    baris_diproses = models.PositiveIntegerField(default=0)
+    jumlah_baru = models.PositiveIntegerField(default=0)
+    jumlah_update = models.PositiveIntegerField(default=0)
+    jumlah_gagal = models.PositiveIntegerField(default=0)
+
+    # [{"baris": 12, "pesan": "..."}]
+    error = models.JSONField(default=list, blank=True)
+    pesan = models.CharField(max_length=255, blank=True, default='')
+
+    dibuat_oleh = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    dibuat_pada = models.DateTimeField(auto_now_add=True)
+    # heartbeat: diisi setiap chunk selesai (update() tidak memicu auto_now)
+    diperbarui_pada = models.DateTimeField(default=timezone.now)
+    selesai_pada = models.DateTimeField(null=True, blank=True)
+
+    # tanpa heartbeat selama ini → thread import dianggap mati
+    BATAS_MACET = timedelta(minutes=10)
+
+    class Meta:
+        db_table = 'import_anggota'
+        ordering = ['-dibuat_pada']
+
+    def __str__(self):
+        return f"Import {self.nama_file} ({self.status})"
+
+    @property
+    def sedang_berjalan(self):
+        return self.status in (self.MENUNGGU, self.BERJALAN)
+
+    @property
+    def jumlah_tersimpan(self):
+        return self.jumlah_baru + self.jumlah_update
+
+    def tandai_jika_macet(self):
+        """
+        Job yang masih `berjalan` tapi heartbeat-nya lewat BATAS_MACET
+        (proses worker mati / restart) ditandai gagal. Return True kalau ditandai.
+        """
+        if not self.sedang_berjalan:
+            return False
+        batas = timezone.now() - self.BATAS_MACET
+        if self.diperbarui_pada >= batas:
+            return False
+
+        pesan = (
+            f"Import berhenti tanpa kabar sejak {timezone.localtime(self.diperbarui_pada):%d-%m-%Y %H:%M}; "
+            f"{self.jumlah_tersimpan} baris sudah tersimpan."
+        )
+        ditandai = type(self).objects.filter(
+            pk=self.pk,
+            status__in=[self.MENUNGGU, self.BERJALAN],
+            diperbarui_pada__lt=batas,
+        ).update(status=self.GAGAL, pesan=pesan, selesai_pada=timezone.now())
+        if ditandai:
+            self.status, self.pesan = self.GAGAL, pesan
+        return bool(ditandai)
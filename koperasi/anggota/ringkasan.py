@@ -0,0 +1,123 @@
+"""
+Ringkasan posisi anggota (simpanan, pinjaman aktif, transaksi terakhir).
+
+Jumlah query tetap berapa pun panjang riwayat anggota:
+  1. baris anggota + versi (id transaksi terakhir, lewat subquery)
+  2. saldo per jenis simpanan (ringkasan_simpanan)
+  3. pinjaman aktif
+  4. riwayat tabungan terakhir
+  5. angsuran terakhir
+Query 2-5 hanya jalan kalau cache kosong. Key cache memuat versi, jadi
+transaksi baru anggota otomatis memakai key baru (tanpa hapus manual,
+aman juga untuk jalur bulk_create yang tidak lewat save()).
+"""
+from urllib.parse import quote
+
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from django.shortcuts import get_object_or_404
+
+from pinjaman.models import Angsuran, Pinjaman
+from simpanan.models import HistoryTabungan
+from simpanan.services import ringkasan_simpanan
+from .models import Anggota
+
+JUMLAH_TERAKHIR = 10
+CACHE_TIMEOUT = 60 * 5
+
+
+def anggota_dengan_versi(nomor_anggota):
+    """Anggota + id history/pinjaman/angsuran terakhirnya dalam satu query."""
+    return get_object_or_404(
+        Anggota.objects.annotate(
+            versi_history=Subquery(
+                HistoryTabungan.objects.filter(anggota=OuterRef("pk"))
+                .order_by("-id").values("id")[:1]
+            ),
+            versi_pinjaman=Subquery(
+                Pinjaman.objects.filter(nomor_anggota=OuterRef("pk"))
+                .order_by("-id_pinjaman").values("id_pinjaman")[:1]
+            ),
+            versi_angsuran=Subquery(
+                Angsuran.objects.filter(id_pinjaman__nomor_anggota=OuterRef("pk"))
+                .order_by("-id_pembayaran").values("id_pembayaran")[:1]
+            ),
+        ),
+        nomor_anggota=nomor_anggota,
+    )
+
+
+def cache_key(anggota):
+    return "ringkasan_anggota:{}:{}-{}-{}".format(
+        quote(str(anggota.pk)),
+        anggota.versi_history or 0,
+        anggota.versi_pinjaman or 0,
+        anggota.versi_angsuran or 0,
+    )
+
+
+def ringkasan_anggota(anggota):
+    """
+    `anggota` dari anggota_dengan_versi(). Return dict data biasa
+    (bisa langsung dipakai template maupun JsonResponse).
+    """
+    key = cache_key(anggota)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    simpanan = [
+        {"jenis": s["jenis"], "jenis_id": s["jenis_id"], "saldo": s["saldo"]}
+        for s in ringkasan_simpanan(anggota)
+    ]
+
+    pinjaman = [
+        {
+            "id_pinjaman": p.id_pinjaman,
+            "jenis": str(p.id_jenis_pinjaman),
+            "tanggal_meminjam": p.tanggal_meminjam,
+            "jumlah_pinjaman": p.jumlah_pinjaman,
+            "angsuran_per_bulan": p.angsuran_per_bulan,
+            "sisa_pinjaman": p.sisa_pinjaman,
+        }
+        for p in Pinjaman.objects.filter(nomor_anggota=anggota, status="aktif")
+        .select_related("id_jenis_pinjaman")
+        .order_by("tanggal_meminjam", "id_pinjaman")
+    ]
+
+    history = [
+        {
+            "tanggal": h.tanggal,
+            "jenis": h.jenis_simpanan.get_nama_jenis_display() if h.jenis_simpanan else "-",
+            "transaksi": h.get_jenis_transaksi_display(),
+            "jumlah": h.jumlah,
+        }
+        for h in HistoryTabungan.objects.filter(anggota=anggota)
+        .select_related("jenis_simpanan")
+        .order_by("-tanggal", "-id")[:JUMLAH_TERAKHIR]
+    ]
+
+    angsuran = [
+        {
+            "id_pinjaman": id_pinjaman,
+            "tanggal_bayar": tanggal_bayar,
+            "tipe_bayar": tipe_bayar,
+            "jumlah_bayar": jumlah_bayar,
+        }
+        for id_pinjaman, tanggal_bayar, tipe_bayar, jumlah_bayar in (
+            Angsuran.objects.filter(id_pinjaman__nomor_anggota=anggota)
+            .order_by("-tanggal_bayar", "-id_pembayaran")
+            .values_list("id_pinjaman_id", "tanggal_bayar", "tipe_bayar", "jumlah_bayar")[:JUMLAH_TERAKHIR]
+        )
+    ]
+
+    data = {
+        "simpanan": simpanan,
+        "total_simpanan": sum(s["saldo"] for s in simpanan),
+        "pinjaman": pinjaman,
+        "total_sisa_pinjaman": sum(p["sisa_pinjaman"] for p in pinjaman),
+        "history": history,
+        "angsuran": angsuran,
+    }
+    cache.set(key, data, CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,84 @@
+"""
+Pencarian anggota berbasis tabel token (anggota_token).
+
+Setiap kata nama dan nomor anggota disimpan sebagai token huruf kecil
+yang ter-index; pencarian = setiap kata yang diketik harus menjadi awalan
+salah satu token anggota (range token >= 'kata' AND < 'katb' → range scan
+index, bukan scan seluruh tabel seperti LIKE '%kata%').
+
+Hasil autocomplete untuk awalan yang sering diketik disimpan di LRU per
+proses, dengan versi data anggota sebagai bagian key supaya hasil lama
+tidak terpakai setelah anggota berubah.
+"""
+import re
+from functools import lru_cache
+
+from .utils import versi_anggota
+
+PANJANG_TOKEN = 100
+MAKS_KATA = 5
+_PEMISAH = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def tokenisasi(teks):
+    """'Siti  Nur-Aisyah' → ['siti', 'nur', 'aisyah']"""
+    return [t[:PANJANG_TOKEN] for t in _PEMISAH.split((teks or "").lower()) if t]
+
+
+def token_anggota(nomor_anggota, nama):
+    token = set(tokenisasi(nama)) | set(tokenisasi(nomor_anggota))
+    # "NA 12" juga bisa dicari sebagai "na12"
+    token.add("".join(tokenisasi(nomor_anggota))[:PANJANG_TOKEN])
+    token.discard("")
+    return token
+
+
+def _rentang_prefix(kata):
+    """Prefix → (batas bawah, batas atas) supaya index token dipakai sebagai range."""
+    return {"token__gte": kata, "token__lt": kata[:-1] + chr(ord(kata[-1]) + 1)}
+
+
+def filter_anggota(queryset, term):
+    """
+    Saring queryset Anggota dengan pencarian token. Kata terpanjang (paling
+    selektif) jadi subquery IN, kata lain dicek per anggota lewat EXISTS.
+    """
+    from django.db.models import Exists, OuterRef
+
+    from .models import TokenAnggota
+
+    kata = sorted(set(tokenisasi(term)[:MAKS_KATA]), key=len, reverse=True)
+    if not kata:
+        return queryset
+
+    queryset = queryset.filter(
+        pk__in=TokenAnggota.objects.filter(**_rentang_prefix(kata[0])).values("anggota_id")
+    )
+    for k in kata[1:]:
+        queryset = queryset.filter(Exists(
+            TokenAnggota.objects.filter(anggota=OuterRef("pk"), **_rentang_prefix(k))
+        ))
+    return queryset
+
+
+def cari_anggota(term, status="aktif", limit=10):
+    """Autocomplete: list (nomor_anggota, nama), di-cache per awalan."""
+    kunci = " ".join(tokenisasi(term)[:MAKS_KATA])
+    if not kunci:
+        return []
+    return list(_cari(kunci, status, limit, versi_anggota()))
+
+
+@lru_cache(maxsize=1024)
+def _cari(kunci, status, limit, versi):
+    from .models import Anggota
+
+    anggota = Anggota.objects.all()
+    if status:
+        anggota = anggota.filter(status=status)
+
+    return tuple(
+        filter_anggota(anggota, kunci)
+        .order_by("nama", "nomor_anggota")
+        .values_list("nomor_anggota", "nama")[:limit]
+    )
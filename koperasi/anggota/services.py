@@ -0,0 +1,251 @@
+import os
+import re
+import tempfile
+import threading
+from datetime import date, datetime
+
+from django.contrib.auth.hashers import make_password
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from .models import Anggota, ImportAnggota, TokenAnggota
+from .utils import naikkan_versi_anggota
+from .validasi import KOLOM_UNIK, normalisasi, pemilik_nilai
+
+CHUNK_SIZE = 500
+PASSWORD_DEFAULT = "12345"
+BARIS_MULAI = 4  # header sampai baris 3
+
+KOLOM_UPDATE = [
+    "nama", "umur", "jenis_kelamin", "pekerjaan", "alamat", "tanggal_daftar",
+    "tanggal_nonaktif", "status", "alasan_nonaktif", "nip", "no_telp", "email",
+    "urutan_status",
+]
+
+
+# ======================================================
+# PARSING BARIS EXCEL
+# ======================================================
+def _tanggal(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return None
+
+
+def parse_baris(row):
+    """
+    Satu baris Excel → dict field Anggota.
+    Return None untuk baris kosong, raise ValueError kalau tidak valid.
+    """
+    nilai = [cell.value for cell in row] + [None] * 14
+
+    nomor_anggota = str(nilai[1]).strip() if nilai[1] else None
+    nama = str(nilai[2]).strip() if nilai[2] else None
+
+    if not nomor_anggota and not nama:
+        return None
+    if not nomor_anggota:
+        raise ValueError("Nomor anggota kosong")
+    if not nama:
+        raise ValueError("Nama kosong")
+
+    # hanya format NA xxx
+    if not re.match(r"^NA\s*\d+", nomor_anggota):
+        raise ValueError(f"Format nomor anggota tidak valid: {nomor_anggota}")
+    if len(nomor_anggota) > Anggota._meta.get_field("nomor_anggota").max_length:
+        raise ValueError(f"Nomor anggota terlalu panjang: {nomor_anggota}")
+
+    jk_excel = str(nilai[4]).strip().upper() if nilai[4] else ""
+    jenis_kelamin = "Perempuan" if jk_excel == "P" else "Laki-laki"
+
+    tgl_nonaktif = _tanggal(nilai[12])
+
+    return {
+        "nomor_anggota": nomor_anggota,
+        "nama": nama[:100],
+        "umur": nilai[3] if isinstance(nilai[3], int) else None,
+        "jenis_kelamin": jenis_kelamin,
+        "pekerjaan": nilai[5] or "-",
+        "alamat": nilai[6] or "-",
+        "tanggal_daftar": _tanggal(nilai[8]) or date.today(),
+        "tanggal_nonaktif": tgl_nonaktif,
+        "status": "nonaktif" if tgl_nonaktif else "aktif",
+        "alasan_nonaktif": nilai[13] or "-",
+
+        # kolom yang tidak ada di Excel
+        "nip": "-",
+        "no_telp": "-",
+        "email": "-",
+    }
+
+
+# ======================================================
+# IMPORT (BACKGROUND)
+# ======================================================
+def mulai_import(upload, admin):
+    """
+    Simpan file upload ke file sementara, catat job, lalu proses di thread
+    background setelah commit. Return ImportAnggota untuk dipantau.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
+        for chunk in upload.chunks():
+            tmp.write(chunk)
+        path = tmp.name
+
+    job = ImportAnggota.objects.create(nama_file=upload.name, dibuat_oleh=admin)
+
+    transaction.on_commit(
+        lambda: threading.Thread(
+            target=_jalankan_import,
+            args=(job.pk, path),
+            daemon=True,
+        ).start()
+    )
+    return job
+
+
+def _jalankan_import(job_id, path):
+    close_old_connections()
+    try:
+        proses_import(job_id, path)
+    except Exception as e:
+        # chunk yang sudah di-commit tetap tersimpan, sebutkan jumlahnya
+        job = ImportAnggota.objects.only("jumlah_baru", "jumlah_update").get(pk=job_id)
+        ImportAnggota.objects.filter(pk=job_id).update(
+            status=ImportAnggota.GAGAL,
+            pesan=f"{job.jumlah_tersimpan} baris sudah tersimpan sebelum error: {e}"[:255],
+            selesai_pada=timezone.now(),
+            diperbarui_pada=timezone.now(),
+        )
+    finally:
+        os.remove(path)
+        connection.close()
+
+
+def proses_import(job_id, path):
+    """
+    Baca workbook (read-only, streaming), tulis per CHUNK_SIZE baris
+    dengan bulk_create / bulk_update. Nomor / email / nip / no_telp yang
+    sudah terpakai dicek per chunk (validasi.pemilik_nilai), password
+    default di-hash sekali per import.
+    """
+    ImportAnggota.objects.filter(pk=job_id).update(
+        status=ImportAnggota.BERJALAN,
+        diperbarui_pada=timezone.now(),
+    )
+
+    try:
+        wb = load_workbook(path, read_only=True, data_only=True)
+    except Exception:
+        raise ValueError("File Excel tidak bisa dibaca")
+
+    password_hash = make_password(PASSWORD_DEFAULT)
+
+    chunk = {}
+    error = []
+    diproses = 0
+    try:
+        for idx, row in enumerate(wb.active.iter_rows(min_row=BARIS_MULAI), start=BARIS_MULAI):
+            try:
+                data = parse_baris(row)
+            except ValueError as e:
+                error.append({"baris": idx, "pesan": str(e)})
+                diproses += 1
+                continue
+            if data is None:
+                continue
+
+            # nomor yang sama muncul lagi di file → baris terakhir yang dipakai
+            chunk[normalisasi(data["nomor_anggota"])] = (idx, data)
+            diproses += 1
+
+            if len(chunk) >= CHUNK_SIZE:
+                _simpan_chunk(job_id, chunk, error, diproses, password_hash)
+                chunk, error, diproses = {}, [], 0
+
+        _simpan_chunk(job_id, chunk, error, diproses, password_hash)
+    finally:
+        wb.close()
+
+    ImportAnggota.objects.filter(pk=job_id).update(
+        status=ImportAnggota.SELESAI,
+        selesai_pada=timezone.now(),
+        diperbarui_pada=timezone.now(),
+    )
+
+
+def _simpan_chunk(job_id, chunk, error, diproses, password_hash):
+    baru = []
+    update = []
+
+    # satu query per kolom untuk seluruh chunk ("-" diabaikan)
+    sudah_ada = pemilik_nilai("nomor_anggota", chunk.keys())
+    for idx, data in chunk.values():
+        # "na 1" di file = anggota "NA 1" yang sudah ada
+        data["nomor_anggota"] = sudah_ada.get(normalisasi(data["nomor_anggota"]), data["nomor_anggota"])
+
+    pemilik = {
+        kolom: pemilik_nilai(kolom, (data[kolom] for _, data in chunk.values()))
+        for kolom in KOLOM_UNIK if kolom != "nomor_anggota"
+    }
+
+    for idx, data in chunk.values():
+        bentrok = [
+            kolom for kolom, nilai_pemilik in pemilik.items()
+            if nilai_pemilik.get(normalisasi(data[kolom]), data["nomor_anggota"]) != data["nomor_anggota"]
+        ]
+        if bentrok:
+            error.append({"baris": idx, "pesan": f"{', '.join(bentrok)} sudah dipakai anggota lain"})
+            continue
+
+        anggota = Anggota(**data)
+        anggota.isi_urutan_status()
+        if normalisasi(anggota.nomor_anggota) in sudah_ada:
+            update.append((idx, anggota))
+        else:
+            anggota.password_hash = password_hash
+            baru.append((idx, anggota))
+
+    try:
+        with transaction.atomic():
+            Anggota.objects.bulk_create([a for _, a in baru], batch_size=CHUNK_SIZE)
+            Anggota.objects.bulk_update([a for _, a in update], KOLOM_UPDATE, batch_size=CHUNK_SIZE)
+            TokenAnggota.perbarui(a for _, a in baru + update)
+    except Exception:
+        # ada baris yang ditolak database → simpan satu per satu
+        # supaya baris yang gagal bisa dilaporkan
+        baru, update = _simpan_per_baris(baru, update, error)
+
+    # bulk_create / bulk_update tidak lewat Anggota.save()
+    naikkan_versi_anggota()
+
+    job = ImportAnggota.objects.only("error").get(pk=job_id)
+    ImportAnggota.objects.filter(pk=job_id).update(
+        jumlah_baru=F("jumlah_baru") + len(baru),
+        jumlah_update=F("jumlah_update") + len(update),
+        jumlah_gagal=F("jumlah_gagal") + len(error),
+        baris_diproses=F("baris_diproses") + diproses,
+        error=job.error + sorted(error, key=lambda e: e["baris"]),
+        diperbarui_pada=timezone.now(),
+    )
+
+
+def _simpan_per_baris(baru, update, error):
+    berhasil_baru, berhasil_update = [], []
+    for daftar, hasil, kwargs in (
+        (baru, berhasil_baru, {"force_insert": True}),
+        (update, berhasil_update, {"update_fields": KOLOM_UPDATE}),
+    ):
+        for idx, anggota in daftar:
+            try:
+                with transaction.atomic():
+                    anggota.save(**kwargs)
+            except Exception as e:
+                error.append({"baris": idx, "pesan": str(e)[:200]})
+            else:
+                hasil.append((idx, anggota))
+    return berhasil_baru, berhasil_update
@@ -1,3 +1,441 @@
-from django.test import TestCase
+import re
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from admin_koperasi.models import User
+from laporan.pdf import BARIS_PER_TABEL, render_daftar_anggota
+from pinjaman.models import JenisPinjaman, KategoriJasa, Pinjaman
+from simpanan.models import JenisSimpanan, Penarikan, Simpanan
+from .models import Anggota, ImportAnggota
+from .ringkasan import anggota_dengan_versi, ringkasan_anggota
+from .search import cari_anggota, filter_anggota
+from .services import _jalankan_import
+from .validasi import normalisasi, pemilik_nilai, sudah_dipakai
+
+CACHE_TEST = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "laporan": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "anggota-test"},
+}
+
+
+# ======================================================
+# CEK KEUNIKAN TIDAK MEMBEDAKAN HURUF BESAR / KECIL
+# ======================================================
+@override_settings(CACHES=CACHE_TEST)
+class KeunikanAnggotaTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Anggota.objects.create(
+                nomor_anggota="NA 1", nama="Anggota 1", jenis_kelamin="Laki-laki",
+                email="Budi@Mail.com", nip="-",
+            )
+
+    def test_normalisasi(self):
+        self.assertEqual(normalisasi("  Budi@Mail.COM "), "budi@mail.com")
+        self.assertIsNone(normalisasi("-"))
+        self.assertIsNone(normalisasi(None))
+
+    def test_sudah_dipakai(self):
+        self.assertTrue(sudah_dipakai("email", "budi@mail.com"))
+        self.assertTrue(sudah_dipakai("email", "BUDI@MAIL.COM"))
+        self.assertFalse(sudah_dipakai("email", "budi@mail.com", kecuali="NA 1"))
+        self.assertFalse(sudah_dipakai("email", "lain@mail.com"))
+        # placeholder import tidak pernah bentrok
+        self.assertFalse(sudah_dipakai("nip", "-"))
+
+    def test_pemilik_nilai(self):
+        self.assertEqual(
+            pemilik_nilai("email", ["BUDI@mail.com", "lain@mail.com", "-", None]),
+            {"budi@mail.com": "NA 1"},
+        )
+        self.assertEqual(pemilik_nilai("nomor_anggota", ["na 1"]), {"na 1": "NA 1"})
+
+    def test_nilai_baru_tanpa_query(self):
+        sudah_dipakai("email", "budi@mail.com")  # set hash dibangun
+
+        with self.assertNumQueries(0):
+            self.assertFalse(sudah_dipakai("email", "orang.lain@mail.com"))
+
+    def test_set_dibangun_ulang_setelah_simpan(self):
+        self.assertFalse(sudah_dipakai("email", "siti@mail.com"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Anggota.objects.create(
+                nomor_anggota="NA 2", nama="Anggota 2", jenis_kelamin="Perempuan",
+                email="SITI@mail.com",
+            )
+
+        self.assertTrue(sudah_dipakai("email", "siti@mail.com"))
+
+    def test_import_memakai_in_ke_index_lower(self):
+        with CaptureQueriesContext(connection) as ctx:
+            pemilik_nilai("email", [f"user{i}@mail.com" for i in range(50)] + ["BUDI@MAIL.COM"])
+
+        sql = ctx.captured_queries[-1]["sql"]
+        self.assertIn('LOWER("Anggota"."email") IN', sql)
+        self.assertNotIn(" OR ", sql)
+
+    def test_kolom_lain_ditolak(self):
+        with self.assertRaises(ValueError):
+            sudah_dipakai("nama", "Anggota 1")
+
+
+# ======================================================
+# JOB IMPORT: HEARTBEAT DAN GAGAL DI TENGAH JALAN
+# ======================================================
+class ImportAnggotaJobTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bendahara", password="x", role="bendahara")
+        self.job = ImportAnggota.objects.create(
+            nama_file="anggota.xlsx", dibuat_oleh=self.user,
+            status=ImportAnggota.BERJALAN, jumlah_baru=500, jumlah_update=20,
+        )
+
+    def _mundurkan_heartbeat(self, menit):
+        ImportAnggota.objects.filter(pk=self.job.pk).update(
+            diperbarui_pada=timezone.now() - timedelta(minutes=menit)
+        )
+        self.job.refresh_from_db()
+
+    def test_job_masih_hidup_tidak_ditandai(self):
+        self._mundurkan_heartbeat(1)
+        self.assertFalse(self.job.tandai_jika_macet())
+        self.assertEqual(self.job.status, ImportAnggota.BERJALAN)
+
+    def test_job_macet_jadi_gagal_dan_berhenti_refresh(self):
+        self._mundurkan_heartbeat(30)
+        self.client.force_login(self.user)
+
+        response = self.client.get(f"/anggota/import/excel/{self.job.pk}/")
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImportAnggota.GAGAL)
+        self.assertIn("520 baris sudah tersimpan", self.job.pesan)
+        self.assertNotContains(response, 'http-equiv="refresh"')
+
+    def test_error_di_tengah_import_menyebut_baris_tersimpan(self):
+        def proses_gagal(job_id, path):
+            ImportAnggota.objects.filter(pk=job_id).update(jumlah_baru=1000)
+            raise ValueError("koneksi putus")
+
+        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
+            path = tmp.name
+        with mock.patch("anggota.services.proses_import", proses_gagal), \
+                mock.patch("anggota.services.connection"), \
+                mock.patch("anggota.services.close_old_connections"):
+            _jalankan_import(self.job.pk, path)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImportAnggota.GAGAL)
+        self.assertEqual(self.job.pesan, "1020 baris sudah tersimpan sebelum error: koneksi putus")
+
+
+# ======================================================
+# ANOTASI SALDO = FALLBACK PER INSTANCE, SATU QUERY
+# ======================================================
+class AnggotaQuerySetTest(TestCase):
+    JUMLAH_ANGGOTA = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user("bendahara", password="x", role="bendahara")
+        jenis = {
+            nama: JenisSimpanan.objects.create(nama_jenis=nama)
+            for nama, _ in JenisSimpanan.JENIS_CHOICES
+        }
+        jenis_pinjaman = JenisPinjaman.objects.create(nama_jenis="Reguler")
+        kategori = KategoriJasa.objects.create(kategori_jasa="Umum")
+
+        for i in range(1, cls.JUMLAH_ANGGOTA + 1):
+            anggota = Anggota.objects.create(
+                nomor_anggota=f"NA {i:02}", nama=f"Anggota {i}", jenis_kelamin="Laki-laki"
+            )
+            for n, nama in enumerate(jenis, start=1):
+                Simpanan.objects.create(
+                    anggota=anggota, jenis_simpanan=jenis[nama],
+                    jumlah=Decimal(10000 * i * n), dana_sosial=Decimal(1000 * (i % 3)),
+                )
+            Penarikan.objects.create(
+                anggota=anggota, jenis_simpanan=jenis[JenisSimpanan.SUKARELA],
+                jumlah=Decimal(5000 * i),
+            )
+            Pinjaman.objects.create(
+                nomor_anggota=anggota, id_jenis_pinjaman=jenis_pinjaman,
+                id_kategori_jasa=kategori, id_admin=admin,
+                jumlah_pinjaman=Decimal("1000000"), angsuran_per_bulan=Decimal("100000"),
+                tanggal_meminjam=date.today(), jatuh_tempo=10,
+                sisa_pinjaman=Decimal(100000 * i), status="aktif" if i % 2 else "lunas",
+            )
+
+    def test_satu_query_dan_sama_dengan_fallback(self):
+        with self.assertNumQueries(1):
+            daftar = list(
+                Anggota.objects.with_saldo().with_saldo_per_jenis()
+                .with_total_per_jenis().with_outstanding_pinjaman()
+                .order_by("nomor_anggota")
+            )
+        self.assertEqual(len(daftar), self.JUMLAH_ANGGOTA)
+
+        for i, anggota in enumerate(daftar, start=1):
+            with self.subTest(anggota=anggota.pk):
+                polos = Anggota.objects.get(pk=anggota.pk)
+                for method in ("get_total_simpanan", "get_total_penarikan", "get_saldo"):
+                    self.assertEqual(getattr(anggota, method)(), getattr(polos, method)())
+
+                self.assertEqual(anggota.get_total_simpanan(), Decimal(60000 * i))
+                self.assertEqual(anggota.get_saldo(), Decimal(55000 * i))
+                self.assertEqual(anggota.saldo_sukarela, Decimal(25000 * i))
+                self.assertEqual(anggota.total_sukarela, Decimal(30000 * i))
+                self.assertEqual(anggota.total_dana_sosial, Decimal(3000 * (i % 3)))
+                self.assertEqual(
+                    anggota.sisa_pinjaman_aktif, Decimal(100000 * i) if i % 2 else 0
+                )
+
+    def test_daftar_simpanan_tanpa_query_per_baris(self):
+        self.client.force_login(User.objects.get(username="bendahara"))
+
+        # session, user, count, halaman (total per jenis ikut dianotasi)
+        with self.assertNumQueries(4):
+            response = self.client.get("/simpanan/?page=2")
+
+        baris = list(response.context["page_obj"])
+        self.assertEqual([a.pk for a in baris], ["NA 11", "NA 12"])
+        self.assertEqual(baris[0].total_wajib, Decimal("220000"))
+
+
+# ======================================================
+# EXPORT PDF ANGGOTA: PER TABEL KECIL + CACHE PER VERSI
+# ======================================================
+@override_settings(CACHES=CACHE_TEST)
+class ExportPdfAnggotaTest(TestCase):
+    URL = "/anggota/export/pdf/"
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(BARIS_PER_TABEL * 2 + 5):
+                Anggota.objects.create(
+                    nomor_anggota=f"NA {i:03d}", nama=f"Anggota {i}", jenis_kelamin="Laki-laki",
+                    alamat="Jl. " + "Panjang Sekali " * 10 if i % 7 == 0 else "Jl. Pendek",
+                    # satu kata yang lebih lebar dari kolomnya → Paragraph
+                    email="x" * 80 + "@koperasi.id" if i == 3 else None,
+                )
+        self.client.force_login(User.objects.create_user("sekretaris", password="x", role="sekretaris"))
+
+    def _halaman(self, pdf):
+        return len(re.findall(rb"/Type /Page\b(?!s)", pdf))
+
+    def test_semua_anggota_dirender_per_halaman(self):
+        pdf = self.client.get(self.URL).content
+
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertGreaterEqual(self._halaman(pdf), 3)
+
+    def test_unduhan_ulang_dari_cache_sampai_data_berubah(self):
+        with mock.patch("anggota.views.render_daftar_anggota", wraps=render_daftar_anggota) as render:
+            pertama = self.client.get(self.URL).content
+            kedua = self.client.get(self.URL).content
+            self.assertEqual(render.call_count, 1)
+            self.assertEqual(pertama, kedua)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Anggota.objects.create(nomor_anggota="NA 999", nama="Baru", jenis_kelamin="Perempuan")
+            self.client.get(self.URL)
+            self.assertEqual(render.call_count, 2)
+
+
+# ======================================================
+# PENCARIAN ANGGOTA (TABEL TOKEN)
+# ======================================================
+@override_settings(CACHES=CACHE_TEST)
+class CariAnggotaTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for nomor, nama, status in (
+                ("NA 12", "Siti Nur-Aisyah", "aktif"),
+                ("NA 120", "Budi Santoso", "aktif"),
+                ("NA 7", "Nurul Huda", "aktif"),
+                ("NA 8", "Siti Rahma", "nonaktif"),
+            ):
+                Anggota.objects.create(
+                    nomor_anggota=nomor, nama=nama, status=status, jenis_kelamin="Perempuan"
+                )
+
+    def _nomor(self, term, **kwargs):
+        return [nomor for nomor, _ in cari_anggota(term, **kwargs)]
+
+    def test_awalan_kata_nama_dan_nomor(self):
+        for term, harapan in (
+            ("siti", ["NA 12"]),                  # yang nonaktif tidak ikut
+            ("AISY", ["NA 12"]),                  # kata setelah tanda hubung
+            ("nur", ["NA 7", "NA 12"]),           # urut nama
+            ("nur siti", ["NA 12"]),              # semua kata harus cocok
+            ("na12", ["NA 120", "NA 12"]),
+            ("na 12", ["NA 120", "NA 12"]),
+            ("santo", ["NA 120"]),
+            ("anto", []),                          # bukan awalan kata
+            ("  ", []),
+        ):
+            with self.subTest(term=term):
+                self.assertEqual(self._nomor(term), harapan)
+
+        self.assertEqual(self._nomor("siti", status=None), ["NA 12", "NA 8"])
+        self.assertEqual(
+            sorted(filter_anggota(Anggota.objects.all(), "siti").values_list("pk", flat=True)),
+            ["NA 12", "NA 8"],
+        )
+
+    def test_awalan_berulang_dari_cache_sampai_anggota_berubah(self):
+        self.assertEqual(self._nomor("bud"), ["NA 120"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self._nomor("bud"), ["NA 120"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            budi = Anggota.objects.get(pk="NA 120")
+            budi.nama = "Agus Santoso"
+            budi.save()
+        self.assertEqual(self._nomor("bud"), [])
+        self.assertEqual(self._nomor("agus"), ["NA 120"])
+
+    def test_kedua_autocomplete_memakai_layanan_yang_sama(self):
+        self.client.force_login(User.objects.create_user("bendahara", password="x", role="bendahara"))
+
+        for url in ("/simpanan/autocomplete-anggota/", "/pinjaman/autocomplete-anggota/"):
+            with self.subTest(url=url):
+                response = self.client.get(url, {"term": "nur"})
+                self.assertEqual(response.json()["results"], [
+                    {"id": "NA 7", "text": "NA 7 - Nurul Huda"},
+                    {"id": "NA 12", "text": "NA 12 - Siti Nur-Aisyah"},
+                ])
+
+
+# ======================================================
+# KELOLA AKUN: URUTAN STATUS DARI INDEX + COUNT DI CACHE
+# ======================================================
+@override_settings(CACHES=CACHE_TEST)
+class KelolaAkunTest(TestCase):
+    URL = "/anggota/"
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(1, 13):
+                Anggota.objects.create(
+                    nomor_anggota=f"NA {i:02d}", nama=f"Anggota {i}", jenis_kelamin="Laki-laki",
+                    status=("NONAKTIF", "Nonaktif")[i % 2] if i <= 4 else "aktif",
+                )
+        self.client.force_login(User.objects.create_user("ketua", password="x", role="ketua"))
+
+    def _nomor(self, page):
+        response = self.client.get(self.URL, {"page_anggota": page})
+        return [a.nomor_anggota for a in response.context["anggotas"]]
+
+    def test_nonaktif_di_akhir_apa_pun_hurufnya(self):
+        self.assertEqual(
+            self._nomor(1) + self._nomor(2),
+            [f"NA {i:02d}" for i in range(5, 13)] + ["NA 01", "NA 02", "NA 03", "NA 04"],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            anggota = Anggota.objects.get(pk="NA 01")
+            anggota.status = "aktif"
+            anggota.save(update_fields=["status"])
+        self.assertEqual(self._nomor(1)[0], "NA 01")
+
+    def test_count_dari_cache_sampai_anggota_berubah(self):
+        def jumlah_count():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.URL, {"page_anggota": 2})
+            count = sum('COUNT(*)' in q["sql"] and '"Anggota"' in q["sql"] for q in queries)
+            return count, response.context["anggotas"].paginator.count
+
+        self.assertEqual(jumlah_count(), (1, 12))
+        self.assertEqual(jumlah_count(), (0, 12))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Anggota.objects.create(nomor_anggota="NA 13", nama="Baru", jenis_kelamin="Perempuan")
+        self.assertEqual(jumlah_count(), (1, 13))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Anggota.objects.get(pk="NA 13").delete()
+        self.assertEqual(jumlah_count(), (1, 12))
+
+
+# ======================================================
+# RINGKASAN ANGGOTA: QUERY TETAP + CACHE PER VERSI TRANSAKSI
+# ======================================================
+@override_settings(CACHES=CACHE_TEST)
+class RingkasanAnggotaTest(TestCase):
+    def setUp(self):
+        # id transaksi (bagian key cache) bisa terpakai ulang antar test
+        cache.clear()
+        self.admin = User.objects.create_user("ketua", password="x", role="ketua")
+        self.sukarela = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.SUKARELA)
+        self.anggota = Anggota.objects.create(
+            nomor_anggota="NA 1", nama="Anggota 1", jenis_kelamin="Laki-laki"
+        )
+        self.pinjaman = Pinjaman.objects.create(
+            nomor_anggota=self.anggota,
+            id_jenis_pinjaman=JenisPinjaman.objects.create(nama_jenis="Reguler"),
+            id_kategori_jasa=KategoriJasa.objects.create(kategori_jasa="Umum"),
+            id_admin=self.admin,
+            jumlah_pinjaman=Decimal("1000000"),
+            angsuran_per_bulan=Decimal("100000"),
+            tanggal_meminjam=date(2024, 1, 1),
+            jatuh_tempo=10,
+            sisa_pinjaman=Decimal("800000"),
+            status="aktif",
+        )
+
+    def _setor(self, jumlah, tanggal):
+        Simpanan.objects.create(
+            anggota=self.anggota, jenis_simpanan=self.sukarela, jumlah=Decimal(jumlah), tanggal=tanggal,
+        )
+
+    def _ringkasan(self):
+        return ringkasan_anggota(anggota_dengan_versi(self.anggota.pk))
+
+    def test_jumlah_query_tidak_tergantung_panjang_riwayat(self):
+        setoran = 0
+        for jumlah_setoran in (1, 30):
+            while setoran < jumlah_setoran:
+                self._setor(1000, date(2024, 1, 1) + timedelta(days=setoran))
+                setoran += 1
+
+            with self.subTest(jumlah_setoran=jumlah_setoran):
+                with self.assertNumQueries(5):
+                    data = self._ringkasan()
+                self.assertEqual(data["total_simpanan"], Decimal(1000 * jumlah_setoran))
+                self.assertEqual(len(data["history"]), min(jumlah_setoran, 10))
+
+                # cache: hanya query anggota + versi
+                with self.assertNumQueries(1):
+                    self.assertEqual(self._ringkasan(), data)
+
+    def test_transaksi_baru_langsung_terlihat(self):
+        self._setor(50000, date(2024, 2, 1))
+        self.assertEqual(self._ringkasan()["total_simpanan"], Decimal("50000"))
+
+        self._setor(25000, date(2024, 2, 2))
+        data = self._ringkasan()
+        self.assertEqual(data["total_simpanan"], Decimal("75000"))
+        self.assertEqual(data["history"][0]["jumlah"], Decimal("25000"))
+        self.assertEqual(data["total_sisa_pinjaman"], Decimal("800000"))
+
+    def test_json_front_desk(self):
+        self._setor(50000, date(2024, 2, 1))
+        self.client.force_login(self.admin)
+
+        data = self.client.get("/anggota/detail/anggota/NA%201/", {"format": "json"}).json()
+
+        self.assertEqual(data["anggota"]["nomor_anggota"], "NA 1")
+        self.assertEqual(Decimal(data["total_simpanan"]), Decimal("50000"))
+        self.assertEqual(
+            [Decimal(p["sisa_pinjaman"]) for p in data["pinjaman"]], [Decimal("800000")]
+        )
@@ -12,6 +12,9 @@ from .views import (
     export_excel_anggota,
     export_pdf_anggota,
     import_excel_anggota,
+    status_import_anggota,
+    cek_email,
+    cek_unik,
 )
 
 
@@ -37,4 +40,9 @@ urlpatterns = [
     path("export/excel/", export_excel_anggota, name="export_excel_anggota"),
     path("export/pdf/", export_pdf_anggota, name="export_pdf_anggota"),
     path("import/excel/", import_excel_anggota, name="import_excel_anggota"),
+    path("import/excel/<int:job_id>/", status_import_anggota, name="status_import_anggota"),
+
+    # 🔹 VALIDASI (dipanggil saat mengetik)
+    path("cek/email/", cek_email, name="cek_email"),
+    path("cek/unik/", cek_unik, name="cek_unik"),
 ]
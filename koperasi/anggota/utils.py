@@ -0,0 +1,52 @@
+from django.core.cache import cache, caches
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils.functional import cached_property
+
+CACHE_VERSI_ANGGOTA = "anggota:versi"
+
+
+def _cache():
+    # cache "laporan" (file) dipakai bersama semua proses, versi harus
+    # terlihat sama di setiap worker
+    return caches["laporan"]
+
+
+def versi_anggota():
+    """Versi data tabel Anggota, naik setiap ada anggota ditambah/diubah/dihapus."""
+    versi = _cache().get(CACHE_VERSI_ANGGOTA)
+    if versi is None:
+        versi = 1
+        _cache().set(CACHE_VERSI_ANGGOTA, versi, None)
+    return versi
+
+
+def naikkan_versi_anggota():
+    def _naikkan():
+        try:
+            _cache().incr(CACHE_VERSI_ANGGOTA)
+        except ValueError:
+            _cache().set(CACHE_VERSI_ANGGOTA, 1, None)
+
+    transaction.on_commit(_naikkan)
+
+
+class PaginatorAnggota(Paginator):
+    """
+    Paginator yang COUNT-nya disimpan di cache (LocMem) per versi anggota,
+    jadi pindah halaman tidak menghitung ulang seluruh tabel. Versi naik
+    setiap anggota ditambah/diubah/dihapus, key lama otomatis tidak terpakai.
+    """
+
+    def __init__(self, object_list, per_page, cache_key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_key = cache_key
+
+    @cached_property
+    def count(self):
+        key = f"{self.cache_key}:{versi_anggota()}"
+        jumlah = cache.get(key)
+        if jumlah is None:
+            jumlah = super().count
+            cache.set(key, jumlah, 60 * 60)
+        return jumlah
@@ -0,0 +1,112 @@
+"""
+Cek keunikan data anggota (nomor_anggota, email, nip, no_telp).
+
+Perbandingan tidak membedakan huruf besar/kecil ("Budi@Mail.com" sama
+dengan "budi@mail.com"): nilai di-lower() di Python dan dicocokkan ke
+LOWER(kolom), yang punya index fungsional (lihat Anggota.Meta.indexes),
+jadi lookup tetap index seek dan bisa memakai IN biasa.
+
+Setiap proses menyimpan set hash nilai yang sudah terpakai per kolom.
+Set dibangun ulang (satu query values_list per kolom) hanya kalau
+versi_anggota berubah, yaitu setelah anggota ditambah, diubah atau dihapus.
+Nilai yang hash-nya tidak ada di set pasti belum dipakai, jadi tidak perlu
+query. Kalau hash-nya ada, hasilnya dipastikan lagi ke database karena
+hash bisa bentrok.
+
+Placeholder seperti "-" (hasil import Excel) tidak dianggap nilai.
+"""
+import threading
+
+from django.db.models.functions import Lower
+
+from .models import Anggota
+from .utils import versi_anggota
+
+KOLOM_UNIK = ("nomor_anggota", "email", "nip", "no_telp")
+PLACEHOLDER = {"", "-"}
+BATCH_IN = 500
+
+_lock = threading.Lock()
+_hash_terpakai = {}  # kolom → (versi, frozenset hash)
+
+
+def normalisasi(nilai):
+    """Nilai lowercase untuk dibandingkan; None untuk nilai kosong / placeholder."""
+    nilai = str(nilai).strip().lower() if nilai is not None else ""
+    return None if nilai in PLACEHOLDER else nilai
+
+
+def _cek_kolom(kolom):
+    if kolom not in KOLOM_UNIK:
+        raise ValueError(f"Kolom tidak dicek keunikannya: {kolom}")
+
+
+def _dengan_kunci(kolom):
+    """Anggota dengan anotasi `kunci` = LOWER(kolom) (kena index fungsional)."""
+    return Anggota.objects.annotate(kunci=Lower(kolom))
+
+
+def _hash_kolom(kolom, bangun=True):
+    """Set hash kolom untuk versi sekarang; None kalau basi dan bangun=False."""
+    _cek_kolom(kolom)
+
+    versi = versi_anggota()
+    cached = _hash_terpakai.get(kolom)
+    if cached is not None and cached[0] == versi:
+        return cached[1]
+    if not bangun:
+        return None
+
+    with _lock:
+        cached = _hash_terpakai.get(kolom)
+        if cached is None or cached[0] != versi:
+            hashes = frozenset(
+                hash(n)
+                for n in (
+                    normalisasi(v)
+                    for v in Anggota.objects.values_list(kolom, flat=True).iterator(chunk_size=5000)
+                )
+                if n is not None
+            )
+            cached = _hash_terpakai[kolom] = (versi, hashes)
+    return cached[1]
+
+
+def pemilik_nilai(kolom, daftar_nilai):
+    """
+    {nilai lowercase: nomor_anggota pemilik} untuk nilai di daftar yang
+    sudah terpakai. Satu query IN per BATCH_IN kandidat (bukan satu query
+    per nilai).
+
+    Set hash hanya dipakai menyaring kandidat kalau masih berlaku; tidak
+    dibangun ulang di sini karena import menaikkan versi setiap chunk.
+    """
+    hashes = _hash_kolom(kolom, bangun=False)
+    kandidat = sorted({
+        n for n in map(normalisasi, daftar_nilai)
+        if n is not None and (hashes is None or hash(n) in hashes)
+    })
+
+    hasil = {}
+    for i in range(0, len(kandidat), BATCH_IN):
+        hasil.update(
+            _dengan_kunci(kolom)
+            .filter(kunci__in=kandidat[i:i + BATCH_IN])
+            .values_list("kunci", "nomor_anggota")
+        )
+    return hasil
+
+
+def sudah_dipakai(kolom, nilai, kecuali=None):
+    """True kalau nilai sudah dipakai anggota lain (selain nomor `kecuali`)."""
+    nilai = normalisasi(nilai)
+    if nilai is None:
+        return False
+
+    if hash(nilai) not in _hash_kolom(kolom):
+        return False
+
+    qs = _dengan_kunci(kolom).filter(kunci=nilai)
+    if kecuali:
+        qs = qs.exclude(nomor_anggota=kecuali)
+    return qs.exists()
@@ -4,23 +4,22 @@ from django.contrib import messages
 from django.core.paginator import Paginator
 from django.http import JsonResponse
 
-from .models import Anggota
+from .models import Anggota, ImportAnggota
+from .ringkasan import anggota_dengan_versi, ringkasan_anggota
+from .search import filter_anggota
+from .services import mulai_import
+from .utils import PaginatorAnggota, versi_anggota
+from .validasi import KOLOM_UNIK, sudah_dipakai
+from laporan.export import export_response, per_baris
+from laporan.pdf import render_daftar_anggota
 from .forms import AnggotaForm, AdminForm
 from django.contrib.auth import get_user_model
-from django.db.models import Case, When, Value, IntegerField
+from urllib.parse import quote
 
 from django.http import HttpResponse
-import openpyxl
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-
-from openpyxl import load_workbook
-from datetime import date, datetime
-import re
+from django.core.cache import caches
+from datetime import date
+from koperasi.query_budget import query_budget
 
 User = get_user_model()
 
@@ -34,6 +33,7 @@ ROLE_PENGURUS = ["ketua", "sekretaris", "bendahara"]
 # ===============================
 # DASHBOARD REDIRECT (GLOBAL)
 # ===============================
+@query_budget(4)
 @login_required
 def dashboard_redirect(request):
     role = request.user.role
@@ -52,6 +52,7 @@ def dashboard_redirect(request):
 # ===============================
 # DASHBOARD PER ROLE
 # ===============================
+@query_budget(4)
 @login_required
 def ketua_dashboard(request):
     if request.user.role != "ketua":
@@ -59,6 +60,7 @@ def ketua_dashboard(request):
     return render(request, "dashboard/ketua.html")
 
 
+@query_budget(4)
 @login_required
 def sekretaris_dashboard(request):
     if request.user.role != "sekretaris":
@@ -66,6 +68,7 @@ def sekretaris_dashboard(request):
     return render(request, "dashboard/sekretaris.html")
 
 
+@query_budget(4)
 @login_required
 def bendahara_dashboard(request):
     if request.user.role != "bendahara":
@@ -76,6 +79,7 @@ def bendahara_dashboard(request):
 # ===============================
 # KELOLA AKUN (ROLE-BASED)
 # ===============================
+@query_budget(8)
 @login_required
 def kelola_akun(request):
     role = request.user.role   # 🔥 AMBIL DARI LOGIN
@@ -97,26 +101,22 @@ def kelola_akun(request):
     )
 
     # ---------- ANGGOTA ----------
-    anggotas = Anggota.objects.annotate(
-        status_order=Case(
-            When(status__iexact="NONAKTIF", then=Value(1)),
-            default=Value(0),
-            output_field=IntegerField()
-        )
-    )
+    anggotas = Anggota.objects.all()
 
     if search_anggota:
-        anggotas = anggotas.filter(nama__icontains=search_anggota)
+        anggotas = filter_anggota(anggotas, search_anggota)
 
-    paginator_anggota = Paginator(
-        anggotas.order_by("status_order", "nomor_anggota"),
-        10
+    # urutan_status + nomor_anggota ada di index → halaman langsung dari index
+    paginator_anggota = PaginatorAnggota(
+        anggotas.order_by("urutan_status", "nomor_anggota"),
+        10,
+        cache_key="kelola_akun:jumlah:" + quote(search_anggota.strip().lower()),
     )
     anggotas_page = paginator_anggota.get_page(
         request.GET.get("page_anggota", 1)
     )
 
-    return render(request, "kelola_akun/kelola_akun.html", {
+    return render(request, "Kelola_akun/kelola_akun.html", {
         "admins": admins_page,
         "anggotas": anggotas_page,
         "searchAdmin": search_admin,
@@ -127,6 +127,7 @@ def kelola_akun(request):
 # ===============================
 # CRUD ADMIN (KETUA / SEKRETARIS / BENDAHARA)
 # ===============================
+@query_budget(get=4, post=6)
 @login_required
 def tambah_admin(request):
     if request.user.role not in ROLE_ADMIN:
@@ -137,16 +138,17 @@ def tambah_admin(request):
         if form.is_valid():
             form.save()
             messages.success(request, "Admin berhasil ditambahkan.")
-            return redirect("kelola_akun", role=request.user.role)
+            return redirect("kelola_akun")
     else:
         form = AdminForm()
 
-    return render(request, "kelola_akun/Form/form_admin.html", {
+    return render(request, "Kelola_akun/Form/form_admin.html", {
         "form": form,
         "judul": "Tambah Admin"
     })
 
 
+@query_budget(get=5, post=7)
 @login_required
 def edit_admin(request, user_id):
     if request.user.role not in ROLE_ADMIN:
@@ -158,14 +160,15 @@ def edit_admin(request, user_id):
     if form.is_valid():
         form.save()
         messages.success(request, "Admin berhasil diperbarui.")
-        return redirect("kelola_akun", role=request.user.role)
+        return redirect("kelola_akun")
 
-    return render(request, "kelola_akun/Form/form_admin.html", {
+    return render(request, "Kelola_akun/Form/form_admin.html", {
         "form": form,
         "judul": "Edit Admin"
     })
 
 
+@query_budget(16)
 @login_required
 def hapus_admin(request, user_id):
     if request.user.role not in ROLE_ADMIN:
@@ -174,8 +177,9 @@ def hapus_admin(request, user_id):
     admin = get_object_or_404(User, id=user_id, role__in=ROLE_PENGURUS)
     admin.delete()
     messages.success(request, "Admin berhasil dihapus.")
-    return redirect("kelola_akun", role=request.user.role)
+    return redirect("kelola_akun")
 
+@query_budget(6)
 def detail_admin(request, user_id):
     admin = get_object_or_404(User, id=user_id)
 
@@ -185,12 +189,13 @@ def detail_admin(request, user_id):
         "admin": admin,
         "nomor_urut": nomor_urut,
     }
-    return render(request, "kelola_akun/detail/detail_admin.html", context)
+    return render(request, "Kelola_akun/detail/detail_admin.html", context)
 
 
 # ===============================
 # CRUD ANGGOTA
 # ===============================
+@query_budget(get=4, post=12)
 @login_required
 def tambah_anggota(request):
     if request.user.role not in ROLE_ADMIN:
@@ -201,16 +206,17 @@ def tambah_anggota(request):
         if form.is_valid():
             form.save()
             messages.success(request, "Anggota berhasil ditambahkan.")
-            return redirect("kelola_akun", role=request.user.role)
+            return redirect("kelola_akun")
     else:
         form = AnggotaForm()
 
-    return render(request, "kelola_akun/Form/form_anggota.html", {
+    return render(request, "Kelola_akun/Form/form_anggota.html", {
         "form": form,
         "judul": "Tambah Anggota"
     })
 
 
+@query_budget(get=5, post=8)
 @login_required
 def edit_anggota(request, nomor_anggota):
     if request.user.role not in ROLE_ADMIN:
@@ -222,14 +228,15 @@ def edit_anggota(request, nomor_anggota):
     if form.is_valid():
         form.save()
         messages.success(request, "Anggota berhasil diperbarui.")
-        return redirect("kelola_akun", role=request.user.role)
+        return redirect("kelola_akun")
 
-    return render(request, "kelola_akun/Form/form_anggota.html", {
+    return render(request, "Kelola_akun/Form/form_anggota.html", {
         "form": form,
         "judul": "Edit Anggota"
     })
 
 
+@query_budget(16)
 @login_required
 def hapus_anggota(request, nomor_anggota):
     if request.user.role not in ROLE_ADMIN:
@@ -238,137 +245,122 @@ def hapus_anggota(request, nomor_anggota):
     anggota = get_object_or_404(Anggota, nomor_anggota=nomor_anggota)
     anggota.delete()
     messages.success(request, "Anggota berhasil dihapus.")
-    return redirect("kelola_akun", role=request.user.role)
+    return redirect("kelola_akun")
 
+@query_budget(9)
+@login_required
 def detail_anggota(request, nomor_anggota):
-    anggota = get_object_or_404(Anggota, nomor_anggota=nomor_anggota)
+    if request.user.role not in ROLE_ADMIN:
+        return redirect("dashboard")
+
+    anggota = anggota_dengan_versi(nomor_anggota)
+    ringkasan = ringkasan_anggota(anggota)
+
+    # 🔹 layar front desk
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "anggota": {
+                "nomor_anggota": anggota.nomor_anggota,
+                "nama": anggota.nama,
+                "status": anggota.status,
+            },
+            **ringkasan,
+        })
 
     context = {
         "anggota": anggota,
+        "ringkasan": ringkasan,
     }
-    return render(request, "kelola_akun/detail/detail_anggota.html", context)
+    return render(request, "Kelola_akun/detail/detail_anggota.html", context)
 
 
 # ===============================
 # API VALIDASI
 # ===============================
+@query_budget(5)
 @login_required
 def cek_email(request):
-    email = request.GET.get("email", "")
     return JsonResponse({
-        "exists": Anggota.objects.filter(email=email).exists()
+        "exists": sudah_dipakai("email", request.GET.get("email", ""))
+    })
+
+
+@query_budget(5)
+@login_required
+def cek_unik(request):
+    """?kolom=email|nip|no_telp|nomor_anggota&nilai=...&kecuali=<nomor saat edit>"""
+    kolom = request.GET.get("kolom", "")
+    if kolom not in KOLOM_UNIK:
+        return JsonResponse({"error": "kolom tidak valid"}, status=400)
+
+    return JsonResponse({
+        "exists": sudah_dipakai(
+            kolom,
+            request.GET.get("nilai", ""),
+            kecuali=request.GET.get("kecuali") or None,
+        )
     })
 
 # ===============================
 # EXPORT EXCEL DATA ANGGOTA
 # ===============================
 
+@query_budget(5)
 @login_required
 def export_excel_anggota(request):
     if request.user.role not in ROLE_ADMIN:
         return redirect("dashboard")
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Daftar Anggota"
-
     headers = [
         "No. Anggota", "Nama", "NIP", "Alamat", "No. Telepon",
         "Email", "Jenis Kelamin", "Tanggal Daftar",
         "Status", "Tanggal Nonaktif", "Alasan Nonaktif"
     ]
-    ws.append(headers)
-
-    header_fill = PatternFill("solid", fgColor="FFFF00")
-    header_font = Font(bold=True)
-    border = Border(
-        left=Side(style="thin"), right=Side(style="thin"),
-        top=Side(style="thin"), bottom=Side(style="thin")
+    rows = per_baris(
+        Anggota.objects.values_list(
+            "nomor_anggota", "nama", "nip", "alamat", "no_telp", "email",
+            "jenis_kelamin", "tanggal_daftar", "status", "tanggal_nonaktif",
+            "alasan_nonaktif", named=True,
+        ),
+        ["nomor_anggota"],
     )
 
-    for cell in ws[1]:
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center")
-        cell.border = border
-
-    for anggota in Anggota.objects.all().order_by("nomor_anggota"):
-        ws.append([
-            anggota.nomor_anggota,
-            anggota.nama,
-            anggota.nip,
-            anggota.alamat,
-            anggota.no_telp,
-            anggota.email,
-            anggota.jenis_kelamin,
-            anggota.tanggal_daftar.strftime("%d-%m-%Y") if anggota.tanggal_daftar else "-",
-            anggota.status,
-            anggota.tanggal_nonaktif.strftime("%d-%m-%Y") if anggota.tanggal_nonaktif else "-",
-            anggota.alasan_nonaktif or "-"
-        ])
-
-    for col in ws.columns:
-        ws.column_dimensions[col[0].column_letter].width = 18
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = 'attachment; filename="anggota_koperasi.xlsx"'
-    wb.save(response)
-    return response
+    return export_response(request, "anggota_koperasi", headers, rows, "Daftar Anggota")
 
 # ===============================
 # EXPORT PDF DATA ANGGOTA
 # ===============================
 
+@query_budget(5)
 @login_required
 def export_pdf_anggota(request):
     if request.user.role not in ROLE_ADMIN:
         return redirect("dashboard")
 
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="anggota_koperasi.pdf"'
-
-    doc = SimpleDocTemplate(
-        response,
-        pagesize=landscape(A4),
-        leftMargin=20, rightMargin=20, topMargin=30, bottomMargin=20
-    )
+    # cache per versi data anggota, berlaku sampai hari berganti
+    key = f"daftar_anggota_pdf:{versi_anggota()}:{date.today():%Y%m%d}"
+    pdf = caches["laporan"].get(key)
+
+    if pdf is None:
+        def fmt(tanggal):
+            return tanggal.strftime("%d-%m-%Y") if tanggal else "-"
+
+        rows = (
+            (nomor, nama, nip, alamat, telp, email, jk, fmt(daftar), status, fmt(nonaktif), alasan)
+            for nomor, nama, nip, alamat, telp, email, jk, daftar, status, nonaktif, alasan in per_baris(
+                Anggota.objects.values_list(
+                    "nomor_anggota", "nama", "nip", "alamat", "no_telp", "email",
+                    "jenis_kelamin", "tanggal_daftar", "status", "tanggal_nonaktif",
+                    "alasan_nonaktif", named=True,
+                ),
+                ["nomor_anggota"],
+            )
+        )
+        pdf = render_daftar_anggota(rows)
+        caches["laporan"].set(key, pdf, 60 * 60 * 24)
 
-    styles = getSampleStyleSheet()
-    normal = styles["Normal"]
-    normal.fontSize = 7
-
-    data = [[
-        "No. Anggota", "Nama", "NIP", "Alamat", "No. Telp",
-        "Email", "JK", "Tgl Daftar", "Status", "Tgl Nonaktif", "Alasan"
-    ]]
-
-    for a in Anggota.objects.all().order_by("nomor_anggota"):
-        data.append([
-            a.nomor_anggota,
-            Paragraph(a.nama or "-", normal),
-            a.nip or "-",
-            Paragraph(a.alamat or "-", normal),
-            a.no_telp or "-",
-            Paragraph(a.email or "-", normal),
-            a.jenis_kelamin,
-            a.tanggal_daftar.strftime("%d-%m-%Y") if a.tanggal_daftar else "-",
-            a.status,
-            a.tanggal_nonaktif.strftime("%d-%m-%Y") if a.tanggal_nonaktif else "-",
-            Paragraph(a.alasan_nonaktif or "-", normal),
-        ])
-
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.yellow),
-        ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
-        ("FONT", (0,0), (-1,0), "Helvetica-Bold"),
-        ("FONTSIZE", (0,0), (-1,-1), 7),
-        ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
-    ]))
-
-    doc.build([table])
+    response = HttpResponse(pdf, content_type="application/pdf")
+    response["Content-Disposition"] = 'attachment; filename="anggota_koperasi.pdf"'
     return response
 
 
@@ -376,109 +368,44 @@ def export_pdf_anggota(request):
 # IMPORT EXCEL DATA ANGGOTA
 # ===============================
 
+@query_budget(get=4, post=5)
 @login_required
 def import_excel_anggota(request):
     if request.user.role not in ROLE_ADMIN:
         return redirect("dashboard")
 
     if request.method == "POST" and request.FILES.get("excel_file"):
-        try:
-            wb = load_workbook(request.FILES["excel_file"], data_only=True)
-            ws = wb.active
-        except Exception:
-            messages.error(request, "File Excel tidak bisa dibaca")
+        upload = request.FILES["excel_file"]
+        if not upload.name.lower().endswith(".xlsx"):
+            messages.error(request, "File harus berformat .xlsx")
             return redirect("kelola_akun")
 
-        sukses = 0
-        gagal = 0
-
-        # mulai dari baris ke-4 (header sampai baris 3)
-        for idx, row in enumerate(ws.iter_rows(min_row=4), start=4):
-            try:
-                # ===== NOMOR ANGGOTA =====
-                nomor_anggota = str(row[1].value).strip() if row[1].value else None
-                nama = row[2].value
-
-                if not nomor_anggota or not nama:
-                    continue
-
-                # hanya format NA xxx
-                if not re.match(r"^NA\s*\d+", nomor_anggota):
-                    continue
-
-                # ===== JENIS KELAMIN =====
-                jk_excel = str(row[4].value).strip().upper() if row[4].value else ""
-
-                if jk_excel == "L":
-                    jenis_kelamin = "Laki-laki"
-                elif jk_excel == "P":
-                    jenis_kelamin = "Perempuan"
-                else:
-                    jenis_kelamin = "Laki-laki"
-
-                # ===== UMUR =====
-                umur = row[3].value if isinstance(row[3].value, int) else None
-
-                # ===== PEKERJAAN =====
-                pekerjaan = row[5].value or "-"
-
-                # ===== ALAMAT =====
-                alamat = row[6].value or "-"
-
-                # ===== TANGGAL DAFTAR =====
-                tgl_daftar = row[8].value
-                if isinstance(tgl_daftar, datetime):
-                    tgl_daftar = tgl_daftar.date()
-                else:
-                    tgl_daftar = date.today()
-
-                # ===== TANGGAL NONAKTIF =====
-                tgl_nonaktif = row[12].value
-                if isinstance(tgl_nonaktif, datetime):
-                    tgl_nonaktif = tgl_nonaktif.date()
-                else:
-                    tgl_nonaktif = None
-
-                # ===== ALASAN NONAKTIF =====
-                alasan_nonaktif = row[13].value or "-"
-
-                # ===== SIMPAN / UPDATE =====
-                anggota, created = Anggota.objects.update_or_create(
-                    nomor_anggota=nomor_anggota,
-                    defaults={
-                        "nama": nama,
-                        "umur": umur,
-                        "jenis_kelamin": jenis_kelamin,
-                        "pekerjaan": pekerjaan,
-                        "alamat": alamat,
-                        "tanggal_daftar": tgl_daftar,
-                        "tanggal_nonaktif": tgl_nonaktif,
-                        "status": "nonaktif" if tgl_nonaktif else "aktif",
-                        "alasan_nonaktif": alasan_nonaktif,
-
-                        # kolom yang tidak ada di Excel
-                        "nip": "-",
-                        "no_telp": "-",
-                        "email": "-",
-                    }
-                )
-
-                # 🔐 PASSWORD DEFAULT (HANYA JIKA BARU)
-                if created:
-                    anggota.set_password("12345")
-                    anggota.save()
-
-                sukses += 1
-
-            except Exception as e:
-                gagal += 1
-                # print(f"Error baris {idx}: {e}")
-
-        messages.success(
-            request,
-            f"Import selesai: {sukses} berhasil, {gagal} gagal"
-        )
-        return redirect("kelola_akun")
+        # diproses di background, progres bisa dipantau
+        job = mulai_import(upload, request.user)
+        return redirect("status_import_anggota", job_id=job.pk)
 
     messages.error(request, "File Excel tidak valid")
-    return redirect("kelola_akun")
\ No newline at end of file
+    return redirect("kelola_akun")
+
+
+@query_budget(5)
+@login_required
+def status_import_anggota(request, job_id):
+    if request.user.role not in ROLE_ADMIN:
+        return redirect("dashboard")
+
+    job = get_object_or_404(ImportAnggota, pk=job_id)
+    # thread import mati (worker restart) → jangan refresh selamanya
+    job.tandai_jika_macet()
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "status": job.status,
+            "baris_diproses": job.baris_diproses,
+            "jumlah_baru": job.jumlah_baru,
+            "jumlah_update": job.jumlah_update,
+            "jumlah_gagal": job.jumlah_gagal,
+            "pesan": job.pesan,
+        })
+
+    return render(request, "Kelola_akun/import_status.html", {"job": job})
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Server-Timing per request: jumlah query, waktu DB, waktu render template
+dan total, dikirim sebagai header `Server-Timing` (terlihat di tab
+Network / Timing browser).
+
+Aktif kalau settings.SERVER_TIMING bernilai True (default: DEBUG).
+Kalau view punya @query_budget dan jumlah query melebihi budget untuk
+method request-nya, request dicatat sebagai warning di logger
+"koperasi.query_budget".
+
+Response streaming (export Excel/PDF/CSV) baru menjalankan query saat
+isinya dikirim, setelah middleware selesai: header-nya hanya berisi
+waktu sampai view return (desc="streaming") dan budget tidak dicek.
+"""
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+
+from .query_budget import budget_untuk
+
+logger = logging.getLogger("koperasi.query_budget")
+
+# total detik render template untuk request yang sedang berjalan
+_waktu_template = ContextVar("waktu_template", default=None)
+
+
+def _pasang_pengukur_template():
+    """Bungkus Template.render backend Django sekali saja (include tidak dihitung dobel)."""
+    if getattr(DjangoTemplate.render, "_diukur", False):
+        return
+
+    render_asli = DjangoTemplate.render
+
+    def render(self, *args, **kwargs):
+        total = _waktu_template.get()
+        if total is None:
+            return render_asli(self, *args, **kwargs)
+
+        mulai = time.perf_counter()
+        try:
+            return render_asli(self, *args, **kwargs)
+        finally:
+            total[0] += time.perf_counter() - mulai
+
+    render._diukur = True
+    DjangoTemplate.render = render
+
+
+class _PencatatQuery:
+    def __init__(self):
+        self.jumlah = 0
+        self.detik = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        mulai = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.jumlah += 1
+            self.detik += time.perf_counter() - mulai
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.aktif = getattr(settings, "SERVER_TIMING", settings.DEBUG)
+        _pasang_pengukur_template()
+
+    def __call__(self, request):
+        if not self.aktif:
+            return self.get_response(request)
+
+        pencatat = _PencatatQuery()
+        waktu_template = [0.0]
+        token = _waktu_template.set(waktu_template)
+        mulai = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                # execute_wrapper tidak membuka koneksi, aman untuk semua alias
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(pencatat))
+                response = self.get_response(request)
+        finally:
+            _waktu_template.reset(token)
+        total = time.perf_counter() - mulai
+
+        if response.streaming:
+            response["Server-Timing"] = f'total;desc="streaming";dur={total * 1000:.1f}'
+            return response
+
+        response["Server-Timing"] = ", ".join([
+            f'db;desc="{pencatat.jumlah} query";dur={pencatat.detik * 1000:.1f}',
+            f"tpl;dur={waktu_template[0] * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+
+        view = getattr(getattr(request, "resolver_match", None), "func", None)
+        budget = budget_untuk(view, request.method)
+        if budget is not None and pencatat.jumlah > budget:
+            logger.warning(
+                "%s %s: %d query melebihi budget %d",
+                request.method, request.path, pencatat.jumlah, budget,
+            )
+        return response
@@ -0,0 +1,74 @@
+"""
+Budget jumlah query per view.
+
+    @query_budget(6)
+    @login_required
+    def daftar_simpanan(request): ...
+
+    @query_budget(get=7, post=32)
+    @login_required
+    def tambah_simpanan(request): ...
+
+Budget per method: `post` dipakai untuk POST (simpan form), kalau tidak
+diisi POST memakai budget GET. HEAD ikut GET.
+
+Budget dibaca ServerTimingMiddleware (warning di log kalau terlewati) dan
+oleh QueryBudgetMixin di test, yang membuat test gagal kalau view
+menjalankan query lebih banyak dari budgetnya.
+
+Budget sudah termasuk query session + user untuk request yang login.
+Response streaming (export) menjalankan query-nya setelah view selesai,
+jadi hanya terhitung di test (isi response dibaca habis), tidak di
+middleware.
+"""
+from importlib import import_module
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+def query_budget(get, post=None):
+    def decorator(view):
+        view.query_budget = {"GET": get, "POST": get if post is None else post}
+        return view
+    return decorator
+
+
+def budget_untuk(view, method):
+    """Budget view untuk method request, None kalau view tidak punya budget."""
+    budget = getattr(view, "query_budget", None)
+    if budget is None:
+        return None
+    return budget.get("GET" if method == "HEAD" else method)
+
+
+def view_tanpa_budget(urlconf):
+    """Nama URL di modul urls (mis. "anggota.urls") yang view-nya belum punya @query_budget."""
+    return [
+        p.name or str(p.pattern)
+        for p in import_module(urlconf).urlpatterns
+        if getattr(p.callback, "query_budget", None) is None
+    ]
+
+
+class QueryBudgetMixin:
+    """Mixin untuk TestCase: assertDalamBudget(url) memakai budget view-nya."""
+
+    def assertDalamBudget(self, url, method="get", data=None, **extra):
+        view = resolve(url.split("?")[0]).func
+        budget = budget_untuk(view, method.upper())
+        self.assertIsNotNone(budget, f"{url}: view belum punya @query_budget")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, **extra)
+            # export streaming baru menjalankan query saat dibaca
+            if response.streaming:
+                b"".join(response.streaming_content)
+
+        self.assertLessEqual(
+            len(queries), budget,
+            f"{method.upper()} {url}: {len(queries)} query, budget {budget}\n"
+            + "\n".join(q["sql"] for q in queries.captured_queries)
+        )
+        return response
@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # paling luar: header Server-Timing mengukur seluruh request (lihat SERVER_TIMING)
+    'koperasi.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +59,9 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
 ]
 
+# kirim header Server-Timing hanya saat development
+SERVER_TIMING = DEBUG
+
 
 ROOT_URLCONF = 'koperasi.urls'
 
@@ -99,6 +104,27 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # hasil laporan (PDF rekening koran, dll) — key sudah berversi,
+    # jadi tidak perlu kedaluwarsa
+    'laporan': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'laporan',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
+
+# Jumlah proses untuk render rekening koran massal (None = jumlah CPU)
+REKENING_KORAN_WORKERS = None
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
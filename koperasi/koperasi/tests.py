@@ -0,0 +1,281 @@
+import datetime
+from decimal import Decimal
+from urllib.parse import quote
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from admin_koperasi.models import User
+from anggota.models import Anggota, ImportAnggota
+from pinjaman.models import JenisPinjaman, KategoriJasa, Pinjaman
+from pinjaman.services import buat_jadwal
+from simpanan.models import JenisSimpanan, Simpanan
+from .query_budget import QueryBudgetMixin, view_tanpa_budget
+
+APP_DENGAN_BUDGET = ["anggota.urls", "simpanan.urls", "pinjaman.urls", "admin_koperasi.urls"]
+
+
+# ======================================================
+# SEMUA URL APP PUNYA @query_budget
+# ======================================================
+class BudgetTerdaftarTest(TestCase):
+    def test_semua_view_punya_budget(self):
+        for urlconf in APP_DENGAN_BUDGET:
+            with self.subTest(urlconf=urlconf):
+                self.assertEqual(view_tanpa_budget(urlconf), [])
+
+
+# ======================================================
+# DATA > 1 HALAMAN SUPAYA N+1 PER BARIS KETAHUAN
+# ======================================================
+class DataKoperasiTestCase(QueryBudgetMixin, TestCase):
+    JUMLAH_ANGGOTA = 15
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bendahara = User.objects.create_user("bendahara", password="x", role="bendahara")
+        cls.admin = User.objects.create_user("admin", password="x", role="admin")
+
+        jenis = [JenisSimpanan.objects.create(nama_jenis=n) for n, _ in JenisSimpanan.JENIS_CHOICES]
+        cls.jenis_simpanan = jenis[0]
+        jenis_pinjaman = JenisPinjaman.objects.create(nama_jenis="Reguler")
+        kategori = KategoriJasa.objects.create(kategori_jasa="Umum")
+
+        hari_ini = datetime.date.today()
+        cls.anggota = []
+        for i in range(1, cls.JUMLAH_ANGGOTA + 1):
+            anggota = Anggota.objects.create(
+                nomor_anggota=f"NA {i}",
+                nama=f"Anggota {i}",
+                jenis_kelamin="Laki-laki",
+            )
+            cls.anggota.append(anggota)
+            for j in jenis:
+                Simpanan.objects.create(
+                    anggota=anggota, admin=cls.bendahara, jenis_simpanan=j,
+                    jumlah=Decimal("100000"), tanggal=hari_ini,
+                )
+            pinjaman = Pinjaman.objects.create(
+                nomor_anggota=anggota,
+                id_jenis_pinjaman=jenis_pinjaman,
+                id_kategori_jasa=kategori,
+                id_admin=cls.bendahara,
+                jumlah_pinjaman=Decimal("1200000"),
+                angsuran_per_bulan=Decimal("100000"),
+                jasa_rupiah=Decimal("10000"),
+                tanggal_meminjam=hari_ini,
+                jatuh_tempo=12,
+                sisa_pinjaman=Decimal("1200000"),
+                status="aktif",
+            )
+            buat_jadwal(pinjaman)
+        cls.pinjaman = pinjaman
+
+        cls.job = ImportAnggota.objects.create(nama_file="anggota.xlsx", dibuat_oleh=cls.bendahara)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.bendahara)
+        self.hari_ini = datetime.date.today()
+
+
+# ======================================================
+# JUMLAH QUERY TIAP HALAMAN (GET) TIDAK MELEBIHI BUDGET
+# ======================================================
+class QueryBudgetTest(DataKoperasiTestCase):
+    def test_anggota(self):
+        nomor = quote(self.anggota[0].pk)
+        hapus = Anggota.objects.create(nomor_anggota="NA 99", nama="Hapus", jenis_kelamin="Laki-laki")
+        admin_lain = User.objects.create_user("hapus", password="x", role="sekretaris")
+
+        for url in [
+            "/anggota/",
+            "/anggota/?searchAnggota=anggota&page_anggota=2",
+            "/anggota/tambah/admin/",
+            f"/anggota/edit/admin/{self.bendahara.pk}/",
+            f"/anggota/detail/admin/{self.bendahara.pk}/",
+            "/anggota/tambah/anggota/",
+            f"/anggota/edit/anggota/{nomor}/",
+            f"/anggota/detail/anggota/{nomor}/",
+            f"/anggota/detail/anggota/{nomor}/?format=json",
+            "/anggota/export/excel/",
+            "/anggota/export/pdf/",
+            "/anggota/import/excel/",
+            f"/anggota/import/excel/{self.job.pk}/",
+            "/anggota/cek/email/?email=a@b.c",
+            "/anggota/cek/unik/?kolom=nip&nilai=123",
+            f"/anggota/hapus/anggota/{quote(hapus.pk)}/",
+            f"/anggota/hapus/admin/{admin_lain.pk}/",
+        ]:
+            with self.subTest(url=url):
+                self.assertDalamBudget(url)
+
+    def test_simpanan(self):
+        nomor = quote(self.anggota[0].pk)
+        jenis = self.jenis_simpanan.pk
+
+        for url in [
+            "/simpanan/",
+            "/simpanan/?search=anggota&sort=nama&page=2",
+            "/simpanan/tambah/",
+            "/simpanan/tambah/batch/",
+            f"/simpanan/cek-dana-sosial/?anggota={nomor}&jenis={jenis}&tanggal=2026-01-10",
+            "/simpanan/autocomplete-anggota/?term=angg",
+            "/simpanan/export/",
+            f"/simpanan/export/riwayat/?anggota={nomor}",
+            f"/simpanan/{nomor}/",
+            f"/simpanan/penarikan/{nomor}/{jenis}/",
+            f"/simpanan/detail/{nomor}/{jenis}/",
+        ]:
+            with self.subTest(url=url):
+                self.assertDalamBudget(url)
+
+    def test_pinjaman(self):
+        for url in [
+            "/pinjaman/",
+            "/pinjaman/?aktif=1&sort=nama&page=2",
+            "/pinjaman/tambah/",
+            "/pinjaman/export/",
+            "/pinjaman/tagihan/",
+            "/pinjaman/tagihan/posting/",
+            f"/pinjaman/{self.pinjaman.pk}/bayar/",
+            "/pinjaman/autocomplete-anggota/?term=na",
+        ]:
+            with self.subTest(url=url):
+                self.assertDalamBudget(url)
+
+    def test_admin_koperasi(self):
+        self.client.force_login(self.admin)
+        for url in [
+            "/admin/dashboard/",
+            "/admin/pengurus/tambah/",
+            "/admin/logout/",
+            "/admin/login/",
+        ]:
+            with self.subTest(url=url):
+                self.assertDalamBudget(url)
+
+
+# ======================================================
+# POST (SIMPAN FORM) MEMAKAI BUDGET POST VIEW-NYA
+# ======================================================
+class QueryBudgetPostTest(DataKoperasiTestCase):
+    def assertPostDalamBudget(self, url, data):
+        response = self.assertDalamBudget(url, "post", data)
+        # hanya jalur simpan yang berhasil (redirect) yang diukur
+        self.assertEqual(response.status_code, 302, f"POST {url} tidak redirect")
+        return response
+
+    def _data_anggota(self, nomor, nama):
+        return {
+            "nomor_anggota": nomor,
+            "nama": nama,
+            "jenis_kelamin": "Laki-laki",
+            "tanggal_daftar": self.hari_ini.isoformat(),
+            "status": "aktif",
+        }
+
+    def test_anggota(self):
+        sekretaris = User.objects.create_user("sekretaris", password="x", role="sekretaris")
+        upload = SimpleUploadedFile("anggota.xlsx", b"bukan excel, tidak diproses di test")
+
+        for url, data in [
+            ("/anggota/tambah/admin/", {"username": "ketua", "role": "ketua", "password": "x"}),
+            (f"/anggota/edit/admin/{sekretaris.pk}/", {"username": "sekretaris2", "role": "sekretaris"}),
+            ("/anggota/tambah/anggota/", {
+                **self._data_anggota("NA 50", "Anggota Baru"),
+                "email": "baru@koperasi.id", "nip": "1985", "no_telp": "0812",
+            }),
+            (f"/anggota/edit/anggota/{quote(self.anggota[0].pk)}/",
+             self._data_anggota(self.anggota[0].pk, "Anggota Diubah")),
+            ("/anggota/import/excel/", {"excel_file": upload}),
+        ]:
+            with self.subTest(url=url):
+                self.assertPostDalamBudget(url, data)
+
+    def test_simpanan(self):
+        nomor = self.anggota[0].pk
+        bulan_depan = self.hari_ini.replace(day=1) + datetime.timedelta(days=32)
+        jenis = JenisSimpanan.objects.get(nama_jenis=JenisSimpanan.SUKARELA)
+        wajib = JenisSimpanan.objects.get(nama_jenis=JenisSimpanan.WAJIB)
+        setoran = "nomor_anggota,jenis,jumlah,dana_sosial,tanggal\n" + "\n".join(
+            f"{a.pk},SUKARELA,50000,0,{self.hari_ini}" for a in self.anggota
+        )
+
+        for url, data in [
+            # wajib bulan depan: jalur terberat (cek + catat dana sosial)
+            ("/simpanan/tambah/", {
+                "anggota": nomor, "jenis_simpanan": wajib.pk,
+                "tanggal": bulan_depan.isoformat(), "jumlah": "50000", "dana_sosial": "5000",
+            }),
+            ("/simpanan/tambah/batch/", {
+                "file": SimpleUploadedFile("setoran.csv", setoran.encode()),
+            }),
+            (f"/simpanan/penarikan/{quote(nomor)}/{jenis.pk}/", {
+                "tanggal": self.hari_ini.isoformat(), "jumlah": "10000",
+            }),
+        ]:
+            with self.subTest(url=url):
+                self.assertPostDalamBudget(url, data)
+
+    def test_pinjaman(self):
+        jenis = JenisPinjaman.objects.get()
+        kategori = KategoriJasa.objects.get()
+        bulan_depan = self.hari_ini.replace(day=1) + datetime.timedelta(days=32)
+
+        for url, data in [
+            ("/pinjaman/tambah/", {
+                "nomor_anggota": self.anggota[1].pk,
+                "id_jenis_pinjaman": jenis.pk,
+                "id_kategori_jasa": kategori.pk,
+                "tanggal_meminjam": self.hari_ini.isoformat(),
+                "jatuh_tempo": 12,
+                "jumlah_pinjaman": "600000",
+                "angsuran_per_bulan": "50000",
+                "jasa_persen": "1",
+                "jasa_rupiah": "6000",
+            }),
+            (f"/pinjaman/{self.pinjaman.pk}/bayar/", {
+                "tipe_bayar": "cicilan", "tanggal_bayar": self.hari_ini.isoformat(),
+            }),
+            ("/pinjaman/tagihan/posting/", {
+                "bulan": f"{bulan_depan:%Y-%m}", "tanggal_bayar": self.hari_ini.isoformat(),
+            }),
+        ]:
+            with self.subTest(url=url):
+                self.assertPostDalamBudget(url, data)
+
+    def test_admin_koperasi(self):
+        self.client.force_login(self.admin)
+        self.assertPostDalamBudget(
+            "/admin/pengurus/tambah/",
+            {"username": "pengurus", "password": "x", "role": "ketua"},
+        )
+
+        self.client.logout()
+        self.assertPostDalamBudget("/admin/login/", {"username": "admin", "password": "x"})
+
+
+# ======================================================
+# HEADER SERVER-TIMING
+# ======================================================
+@override_settings(SERVER_TIMING=True)
+class ServerTimingTest(DataKoperasiTestCase):
+    def test_header_dan_warning_budget_per_method(self):
+        response = self.client.get("/simpanan/tambah/")
+        self.assertRegex(response["Server-Timing"], r'^db;desc="\d+ query";dur=')
+
+        # POST wajib (20 query) melebihi budget GET tapi tidak budget POST
+        wajib = JenisSimpanan.objects.get(nama_jenis=JenisSimpanan.WAJIB)
+        with self.assertNoLogs("koperasi.query_budget", "WARNING"):
+            response = self.client.post("/simpanan/tambah/", {
+                "anggota": self.anggota[0].pk, "jenis_simpanan": wajib.pk,
+                "tanggal": self.hari_ini.isoformat(), "jumlah": "50000", "dana_sosial": "5000",
+            })
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_streaming_tidak_diukur(self):
+        response = self.client.get("/simpanan/export/")
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Server-Timing"].split(";")[:2], ["total", 'desc="streaming"'])
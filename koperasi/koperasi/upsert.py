@@ -0,0 +1,79 @@
+"""
+Upsert baris rekap: satu INSERT ... ON CONFLICT DO UPDATE (PostgreSQL,
+SQLite) / INSERT ... ON DUPLICATE KEY UPDATE (MySQL) per batch.
+
+    upsert(
+        SaldoSimpanan, ["anggota_id", "jenis_simpanan_id"],
+        [{"anggota_id": "NA 1", "jenis_simpanan_id": 2, "total_setor": 50000, ...}],
+        {"total_setor": TAMBAH, "saldo": TAMBAH},
+    )
+
+Baris yang belum ada di-INSERT dengan nilainya; baris yang sudah ada
+diubah oleh database menurut `ubah` (lama + baru, lama | baru, nilai
+terbesar), jadi tidak perlu get_or_create / SELECT ... FOR UPDATE dulu
+dan tetap aman dipanggil bersamaan dari beberapa teller.
+"""
+from django.db import connection
+
+TAMBAH = "tambah"  # lama + baru
+BITOR = "bitor"    # lama | baru
+MAKS = "maks"      # nilai terbesar, lama boleh NULL
+
+_RUMUS = {
+    TAMBAH: "{lama} + {baru}",
+    BITOR: "{lama} | {baru}",
+    MAKS: "{maks}(COALESCE({lama}, {baru}), {baru})",
+}
+
+
+def upsert(model, kunci, baris, ubah, batch_size=500):
+    """
+    kunci: field (attname) constraint unik yang menentukan konflik.
+    baris: list dict {attname: nilai}, semua dengan key yang sama dan
+           kombinasi kunci tidak kembar.
+    ubah: {attname: TAMBAH | BITOR | MAKS} untuk baris yang sudah ada.
+    """
+    if not baris:
+        return
+
+    qn = connection.ops.quote_name
+    meta = model._meta
+    tabel = qn(meta.db_table)
+    nama_kolom = list(baris[0])
+    fields = [meta.get_field(nama) for nama in nama_kolom]
+    mysql = connection.vendor == "mysql"
+
+    set_kolom = []
+    for nama, rumus in ubah.items():
+        kolom = qn(meta.get_field(nama).column)
+        set_kolom.append(f"{kolom} = " + _RUMUS[rumus].format(
+            lama=kolom if mysql else f"{tabel}.{kolom}",
+            baru=f"VALUES({kolom})" if mysql else f"EXCLUDED.{kolom}",
+            maks="MAX" if connection.vendor == "sqlite" else "GREATEST",
+        ))
+
+    if mysql:
+        konflik = "ON DUPLICATE KEY UPDATE "
+    else:
+        target = ", ".join(qn(meta.get_field(nama).column) for nama in kunci)
+        konflik = f"ON CONFLICT ({target}) DO UPDATE SET "
+    konflik += ", ".join(set_kolom)
+
+    # urutan kunci tetap → dua teller yang menulis beberapa baris yang
+    # sama mengunci dengan urutan yang sama (tidak deadlock)
+    baris = sorted(baris, key=lambda b: tuple(b[nama] for nama in kunci))
+    kolom = ", ".join(qn(f.column) for f in fields)
+    placeholder = "(" + ", ".join(["%s"] * len(fields)) + ")"
+
+    with connection.cursor() as cursor:
+        for i in range(0, len(baris), batch_size):
+            batch = baris[i:i + batch_size]
+            cursor.execute(
+                f"INSERT INTO {tabel} ({kolom}) "
+                f"VALUES {', '.join([placeholder] * len(batch))} {konflik}",
+                [
+                    f.get_db_prep_save(b[nama], connection)
+                    for b in batch
+                    for nama, f in zip(nama_kolom, fields)
+                ],
+            )
@@ -0,0 +1,155 @@
+"""
+Export daftar ke Excel / CSV dengan memori tetap.
+
+- CSV: baris ditulis langsung ke response (StreamingHttpResponse)
+- Excel: openpyxl write-only ke file sementara di disk, lalu dikirim
+  per potong lewat FileResponse
+
+Baris diambil per halaman dengan keyset pagination (per_baris /
+per_halaman): setiap halaman satu query `WHERE (urutan) > (baris
+terakhir) ORDER BY urutan LIMIT n`. queryset.iterator() tidak cukup di
+MySQL karena driver-nya menampung seluruh hasil query di memori client.
+"""
+import csv
+import tempfile
+from datetime import date, datetime
+
+from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+CHUNK_SIZE = 2000
+
+CONTENT_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+HEADER_FILL = PatternFill("solid", fgColor="FFFF00")
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(
+    left=Side(style="thin"), right=Side(style="thin"),
+    top=Side(style="thin"), bottom=Side(style="thin")
+)
+
+
+def _setelah(urutan, nilai):
+    """Q untuk (urutan) > (nilai), urutan ascending."""
+    kondisi = Q(**{f"{urutan[-1]}__gt": nilai[-1]})
+    for field, value in zip(reversed(urutan[:-1]), reversed(nilai[:-1])):
+        kondisi = Q(**{f"{field}__gt": value}) | (Q(**{field: value}) & kondisi)
+    return kondisi
+
+
+def per_halaman(queryset, urutan=("pk",), size=CHUNK_SIZE):
+    """
+    Keyset pagination: generator list baris per `size`.
+
+    `urutan` = field ascending (tidak NULL), field terakhir harus unik.
+    Field urutan harus bisa dibaca dari baris: atribut model, atau nama
+    kolom values_list(..., named=True) / values().
+    """
+    urutan = list(urutan)
+    queryset = queryset.order_by(*urutan)
+    halaman = queryset
+
+    while True:
+        chunk = list(halaman[:size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < size:
+            return
+
+        terakhir = chunk[-1]
+        if isinstance(terakhir, dict):
+            nilai = [terakhir[f] for f in urutan]
+        else:
+            nilai = [getattr(terakhir, f) for f in urutan]
+        halaman = queryset.filter(_setelah(urutan, nilai))
+
+
+def per_baris(queryset, urutan=("pk",), size=CHUNK_SIZE):
+    """Seperti per_halaman, tapi yield baris satu per satu."""
+    for chunk in per_halaman(queryset, urutan, size):
+        yield from chunk
+
+
+def _nilai(value):
+    if isinstance(value, datetime):
+        return value.strftime("%d-%m-%Y %H:%M")
+    if isinstance(value, date):
+        return value.strftime("%d-%m-%Y")
+    if value is None:
+        return "-"
+    return value
+
+
+# ======================
+# CSV
+# ======================
+class _Echo:
+    """Pseudo-buffer: csv.writer menulis ke sini, hasilnya langsung di-yield."""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(nama_file, header, rows):
+    writer = csv.writer(_Echo())
+
+    def _baris():
+        # BOM supaya Excel membaca UTF-8 dengan benar
+        yield "\ufeff" + writer.writerow(header)
+        for row in rows:
+            yield writer.writerow([_nilai(v) for v in row])
+
+    response = StreamingHttpResponse(_baris(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{nama_file}.csv"'
+    return response
+
+
+# ======================
+# EXCEL
+# ======================
+def _header(ws, header):
+    cells = []
+    for judul in header:
+        cell = WriteOnlyCell(ws, value=judul)
+        cell.fill = HEADER_FILL
+        cell.font = HEADER_FONT
+        cell.alignment = Alignment(horizontal="center")
+        cell.border = HEADER_BORDER
+        cells.append(cell)
+    ws.append(cells)
+
+
+def export_xlsx(nama_file, sheets, lebar_kolom=18):
+    """sheets = [(judul_sheet, header, rows), ...]"""
+    wb = Workbook(write_only=True)
+
+    for judul, header, rows in sheets:
+        ws = wb.create_sheet(judul[:31])
+        for i in range(1, len(header) + 1):
+            ws.column_dimensions[get_column_letter(i)].width = lebar_kolom
+        _header(ws, header)
+        for row in rows:
+            ws.append([_nilai(v) for v in row])
+
+    tmp = tempfile.TemporaryFile()
+    wb.save(tmp)
+    tmp.seek(0)
+
+    return FileResponse(
+        tmp,
+        as_attachment=True,
+        filename=f"{nama_file}.xlsx",
+        content_type=CONTENT_TYPE_XLSX,
+    )
+
+
+def export_response(request, nama_file, header, rows, judul_sheet="Data"):
+    """?format=csv → CSV, selain itu Excel."""
+    if request.GET.get("format") == "csv":
+        return export_csv(nama_file, header, rows)
+    return export_xlsx(nama_file, [(judul_sheet, header, rows)])
@@ -0,0 +1,69 @@
+from django import forms
+import datetime
+from decimal import Decimal, InvalidOperation
+
+
+class TutupBukuForm(forms.Form):
+    periode = forms.DateField(
+        input_formats=["%Y-%m"],
+        widget=forms.DateInput(
+            attrs={"type": "month", "class": "form-control"},
+            format="%Y-%m"
+        )
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # bulan lalu: bulan berjalan belum bisa ditutup
+        bulan_ini = datetime.date.today().replace(day=1)
+        self.fields["periode"].initial = (bulan_ini - datetime.timedelta(days=1)).replace(day=1)
+
+
+class SHUForm(forms.Form):
+    tahun = forms.IntegerField(
+        min_value=2000,
+        max_value=2100,
+        widget=forms.NumberInput(attrs={"class": "form-control"})
+    )
+    total_shu = forms.CharField(
+        label="SHU bagian anggota",
+        widget=forms.TextInput(attrs={"class": "form-control rupiah-input"})
+    )
+    persen_jasa_simpanan = forms.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        min_value=0,
+        max_value=100,
+        widget=forms.NumberInput(attrs={"class": "form-control", "step": "0.01"})
+    )
+    persen_jasa_pinjaman = forms.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        min_value=0,
+        max_value=100,
+        widget=forms.NumberInput(attrs={"class": "form-control", "step": "0.01"})
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["tahun"].initial = datetime.date.today().year - 1
+        self.fields["persen_jasa_simpanan"].initial = 50
+        self.fields["persen_jasa_pinjaman"].initial = 50
+
+    def clean_total_shu(self):
+        value = self.cleaned_data.get("total_shu")
+        try:
+            total = Decimal(str(value).replace(".", "").replace(",", ""))
+        except InvalidOperation:
+            raise forms.ValidationError("Jumlah SHU tidak valid.")
+        if total <= 0:
+            raise forms.ValidationError("Jumlah SHU harus lebih dari 0.")
+        return total
+
+    def clean(self):
+        cleaned = super().clean()
+        simpanan = cleaned.get("persen_jasa_simpanan") or 0
+        pinjaman = cleaned.get("persen_jasa_pinjaman") or 0
+        if simpanan + pinjaman > 100:
+            raise forms.ValidationError("Total persentase jasa melebihi 100%.")
+        return cleaned
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('anggota', '0004_alter_anggota_nomor_anggota'),
+        ('simpanan', '0004_history_tabungan_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TutupBuku',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periode', models.DateField(help_text='Tanggal 1 dari bulan yang ditutup', unique=True)),
+                ('ditutup_pada', models.DateTimeField(auto_now_add=True)),
+                ('admin', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'tutup_buku',
+                'ordering': ['-periode'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoPeriode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('anggota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='anggota.anggota')),
+                ('jenis_simpanan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='simpanan.jenissimpanan')),
+                ('tutup_buku', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldo', to='laporan.tutupbuku')),
+            ],
+            options={
+                'db_table': 'saldo_periode',
+                'constraints': [models.UniqueConstraint(fields=('tutup_buku', 'anggota', 'jenis_simpanan'), name='uniq_saldo_periode')],
+            },
+        ),
+    ]
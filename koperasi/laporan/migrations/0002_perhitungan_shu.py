@@ -0,0 +1,62 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0004_alter_anggota_nomor_anggota'),
+        ('laporan', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerhitunganSHU',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tahun', models.PositiveSmallIntegerField()),
+                ('versi', models.PositiveSmallIntegerField()),
+                ('total_shu', models.DecimalField(decimal_places=2, help_text='SHU bagian anggota yang dibagikan', max_digits=18)),
+                ('persen_jasa_simpanan', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('persen_jasa_pinjaman', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('total_saldo_rata_rata', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_jasa_pinjaman', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('jumlah_anggota', models.PositiveIntegerField(default=0)),
+                ('dibuat_pada', models.DateTimeField(auto_now_add=True)),
+                ('admin', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'perhitungan_shu',
+                'ordering': ['-tahun', '-versi'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SHUAnggota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('saldo_rata_rata', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('jasa_pinjaman', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('shu_simpanan', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('shu_pinjaman', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('anggota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='anggota.anggota')),
+                ('perhitungan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rincian', to='laporan.perhitunganshu')),
+            ],
+            options={
+                'db_table': 'shu_anggota',
+                'ordering': ['anggota_id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='perhitunganshu',
+            constraint=models.UniqueConstraint(fields=('tahun', 'versi'), name='uniq_shu_tahun_versi'),
+        ),
+        migrations.AddConstraint(
+            model_name='shuanggota',
+            constraint=models.UniqueConstraint(fields=('perhitungan', 'anggota'), name='uniq_shu_anggota'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+def buat_baris_kunci(apps, schema_editor):
+    KunciPeriode = apps.get_model('laporan', 'KunciPeriode')
+    KunciPeriode.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laporan', '0002_perhitungan_shu'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KunciPeriode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'db_table': 'kunci_periode',
+            },
+        ),
+        migrations.RunPython(buat_baris_kunci, migrations.RunPython.noop),
+    ]
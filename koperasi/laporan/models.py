@@ -1,3 +1,153 @@
+import calendar
+
 from django.db import models
+from anggota.models import Anggota
+from admin_koperasi.models import User
+from simpanan.models import JenisSimpanan
+
+
+# ======================
+# Model Tutup Buku (periode bulanan)
+# ======================
+class TutupBuku(models.Model):
+    periode = models.DateField(
+        unique=True,
+        help_text="Tanggal 1 dari bulan yang ditutup"
+    )
+    ditutup_pada = models.DateTimeField(auto_now_add=True)
+    admin = models.ForeignKey(
+        User,
+        on_delete=models.PROTECT,
+        null=True
+    )
+
+    class Meta:
+        db_table = "tutup_buku"
+        ordering = ["-periode"]
+
+    def __str__(self):
+        return f"Tutup buku {self.periode:%m-%Y}"
+
+    @property
+    def akhir_periode(self):
+        hari = calendar.monthrange(self.periode.year, self.periode.month)[1]
+        return self.periode.replace(day=hari)
+
+
+# ======================
+# Model Kunci Periode (satu baris, dikunci FOR UPDATE)
+# ======================
+class KunciPeriode(models.Model):
+    """
+    Baris tunggal yang dikunci (SELECT ... FOR UPDATE) oleh setiap
+    transaksi yang mencatat mutasi dan oleh tutup_periode, supaya tidak ada
+    transaksi ke periode yang sedang ditutup yang commit setelah
+    snapshot-nya dibuat. Lihat laporan.utils.kunci_periode.
+    """
+
+    class Meta:
+        db_table = "kunci_periode"
+
+
+# ======================
+# Model Saldo Periode (snapshot, tidak bisa diubah)
+# ======================
+class SaldoPeriode(models.Model):
+    tutup_buku = models.ForeignKey(
+        TutupBuku,
+        on_delete=models.CASCADE,
+        related_name="saldo"
+    )
+    anggota = models.ForeignKey(Anggota, on_delete=models.CASCADE)
+    jenis_simpanan = models.ForeignKey(JenisSimpanan, on_delete=models.CASCADE)
+    saldo = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "saldo_periode"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tutup_buku", "anggota", "jenis_simpanan"],
+                name="uniq_saldo_periode"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tutup_buku} - {self.anggota_id} - {self.saldo}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError("Saldo periode yang sudah ditutup tidak bisa diubah")
+        super().save(*args, **kwargs)
+
+
+# ======================
+# Model Perhitungan SHU (satu baris per run, berversi per tahun)
+# ======================
+class PerhitunganSHU(models.Model):
+    tahun = models.PositiveSmallIntegerField()
+    versi = models.PositiveSmallIntegerField()
+
+    total_shu = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        help_text="SHU bagian anggota yang dibagikan"
+    )
+    persen_jasa_simpanan = models.DecimalField(max_digits=5, decimal_places=2)
+    persen_jasa_pinjaman = models.DecimalField(max_digits=5, decimal_places=2)
+
+    # dasar pembagian (total seluruh anggota)
+    total_saldo_rata_rata = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total_jasa_pinjaman = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    jumlah_anggota = models.PositiveIntegerField(default=0)
+
+    dibuat_pada = models.DateTimeField(auto_now_add=True)
+    admin = models.ForeignKey(
+        User,
+        on_delete=models.PROTECT,
+        null=True
+    )
+
+    class Meta:
+        db_table = "perhitungan_shu"
+        ordering = ["-tahun", "-versi"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tahun", "versi"],
+                name="uniq_shu_tahun_versi"
+            ),
+        ]
+
+    def __str__(self):
+        return f"SHU {self.tahun} v{self.versi}"
+
+
+# ======================
+# Model SHU per Anggota (rincian satu run)
+# ======================
+class SHUAnggota(models.Model):
+    perhitungan = models.ForeignKey(
+        PerhitunganSHU,
+        on_delete=models.CASCADE,
+        related_name="rincian"
+    )
+    anggota = models.ForeignKey(Anggota, on_delete=models.CASCADE)
+
+    saldo_rata_rata = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    jasa_pinjaman = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    shu_simpanan = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    shu_pinjaman = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "shu_anggota"
+        ordering = ["anggota_id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["perhitungan", "anggota"],
+                name="uniq_shu_anggota"
+            ),
+        ]
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.perhitungan} - {self.anggota_id} - {self.total}"
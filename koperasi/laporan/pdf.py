@@ -0,0 +1,181 @@
+"""
+Render PDF laporan dengan reportlab.
+
+Modul ini sengaja tidak import model Django: fungsi di sini hanya
+menerima data biasa (dict / list) supaya bisa dijalankan di worker
+ProcessPoolExecutor tanpa setup Django.
+"""
+import io
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+STYLE_TABEL = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.yellow),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("ALIGN", (-2, 1), (-1, -1), "RIGHT"),
+])
+
+
+def rupiah(value):
+    return f"Rp {value or 0:,.0f}".replace(",", ".")
+
+
+def tanggal(value):
+    return value.strftime("%d-%m-%Y") if value else "-"
+
+
+def render_rekening_koran(data):
+    """
+    data = {
+        "anggota": {"nomor_anggota", "nama"},
+        "periode": str,
+        "simpanan": [{"jenis", "saldo_awal", "rows": [(tanggal, transaksi, jumlah, saldo)]}],
+        "pinjaman": [{"jenis", "tanggal", "jumlah", "sisa", "status", "angsuran": [(tanggal, tipe, jumlah)]}],
+    }
+    Return bytes PDF.
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=30, rightMargin=30, topMargin=30, bottomMargin=30
+    )
+
+    styles = getSampleStyleSheet()
+    anggota = data["anggota"]
+
+    story = [
+        Paragraph("Rekening Koran Anggota", styles["Title"]),
+        # Paragraph membaca markup: nama seperti "Siti <Ani" harus di-escape
+        Paragraph(
+            escape(f"{anggota['nomor_anggota']} - {anggota['nama']}"), styles["Heading2"]
+        ),
+        Paragraph(escape(f"Periode: {data['periode']}"), styles["Normal"]),
+        Spacer(1, 12),
+        Paragraph("Simpanan", styles["Heading3"]),
+    ]
+
+    for simpanan in data["simpanan"]:
+        rows = [["Tanggal", "Transaksi", "Jumlah", "Saldo"]]
+        rows.append(["", "Saldo awal", "", rupiah(simpanan["saldo_awal"])])
+        for tgl, transaksi, jumlah, saldo in simpanan["rows"]:
+            rows.append([tanggal(tgl), transaksi, rupiah(jumlah), rupiah(saldo)])
+
+        table = Table(rows, repeatRows=1, colWidths=[80, 180, 110, 110])
+        table.setStyle(STYLE_TABEL)
+        story += [Paragraph(escape(simpanan["jenis"]), styles["Heading4"]), table, Spacer(1, 8)]
+
+    if not data["simpanan"]:
+        story.append(Paragraph("Belum ada simpanan.", styles["Normal"]))
+
+    story += [Spacer(1, 12), Paragraph("Pinjaman", styles["Heading3"])]
+
+    for pinjaman in data["pinjaman"]:
+        story.append(Paragraph(
+            escape(
+                f"{pinjaman['jenis']} - {tanggal(pinjaman['tanggal'])} - "
+                f"{rupiah(pinjaman['jumlah'])} (sisa {rupiah(pinjaman['sisa'])}, {pinjaman['status']})"
+            ),
+            styles["Heading4"]
+        ))
+
+        rows = [["Tanggal Bayar", "Tipe", "", "Jumlah"]]
+        for tgl, tipe, jumlah in pinjaman["angsuran"]:
+            rows.append([tanggal(tgl), tipe, "", rupiah(jumlah)])
+
+        table = Table(rows, repeatRows=1, colWidths=[80, 180, 110, 110])
+        table.setStyle(STYLE_TABEL)
+        story += [table, Spacer(1, 8)]
+
+    if not data["pinjaman"]:
+        story.append(Paragraph("Tidak ada pinjaman.", styles["Normal"]))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+# ======================
+# DAFTAR ANGGOTA
+# ======================
+KOLOM_ANGGOTA = [
+    ("No. Anggota", 50), ("Nama", 100), ("NIP", 65), ("Alamat", 130),
+    ("No. Telp", 60), ("Email", 110), ("JK", 45), ("Tgl Daftar", 50),
+    ("Status", 40), ("Tgl Nonaktif", 50), ("Alasan", 102),
+]
+FONT_ANGGOTA = 7
+PADDING_SEL = 12  # padding kiri + kanan default Table (6 + 6)
+BARIS_PER_TABEL = 40  # kira-kira satu halaman A4 landscape
+
+STYLE_DAFTAR_ANGGOTA = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.yellow),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), FONT_ANGGOTA),
+    ("LEADING", (0, 0), (-1, -1), FONT_ANGGOTA + 1),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+])
+
+
+def render_daftar_anggota(rows):
+    """
+    rows = iterable list 11 string (urutan KOLOM_ANGGOTA). Return bytes PDF.
+
+    Tabel dipecah per BARIS_PER_TABEL baris (layout reportlab per tabel
+    kecil, bukan satu tabel raksasa). Teks yang lebih lebar dari kolomnya
+    dipecah per baris; Paragraph hanya dipakai kalau ada kata yang tetap
+    tidak muat.
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=landscape(A4),
+        leftMargin=20, rightMargin=20, topMargin=30, bottomMargin=20
+    )
+
+    normal = getSampleStyleSheet()["Normal"].clone(
+        "anggota", fontSize=FONT_ANGGOTA, leading=FONT_ANGGOTA + 1
+    )
+    tebal = normal.clone("anggota_header", fontName="Helvetica-Bold")
+    lebar = [w for _, w in KOLOM_ANGGOTA]
+    batas = [w - PADDING_SEL for w in lebar]
+
+    def sel(teks, maks, style=normal):
+        teks = teks or "-"
+        if stringWidth(teks, style.fontName, FONT_ANGGOTA) <= maks:
+            return teks
+        # teks panjang biasa cukup dipecah per baris (jauh lebih murah);
+        # Paragraph hanya untuk kata yang lebih lebar dari kolomnya
+        baris = simpleSplit(teks, style.fontName, FONT_ANGGOTA, maks)
+        if any(stringWidth(b, style.fontName, FONT_ANGGOTA) > maks for b in baris):
+            return Paragraph(escape(teks), style)
+        return "\n".join(baris)
+
+    header = [sel(judul, maks, tebal) for (judul, _), maks in zip(KOLOM_ANGGOTA, batas)]
+
+    story = []
+    chunk = []
+    for row in rows:
+        chunk.append([sel(str(v) if v is not None else None, maks) for v, maks in zip(row, batas)])
+        if len(chunk) == BARIS_PER_TABEL:
+            story.append(_tabel_anggota(header, chunk, lebar))
+            chunk = []
+    if chunk or not story:
+        story.append(_tabel_anggota(header, chunk, lebar))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def _tabel_anggota(header, rows, lebar):
+    table = Table([header] + rows, colWidths=lebar, repeatRows=1)
+    table.setStyle(STYLE_DAFTAR_ANGGOTA)
+    return table
@@ -0,0 +1,264 @@
+"""
+Rekening koran anggota (simpanan + pinjaman) dalam PDF.
+
+PDF disimpan di cache "laporan" dengan key versi = id transaksi terakhir
+anggota (history tabungan, pinjaman, angsuran), jadi batch berikutnya
+hanya merender ulang anggota yang punya transaksi baru.
+"""
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max
+
+from pinjaman.models import Angsuran, Pinjaman
+from simpanan.models import HistoryTabungan, JenisSimpanan
+from .export import per_halaman
+from .pdf import render_rekening_koran
+from .utils import saldo_sebelum
+
+CHUNK_ANGGOTA = 200
+
+
+def _cache():
+    return caches["laporan"]
+
+
+def versi_rekening_koran(anggota_ids):
+    """{anggota_id: (id history terakhir, id pinjaman terakhir, id angsuran terakhir)}"""
+    versi = defaultdict(lambda: [0, 0, 0])
+
+    for anggota_id, last in (
+        HistoryTabungan.objects.filter(anggota_id__in=anggota_ids)
+        .order_by().values("anggota_id").annotate(last=Max("id"))
+        .values_list("anggota_id", "last")
+    ):
+        versi[anggota_id][0] = last
+
+    for anggota_id, last in (
+        Pinjaman.objects.filter(nomor_anggota_id__in=anggota_ids)
+        .order_by().values("nomor_anggota_id").annotate(last=Max("id_pinjaman"))
+        .values_list("nomor_anggota_id", "last")
+    ):
+        versi[anggota_id][1] = last
+
+    for anggota_id, last in (
+        Angsuran.objects.filter(id_pinjaman__nomor_anggota_id__in=anggota_ids)
+        .order_by().values("id_pinjaman__nomor_anggota_id").annotate(last=Max("id_pembayaran"))
+        .values_list("id_pinjaman__nomor_anggota_id", "last")
+    ):
+        versi[anggota_id][2] = last
+
+    return {anggota_id: tuple(versi[anggota_id]) for anggota_id in anggota_ids}
+
+
+def cache_key(anggota_id, versi, dari=None, sampai=None):
+    return "rekening_koran:{}:{}:{}:{}".format(
+        quote(str(anggota_id)),
+        "-".join(str(v) for v in versi),
+        dari or "",
+        sampai or "",
+    )
+
+
+def kumpulkan_data(anggota_list, dari=None, sampai=None):
+    """
+    Data rekening koran untuk banyak anggota sekaligus
+    (jumlah query tetap, tidak per anggota). Return {anggota_id: data}.
+    """
+    anggota_ids = [a.pk for a in anggota_list]
+    nama_jenis = {
+        j.pk: j.get_nama_jenis_display()
+        for j in JenisSimpanan.objects.all()
+    }
+
+    history = HistoryTabungan.objects.filter(
+        anggota_id__in=anggota_ids,
+        jenis_simpanan__isnull=False,
+    )
+    if sampai:
+        history = history.filter(tanggal__lte=sampai)
+
+    # saldo awal = snapshot tutup buku + mutasi sebelum `dari`
+    saldo_awal = defaultdict(Decimal)
+    if dari:
+        saldo_awal = saldo_sebelum(dari, anggota_ids)
+        history = history.filter(tanggal__gte=dari)
+
+    mutasi = defaultdict(list)
+    for anggota_id, jenis_id, tgl, transaksi, jumlah in (
+        history.order_by("anggota_id", "jenis_simpanan_id", "tanggal", "id")
+        .values_list("anggota_id", "jenis_simpanan_id", "tanggal", "jenis_transaksi", "jumlah")
+    ):
+        mutasi[(anggota_id, jenis_id)].append((tgl, transaksi, jumlah))
+
+    pinjaman_qs = Pinjaman.objects.filter(nomor_anggota_id__in=anggota_ids)
+    if sampai:
+        pinjaman_qs = pinjaman_qs.filter(tanggal_meminjam__lte=sampai)
+    pinjaman_list = list(
+        pinjaman_qs.select_related("id_jenis_pinjaman")
+        .order_by("nomor_anggota_id", "tanggal_meminjam", "id_pinjaman")
+    )
+
+    angsuran_qs = Angsuran.objects.filter(
+        id_pinjaman__in=[p.pk for p in pinjaman_list]
+    )
+    if dari:
+        angsuran_qs = angsuran_qs.filter(tanggal_bayar__gte=dari)
+    if sampai:
+        angsuran_qs = angsuran_qs.filter(tanggal_bayar__lte=sampai)
+    angsuran = defaultdict(list)
+    for pinjaman_id, tgl, tipe, jumlah in (
+        angsuran_qs.order_by("tanggal_bayar", "id_pembayaran")
+        .values_list("id_pinjaman_id", "tanggal_bayar", "tipe_bayar", "jumlah_bayar")
+    ):
+        angsuran[pinjaman_id].append((tgl, tipe, jumlah))
+
+    pinjaman_per_anggota = defaultdict(list)
+    for p in pinjaman_list:
+        pinjaman_per_anggota[p.nomor_anggota_id].append({
+            "jenis": str(p.id_jenis_pinjaman),
+            "tanggal": p.tanggal_meminjam,
+            "jumlah": p.jumlah_pinjaman,
+            "sisa": p.sisa_pinjaman,
+            "status": p.status,
+            "angsuran": angsuran[p.pk],
+        })
+
+    periode = f"{dari or 'awal'} s/d {sampai or 'sekarang'}"
+    hasil = {}
+    for anggota in anggota_list:
+        simpanan = []
+        for jenis_id, label in nama_jenis.items():
+            awal = saldo_awal[(anggota.pk, jenis_id)]
+            rows = mutasi.get((anggota.pk, jenis_id), [])
+            if not rows and not awal:
+                continue
+
+            saldo = awal
+            baris = []
+            for tgl, transaksi, jumlah in rows:
+                if transaksi == HistoryTabungan.SETOR:
+                    saldo += jumlah
+                elif transaksi == HistoryTabungan.TARIK:
+                    saldo -= jumlah
+                baris.append((tgl, transaksi.capitalize(), jumlah, saldo))
+
+            simpanan.append({"jenis": label, "saldo_awal": awal, "rows": baris})
+
+        hasil[anggota.pk] = {
+            "anggota": {"nomor_anggota": anggota.nomor_anggota, "nama": anggota.nama},
+            "periode": periode,
+            "simpanan": simpanan,
+            "pinjaman": pinjaman_per_anggota[anggota.pk],
+        }
+
+    return hasil
+
+
+def rekening_koran_pdf(anggota, dari=None, sampai=None):
+    """PDF satu anggota (dari cache kalau belum ada transaksi baru)."""
+    versi = versi_rekening_koran([anggota.pk])[anggota.pk]
+    key = cache_key(anggota.pk, versi, dari, sampai)
+
+    pdf = _cache().get(key)
+    if pdf is None:
+        data = kumpulkan_data([anggota], dari, sampai)[anggota.pk]
+        pdf = render_rekening_koran(data)
+        _cache().set(key, pdf)
+    return pdf
+
+
+class _ZipStream:
+    """File-like tanpa seek: menampung output zipfile untuk di-yield per potong."""
+
+    def __init__(self):
+        self._buffer = []
+        self._posisi = 0
+
+    def write(self, data):
+        self._buffer.append(bytes(data))
+        self._posisi += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._posisi
+
+    def flush(self):
+        pass
+
+    def ambil(self):
+        data = b"".join(self._buffer)
+        self._buffer = []
+        return data
+
+
+def nama_file(anggota_id):
+    return f"rekening_koran_{str(anggota_id).replace(' ', '_')}.pdf"
+
+
+class _PoolMalas:
+    """ProcessPoolExecutor yang baru dibuat saat ada PDF yang perlu dirender."""
+
+    def __init__(self, max_workers=None):
+        self._max_workers = max_workers
+        self._pool = None
+
+    def map(self, fungsi, data):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self._max_workers)
+        return self._pool.map(fungsi, data)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def stream_rekening_koran_zip(anggota_qs, dari=None, sampai=None):
+    """
+    Generator bytes ZIP berisi PDF rekening koran semua anggota di queryset.
+    Anggota diproses per CHUNK_ANGGOTA; yang belum ada di cache dirender
+    paralel di process pool. Pool hanya dijalankan kalau ada chunk yang
+    tidak seluruhnya dari cache.
+    """
+    stream = _ZipStream()
+    pool = _PoolMalas(getattr(settings, "REKENING_KORAN_WORKERS", None))
+
+    try:
+        with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            anggota_qs = anggota_qs.only("nomor_anggota", "nama")
+
+            for chunk in per_halaman(anggota_qs, ["nomor_anggota"], CHUNK_ANGGOTA):
+                yield from _tulis_chunk(zf, stream, pool, chunk, dari, sampai)
+    finally:
+        pool.shutdown()
+
+    yield stream.ambil()
+
+
+def _tulis_chunk(zf, stream, pool, chunk, dari, sampai):
+    versi = versi_rekening_koran([a.pk for a in chunk])
+    keys = {a.pk: cache_key(a.pk, versi[a.pk], dari, sampai) for a in chunk}
+    pdfs = {
+        anggota_id: _cache().get(key)
+        for anggota_id, key in keys.items()
+    }
+
+    belum = [a for a in chunk if pdfs[a.pk] is None]
+    if belum:
+        data = kumpulkan_data(belum, dari, sampai)
+        hasil = pool.map(render_rekening_koran, [data[a.pk] for a in belum])
+        baru = {}
+        for anggota, pdf in zip(belum, hasil):
+            pdfs[anggota.pk] = pdf
+            baru[keys[anggota.pk]] = pdf
+        _cache().set_many(baru)
+
+    for anggota in chunk:
+        zf.writestr(nama_file(anggota.pk), pdfs[anggota.pk])
+        yield stream.ambil()
@@ -0,0 +1,84 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from simpanan.models import HistoryTabungan
+from .models import SaldoPeriode, TutupBuku
+from .utils import kunci_periode
+
+CHUNK_SIZE = 1000
+
+
+def tutup_periode(periode, admin):
+    """
+    Tutup buku satu bulan: tulis snapshot saldo per anggota per jenis
+    (= snapshot bulan sebelumnya + mutasi bulan ini) lalu kunci periode.
+    Hanya bulan yang sudah lewat; bulan berjalan masih menerima transaksi.
+    """
+    periode = periode.replace(day=1)
+
+    if periode >= date.today().replace(day=1):
+        raise ValidationError("Periode belum selesai, tutup buku setelah akhir bulan.")
+
+    with transaction.atomic():
+        # tunggu mutasi yang sedang berjalan commit, lalu tahan mutasi baru
+        # sampai snapshot selesai (lihat kunci_periode)
+        terakhir = kunci_periode(eksklusif=True)
+
+        if terakhir:
+            berikut = date(
+                terakhir.periode.year + terakhir.periode.month // 12,
+                terakhir.periode.month % 12 + 1,
+                1
+            )
+            if periode != berikut:
+                raise ValidationError(
+                    f"Tutup buku harus berurutan. Periode berikutnya {berikut:%m-%Y}."
+                )
+
+        tutup = TutupBuku.objects.create(periode=periode, admin=admin)
+
+        saldo = defaultdict(Decimal)
+        if terakhir:
+            for anggota_id, jenis_id, nilai in terakhir.saldo.values_list(
+                "anggota_id", "jenis_simpanan_id", "saldo"
+            ):
+                saldo[(anggota_id, jenis_id)] = nilai
+
+        mutasi = HistoryTabungan.objects.filter(
+            jenis_simpanan__isnull=False,
+            tanggal__lte=tutup.akhir_periode,
+        )
+        if terakhir:
+            mutasi = mutasi.filter(tanggal__gt=terakhir.akhir_periode)
+
+        for r in (
+            mutasi.order_by()
+            .values("anggota_id", "jenis_simpanan_id")
+            .annotate(
+                setor=Sum("jumlah", filter=Q(jenis_transaksi=HistoryTabungan.SETOR)),
+                tarik=Sum("jumlah", filter=Q(jenis_transaksi=HistoryTabungan.TARIK)),
+            )
+        ):
+            saldo[(r["anggota_id"], r["jenis_simpanan_id"])] += (
+                (r["setor"] or 0) - (r["tarik"] or 0)
+            )
+
+        SaldoPeriode.objects.bulk_create(
+            [
+                SaldoPeriode(
+                    tutup_buku=tutup,
+                    anggota_id=anggota_id,
+                    jenis_simpanan_id=jenis_id,
+                    saldo=nilai,
+                )
+                for (anggota_id, jenis_id), nilai in saldo.items()
+            ],
+            batch_size=CHUNK_SIZE,
+        )
+
+    return tutup
@@ -0,0 +1,170 @@
+"""
+Perhitungan SHU (sisa hasil usaha) akhir tahun.
+
+Bagian anggota dibagi dua:
+- jasa simpanan: sebanding saldo rata-rata harian simpanan setahun
+- jasa pinjaman: sebanding jasa pinjaman yang dibayar di tahun itu
+
+History tabungan tahun itu dibaca sekali (streaming, urut anggota +
+tanggal), saldo awal tahun dari snapshot tutup buku (SaldoPeriode)
+terakhir + mutasi setelahnya. Hasil disimpan sebagai
+PerhitunganSHU berversi per tahun; run lama tidak diubah.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import ROUND_DOWN, Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Max, Sum, Value, When
+from django.db.models.functions import Coalesce, Least
+
+from pinjaman.models import Angsuran
+from simpanan.models import HistoryTabungan
+from .export import per_baris
+from .models import PerhitunganSHU, SHUAnggota
+from .utils import saldo_sebelum
+
+CHUNK_SIZE = 1000
+SEN = Decimal("0.01")
+
+
+def _saldo_awal(awal_tahun):
+    """{anggota_id: saldo} per 1 Januari dari snapshot tutup buku + mutasi sesudahnya."""
+    saldo = defaultdict(Decimal)
+    for (anggota_id, _), nilai in saldo_sebelum(awal_tahun).items():
+        saldo[anggota_id] += nilai
+    return dict(saldo)
+
+
+def saldo_rata_rata(tahun):
+    """
+    {anggota_id: saldo rata-rata harian} seluruh anggota untuk satu tahun.
+    Saldo x jumlah hari berlaku dijumlahkan sambil membaca history, lalu
+    dibagi jumlah hari dalam tahun.
+    """
+    awal_tahun = date(tahun, 1, 1)
+    akhir_tahun = date(tahun + 1, 1, 1)
+    hari_setahun = (akhir_tahun - awal_tahun).days
+
+    saldo = _saldo_awal(awal_tahun)
+    terakhir = dict.fromkeys(saldo, awal_tahun)
+    akumulasi = defaultdict(Decimal)
+
+    for anggota_id, tanggal, transaksi, jumlah, _ in per_baris(
+        HistoryTabungan.objects.filter(
+            jenis_simpanan__isnull=False,
+            tanggal__gte=awal_tahun,
+            tanggal__lt=akhir_tahun,
+            jenis_transaksi__in=[HistoryTabungan.SETOR, HistoryTabungan.TARIK],
+        ).values_list("anggota_id", "tanggal", "jenis_transaksi", "jumlah", "id", named=True),
+        ["anggota_id", "tanggal", "id"],
+        size=5000,
+    ):
+        sekarang = saldo.get(anggota_id, Decimal("0"))
+        akumulasi[anggota_id] += sekarang * (tanggal - terakhir.get(anggota_id, awal_tahun)).days
+        terakhir[anggota_id] = tanggal
+
+        if transaksi == HistoryTabungan.SETOR:
+            saldo[anggota_id] = sekarang + jumlah
+        else:
+            saldo[anggota_id] = sekarang - jumlah
+
+    # sisa hari sampai akhir tahun
+    for anggota_id, nilai in saldo.items():
+        akumulasi[anggota_id] += nilai * (akhir_tahun - terakhir.get(anggota_id, awal_tahun)).days
+
+    return {
+        anggota_id: (total / hari_setahun).quantize(SEN)
+        for anggota_id, total in akumulasi.items()
+        if total > 0
+    }
+
+
+def jasa_pinjaman_dibayar(tahun):
+    """
+    {anggota_id: jasa pinjaman dibayar} satu tahun, satu query grouped.
+    Bayar `jasa` → seluruhnya jasa; bayar `cicilan` → bagian jasa =
+    jasa_rupiah pinjaman (maksimal sebesar pembayarannya).
+    """
+    uang = DecimalField(max_digits=18, decimal_places=2)
+    jasa = Case(
+        When(tipe_bayar="jasa", then=F("jumlah_bayar")),
+        default=Least(
+            Coalesce(F("id_pinjaman__jasa_rupiah"), Value(Decimal("0")), output_field=uang),
+            F("jumlah_bayar"),
+        ),
+        output_field=uang,
+    )
+
+    return {
+        r["anggota_id"]: r["jasa"]
+        for r in (
+            Angsuran.objects.filter(
+                tanggal_bayar__gte=date(tahun, 1, 1),
+                tanggal_bayar__lt=date(tahun + 1, 1, 1),
+            )
+            .order_by()
+            .values(anggota_id=F("id_pinjaman__nomor_anggota_id"))
+            .annotate(jasa=Sum(jasa))
+        )
+        if r["jasa"]
+    }
+
+
+def _bagian(nilai, faktor):
+    # dibulatkan ke bawah supaya total tidak melebihi alokasi
+    return (nilai * faktor).quantize(SEN, rounding=ROUND_DOWN)
+
+
+def hitung_shu(tahun, total_shu, persen_jasa_simpanan, persen_jasa_pinjaman, admin):
+    """Hitung SHU semua anggota dan simpan sebagai run versi baru."""
+    rata_rata = saldo_rata_rata(tahun)
+    jasa = jasa_pinjaman_dibayar(tahun)
+
+    total_rata_rata = sum(rata_rata.values(), Decimal("0"))
+    total_jasa = sum(jasa.values(), Decimal("0"))
+
+    alokasi_simpanan = total_shu * persen_jasa_simpanan / 100
+    alokasi_pinjaman = total_shu * persen_jasa_pinjaman / 100
+    faktor_simpanan = alokasi_simpanan / total_rata_rata if total_rata_rata else Decimal("0")
+    faktor_pinjaman = alokasi_pinjaman / total_jasa if total_jasa else Decimal("0")
+
+    with transaction.atomic():
+        # run bersamaan untuk tahun yang sama ditolak unique (tahun, versi)
+        versi = (
+            PerhitunganSHU.objects.filter(tahun=tahun)
+            .aggregate(v=Max("versi"))["v"] or 0
+        ) + 1
+
+        perhitungan = PerhitunganSHU.objects.create(
+            tahun=tahun,
+            versi=versi,
+            total_shu=total_shu,
+            persen_jasa_simpanan=persen_jasa_simpanan,
+            persen_jasa_pinjaman=persen_jasa_pinjaman,
+            total_saldo_rata_rata=total_rata_rata,
+            total_jasa_pinjaman=total_jasa,
+            jumlah_anggota=len(rata_rata.keys() | jasa.keys()),
+            admin=admin,
+        )
+
+        rincian = []
+        for anggota_id in sorted(rata_rata.keys() | jasa.keys()):
+            saldo = rata_rata.get(anggota_id, Decimal("0"))
+            dibayar = jasa.get(anggota_id, Decimal("0"))
+            shu_simpanan = _bagian(saldo, faktor_simpanan)
+            shu_pinjaman = _bagian(dibayar, faktor_pinjaman)
+
+            rincian.append(SHUAnggota(
+                perhitungan=perhitungan,
+                anggota_id=anggota_id,
+                saldo_rata_rata=saldo,
+                jasa_pinjaman=dibayar,
+                shu_simpanan=shu_simpanan,
+                shu_pinjaman=shu_pinjaman,
+                total=shu_simpanan + shu_pinjaman,
+            ))
+
+        SHUAnggota.objects.bulk_create(rincian, batch_size=CHUNK_SIZE)
+
+    return perhitungan
@@ -1,3 +1,422 @@
-from django.test import TestCase
+import datetime
+import io
+import threading
+import zipfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+
+from admin_koperasi.models import User
+from anggota.models import Anggota
+from pinjaman.models import Angsuran, JadwalAngsuran, JenisPinjaman, KategoriJasa, Pinjaman
+from simpanan.models import HistoryTabungan, JenisSimpanan, Simpanan
+from .export import per_baris, per_halaman
+from .models import SaldoPeriode, TutupBuku
+from .pdf import render_rekening_koran
+from .rekening_koran import kumpulkan_data, nama_file, rekening_koran_pdf, stream_rekening_koran_zip
+from .services import tutup_periode
+from .shu import SEN, _saldo_awal, hitung_shu
+from .tunggakan import hitung_tunggakan, kelompok_umur
+from .utils import kunci_periode, periode_terkunci, saldo_sebelum
+
+JANUARI = datetime.date(2024, 1, 1)
+FEBRUARI = datetime.date(2024, 2, 1)
+MARET = datetime.date(2024, 3, 1)
+
+
+# ======================================================
+# TUTUP BUKU: SNAPSHOT SALDO + KUNCI PERIODE
+# ======================================================
+class TutupBukuTest(TestCase):
+    def setUp(self):
+        self.jenis = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.SUKARELA)
+        self.anggota = Anggota.objects.create(
+            nomor_anggota="NA 1", nama="Anggota 1", jenis_kelamin="Laki-laki"
+        )
+        self._setor(Decimal("100000"), datetime.date(2024, 1, 10))
+        self._setor(Decimal("50000"), datetime.date(2024, 2, 5))
+
+    def _setor(self, jumlah, tanggal):
+        return Simpanan.objects.create(
+            anggota=self.anggota, jenis_simpanan=self.jenis,
+            jumlah=jumlah, tanggal=tanggal,
+        )
+
+    def _snapshot(self, tutup):
+        return SaldoPeriode.objects.get(
+            tutup_buku=tutup, anggota=self.anggota, jenis_simpanan=self.jenis
+        ).saldo
+
+    def test_snapshot_saldo_per_periode(self):
+        januari = tutup_periode(JANUARI, None)
+        februari = tutup_periode(FEBRUARI, None)
+
+        self.assertEqual(self._snapshot(januari), Decimal("100000"))
+        self.assertEqual(self._snapshot(februari), Decimal("150000"))
+
+    def test_tutup_buku_harus_berurutan(self):
+        tutup_periode(JANUARI, None)
+        with self.assertRaises(ValidationError):
+            tutup_periode(MARET, None)
+
+    def test_transaksi_di_periode_tertutup_ditolak(self):
+        tutup_periode(JANUARI, None)
+
+        with self.assertRaises(ValidationError):
+            self._setor(Decimal("10000"), datetime.date(2024, 1, 20))
+        self._setor(Decimal("10000"), datetime.date(2024, 2, 20))
+
+    def test_bulan_berjalan_tidak_bisa_ditutup(self):
+        bulan_ini = datetime.date.today().replace(day=1)
+        with self.assertRaises(ValidationError):
+            tutup_periode(bulan_ini, None)
+        self.assertFalse(TutupBuku.objects.exists())
+
+    def test_kunci_dibaca_dari_database(self):
+        # tutup buku dari proses lain (tanpa lewat cache proses ini)
+        self.assertFalse(periode_terkunci(datetime.date(2024, 1, 20)))
+        TutupBuku.objects.create(periode=JANUARI)
+        self.assertTrue(periode_terkunci(datetime.date(2024, 1, 20)))
+        self.assertFalse(periode_terkunci(datetime.date(2024, 2, 1)))
+
+    def test_saldo_awal_dari_snapshot(self):
+        tutup_periode(JANUARI, None)
+        # history lama yang tidak masuk snapshot tidak dibaca lagi
+        HistoryTabungan.objects.bulk_create([
+            HistoryTabungan(
+                anggota=self.anggota, jenis_simpanan=self.jenis,
+                jenis_transaksi=HistoryTabungan.SETOR,
+                jumlah=Decimal("999"), tanggal=datetime.date(2024, 1, 15),
+            )
+        ])
+        kunci = (self.anggota.pk, self.jenis.pk)
+
+        self.assertEqual(saldo_sebelum(FEBRUARI)[kunci], Decimal("100000"))
+        self.assertEqual(saldo_sebelum(MARET)[kunci], Decimal("150000"))
+        self.assertEqual(saldo_sebelum(datetime.date(2024, 1, 31))[kunci], Decimal("100999"))
+        self.assertEqual(_saldo_awal(MARET), {self.anggota.pk: Decimal("150000")})
+
+        data = kumpulkan_data([self.anggota], dari=MARET)[self.anggota.pk]
+        self.assertEqual(data["simpanan"][0]["saldo_awal"], Decimal("150000"))
+
+
+# ======================================================
+# MUTASI MENUNGGU TUTUP BUKU YANG SEDANG BERJALAN
+# (butuh DB dengan SELECT ... FOR UPDATE; di SQLite dilewati)
+# ======================================================
+@skipUnlessDBFeature("has_select_for_update")
+class KunciPeriodeBersamaanTest(TransactionTestCase):
+    TUNGGU = 2
+
+    def setUp(self):
+        self.jenis = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.SUKARELA)
+        self.anggota = Anggota.objects.create(
+            nomor_anggota="NA 1", nama="Anggota 1", jenis_kelamin="Laki-laki"
+        )
+
+    def _di_thread(self, fungsi):
+        """Jalankan `fungsi` di koneksi lain; return (thread, selesai, hasil)."""
+        selesai = threading.Event()
+        hasil = []
+
+        def jalan():
+            try:
+                hasil.append(fungsi())
+            except Exception as e:
+                hasil.append(e)
+            finally:
+                connection.close()
+                selesai.set()
+
+        thread = threading.Thread(target=jalan)
+        thread.start()
+        return thread, selesai, hasil
+
+    def test_setoran_menunggu_lalu_ditolak(self):
+        def setor():
+            return Simpanan.objects.create(
+                anggota=self.anggota, jenis_simpanan=self.jenis,
+                jumlah=Decimal("10000"), tanggal=datetime.date(2024, 1, 20),
+            )
+
+        with transaction.atomic():
+            # tutup_periode sedang membuat snapshot Januari
+            kunci_periode(eksklusif=True)
+            TutupBuku.objects.create(periode=JANUARI)
+
+            thread, selesai, hasil = self._di_thread(setor)
+            self.assertFalse(selesai.wait(self.TUNGGU), "setoran tidak menunggu tutup buku")
+
+        thread.join()
+        self.assertIsInstance(hasil[0], ValidationError)
+        self.assertFalse(Simpanan.objects.exists())
+
+    def test_mutasi_tidak_saling_menunggu(self):
+        def kunci_bersama():
+            with transaction.atomic():
+                return kunci_periode()
+
+        with transaction.atomic():
+            kunci_periode()
+            thread, selesai, hasil = self._di_thread(kunci_bersama)
+            self.assertTrue(selesai.wait(self.TUNGGU), "mutasi lain ikut menunggu")
+
+        thread.join()
+        self.assertEqual(hasil, [None])
+
+
+# ======================================================
+# PEMBAGIAN SHU TIDAK MELEBIHI ALOKASI
+# ======================================================
+class HitungSHUTest(TestCase):
+    TAHUN = 2023
+
+    def setUp(self):
+        self.admin = User.objects.create_user("ketua", password="x", role="ketua")
+        jenis = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.SUKARELA)
+
+        # A, B, C: saldo sama sejak sebelum tahun itu → bagian sama
+        self.anggota = {}
+        for nomor in ("NA 1", "NA 2", "NA 3", "NA 4"):
+            self.anggota[nomor] = Anggota.objects.create(
+                nomor_anggota=nomor, nama=nomor, jenis_kelamin="Laki-laki"
+            )
+        for nomor in ("NA 1", "NA 2", "NA 3"):
+            Simpanan.objects.create(
+                anggota=self.anggota[nomor], jenis_simpanan=jenis,
+                jumlah=Decimal("100000"), tanggal=datetime.date(2022, 12, 1),
+            )
+        # D: setor 2 Juli → berlaku 183 dari 365 hari
+        Simpanan.objects.create(
+            anggota=self.anggota["NA 4"], jenis_simpanan=jenis,
+            jumlah=Decimal("365000"), tanggal=datetime.date(2023, 7, 2),
+        )
+
+        # hanya A membayar jasa pinjaman
+        pinjaman = Pinjaman.objects.create(
+            nomor_anggota=self.anggota["NA 1"],
+            id_jenis_pinjaman=JenisPinjaman.objects.create(nama_jenis="Reguler"),
+            id_kategori_jasa=KategoriJasa.objects.create(kategori_jasa="Umum"),
+            id_admin=self.admin,
+            jumlah_pinjaman=Decimal("1200000"),
+            angsuran_per_bulan=Decimal("100000"),
+            jasa_rupiah=Decimal("10000"),
+            tanggal_meminjam=datetime.date(2023, 1, 1),
+            jatuh_tempo=12,
+            sisa_pinjaman=Decimal("1200000"),
+            status="aktif",
+        )
+        Angsuran.objects.create(
+            id_pinjaman=pinjaman, id_admin=self.admin, tipe_bayar="jasa",
+            jumlah_bayar=Decimal("10000"), tanggal_bayar=datetime.date(2023, 3, 1),
+        )
+
+    def test_bagian_dibulatkan_ke_bawah(self):
+        total_shu = Decimal("1000000")
+        perhitungan = hitung_shu(self.TAHUN, total_shu, Decimal("70"), Decimal("30"), self.admin)
+        rincian = {r.anggota_id: r for r in perhitungan.rincian.all()}
+
+        self.assertEqual(rincian["NA 4"].saldo_rata_rata, Decimal("183000"))
+        self.assertEqual(perhitungan.total_saldo_rata_rata, Decimal("483000"))
+        self.assertEqual(perhitungan.jumlah_anggota, 4)
+
+        # 700.000 x 100.000 / 483.000 = 144.927,536... → 144.927,53
+        for nomor in ("NA 1", "NA 2", "NA 3"):
+            self.assertEqual(rincian[nomor].shu_simpanan, Decimal("144927.53"))
+        self.assertEqual(rincian["NA 1"].shu_pinjaman, Decimal("300000"))
+
+        shu_simpanan = sum(r.shu_simpanan for r in rincian.values())
+        shu_pinjaman = sum(r.shu_pinjaman for r in rincian.values())
+        total = sum(r.total for r in rincian.values())
+        self.assertLessEqual(shu_simpanan, Decimal("700000"))
+        self.assertLessEqual(shu_pinjaman, Decimal("300000"))
+        self.assertLessEqual(total, total_shu)
+        # sisa pembulatan kurang dari 1 sen per anggota per bagian
+        self.assertLess(total_shu - total, SEN * 2 * len(rincian))
+
+    def test_run_baru_menambah_versi(self):
+        pertama = hitung_shu(self.TAHUN, Decimal("1000000"), Decimal("70"), Decimal("30"), self.admin)
+        kedua = hitung_shu(self.TAHUN, Decimal("500000"), Decimal("50"), Decimal("50"), self.admin)
+
+        self.assertEqual((pertama.versi, kedua.versi), (1, 2))
+        self.assertEqual(pertama.rincian.count(), 4)
+
+
+# ======================================================
+# REKENING KORAN: NAMA DENGAN MARKUP + POOL HANYA SAAT PERLU
+# ======================================================
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "laporan": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "rk-test"},
+})
+class RekeningKoranTest(TestCase):
+    NAMA = ["Siti <Ani", "A <b> B", "C & D"]
+
+    def setUp(self):
+        self.anggota = [
+            Anggota.objects.create(
+                nomor_anggota=f"NA <{i}>", nama=nama, jenis_kelamin="Perempuan"
+            )
+            for i, nama in enumerate(self.NAMA, start=1)
+        ]
+
+    def test_nama_dengan_markup(self):
+        for anggota in self.anggota:
+            with self.subTest(nama=anggota.nama):
+                data = kumpulkan_data([anggota])[anggota.pk]
+                self.assertTrue(render_rekening_koran(data).startswith(b"%PDF"))
+
+    def test_zip_dari_cache_tanpa_process_pool(self):
+        for anggota in self.anggota:
+            rekening_koran_pdf(anggota)
+
+        with mock.patch("laporan.rekening_koran.ProcessPoolExecutor") as pool:
+            isi = b"".join(stream_rekening_koran_zip(Anggota.objects.all()))
+
+        pool.assert_not_called()
+        with zipfile.ZipFile(io.BytesIO(isi)) as zf:
+            self.assertEqual(
+                sorted(zf.namelist()), sorted(nama_file(a.pk) for a in self.anggota)
+            )
+
+
+# ======================================================
+# EXPORT: KEYSET PAGINATION
+# ======================================================
+class KeysetExportTest(TestCase):
+    def setUp(self):
+        # nama sengaja kembar supaya halaman terpotong di tengah grup nama
+        for i in range(1, 12):
+            Anggota.objects.create(
+                nomor_anggota=f"NA {i:02d}", nama=f"Anggota {i % 3}", jenis_kelamin="Perempuan"
+            )
+
+    def test_halaman_tidak_tumpang_tindih_dan_tidak_melompat(self):
+        for urutan in (["nomor_anggota"], ["nama", "nomor_anggota"]):
+            with self.subTest(urutan=urutan):
+                semua = list(
+                    Anggota.objects.order_by(*urutan).values_list("nomor_anggota", flat=True)
+                )
+                with self.assertNumQueries(4):  # 11 baris / 3 per halaman
+                    halaman = list(per_halaman(Anggota.objects.all(), urutan, size=3))
+
+                self.assertEqual([len(h) for h in halaman], [3, 3, 3, 2])
+                self.assertEqual([a.nomor_anggota for h in halaman for a in h], semua)
+
+    def test_values_list_dengan_urutan_tanggal_id(self):
+        jenis = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.SUKARELA)
+        anggota = Anggota.objects.get(pk="NA 01")
+        for hari in (3, 1, 3, 2, 1):
+            Simpanan.objects.create(
+                anggota=anggota, jenis_simpanan=jenis,
+                jumlah=Decimal("1000"), tanggal=datetime.date(2024, 1, hari),
+            )
+
+        qs = HistoryTabungan.objects.values_list("id", "tanggal", named=True)
+        hasil = [r.id for r in per_baris(qs, ["tanggal", "id"], size=2)]
+        self.assertEqual(hasil, list(qs.order_by("tanggal", "id").values_list("id", flat=True)))
+        self.assertEqual(len(set(hasil)), 5)
+
+
+# ======================================================
+# DANA SOSIAL: PARAMETER TAHUN
+# ======================================================
+class DanaSosialTahunTest(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_user("ketua", password="x", role="ketua")
+        )
+
+    def test_tahun_tidak_valid_jatuh_ke_tahun_berjalan(self):
+        for tahun in ("0", "-5", "99999", "abc"):
+            with self.subTest(tahun=tahun):
+                response = self.client.get("/laporan/dana-sosial/", {"tahun": tahun})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context["tahun"], datetime.date.today().year)
+
+    def test_tahun_valid_dipakai(self):
+        response = self.client.get("/laporan/dana-sosial/", {"tahun": "2023"})
+        self.assertEqual(response.context["tahun"], 2023)
+
+
+# ======================================================
+# UMUR TUNGGAKAN: PEMBAGIAN KELOMPOK
+# ======================================================
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "laporan": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tunggakan-test"},
+})
+class TunggakanTest(TestCase):
+    PER_TANGGAL = datetime.date(2024, 6, 30)
+
+    def setUp(self):
+        admin = User.objects.create_user("bendahara", password="x", role="bendahara")
+        self.reguler = JenisPinjaman.objects.create(nama_jenis="Reguler")
+        barang = JenisPinjaman.objects.create(nama_jenis="Barang")
+        kategori = KategoriJasa.objects.create(kategori_jasa="Umum")
+
+        # (nomor, jenis, hari terlambat tiap jadwal yang belum dibayar)
+        self.pinjaman = {}
+        for nomor, jenis, terlambat in (
+            ("NA 1", self.reguler, [30, 1]),
+            ("NA 2", self.reguler, [31]),
+            ("NA 3", barang, [90, 60]),
+            ("NA 4", self.reguler, [91]),
+            ("NA 5", self.reguler, [0]),  # jatuh tempo hari ini: belum menunggak
+        ):
+            pinjaman = Pinjaman.objects.create(
+                nomor_anggota=Anggota.objects.create(
+                    nomor_anggota=nomor, nama=nomor, jenis_kelamin="Laki-laki"
+                ),
+                id_jenis_pinjaman=jenis,
+                id_kategori_jasa=kategori,
+                id_admin=admin,
+                jumlah_pinjaman=Decimal("1000000"),
+                angsuran_per_bulan=Decimal("100000"),
+                tanggal_meminjam=datetime.date(2024, 1, 1),
+                jatuh_tempo=10,
+                sisa_pinjaman=Decimal("1000000"),
+                status="aktif",
+            )
+            for ke, hari in enumerate(terlambat, start=1):
+                JadwalAngsuran.objects.create(
+                    pinjaman=pinjaman, angsuran_ke=ke,
+                    jatuh_tempo=self.PER_TANGGAL - datetime.timedelta(days=hari),
+                    pokok=Decimal("100000"), jasa=Decimal("10000"),
+                )
+            self.pinjaman[nomor] = pinjaman
+
+    def test_batas_kelompok(self):
+        for hari, label in (
+            (0, None), (1, "1-30"), (30, "1-30"), (31, "31-60"), (60, "31-60"),
+            (61, "61-90"), (90, "61-90"), (91, "90+"), (3650, "90+"),
+        ):
+            with self.subTest(hari=hari):
+                self.assertEqual(kelompok_umur(hari), label)
+
+    def test_pinjaman_masuk_kelompok_dari_jadwal_tertua(self):
+        hasil = hitung_tunggakan(self.PER_TANGGAL)
+
+        self.assertEqual(
+            [
+                (r["nomor_anggota"], r["hari"], r["kelompok"], r["bulan"], r["tunggakan"])
+                for r in hasil["rincian"]
+            ],
+            [
+                ("NA 4", 91, "90+", 1, Decimal("110000")),
+                ("NA 3", 90, "61-90", 2, Decimal("220000")),
+                ("NA 2", 31, "31-60", 1, Decimal("110000")),
+                ("NA 1", 30, "1-30", 2, Decimal("220000")),
+            ],
+        )
+        self.assertEqual(
+            {label: k["jumlah_pinjaman"] for label, k in hasil["kelompok"].items()},
+            {"1-30": 1, "31-60": 1, "61-90": 1, "90+": 1},
+        )
+
+    def test_filter_jenis(self):
+        hasil = hitung_tunggakan(self.PER_TANGGAL, jenis_id=self.reguler.pk)
+        self.assertEqual([r["nomor_anggota"] for r in hasil["rincian"]], ["NA 4", "NA 2", "NA 1"])
@@ -0,0 +1,120 @@
+"""
+Laporan umur tunggakan pinjaman (aging).
+
+Tunggakan = jadwal angsuran berstatus `belum` yang jatuh temponya sudah
+lewat, untuk pinjaman aktif. Jadwal dibuat dari tanggal_meminjam dan
+jatuh_tempo pinjaman, dan ditandai lunas oleh posting angsuran.
+Jumlah tunggakan = sisa pokok + sisa jasa: jasa yang sudah dibayar
+(termasuk bayar jasa saja) tidak dihitung lagi, tapi jadwalnya tetap
+menunggak sampai pokoknya dibayar.
+
+Seluruh portofolio dihitung dengan satu query grouped per pinjaman,
+hasilnya di-cache sampai ada angsuran baru (lihat versi_tunggakan).
+"""
+from collections import OrderedDict
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Count, F, Min, Sum
+
+from pinjaman.models import JadwalAngsuran
+from .utils import versi_tunggakan
+
+# (label, hari terlambat minimal, maksimal)
+KELOMPOK_UMUR = [
+    ("1-30", 1, 30),
+    ("31-60", 31, 60),
+    ("61-90", 61, 90),
+    ("90+", 91, None),
+]
+
+
+def kelompok_umur(hari):
+    for label, minimal, maksimal in KELOMPOK_UMUR:
+        if hari >= minimal and (maksimal is None or hari <= maksimal):
+            return label
+    return None
+
+
+def cache_key(per_tanggal, jenis_id=None, kategori_id=None):
+    return "laporan:tunggakan:{}:{}:{}:{}".format(
+        versi_tunggakan(), per_tanggal, jenis_id or "", kategori_id or ""
+    )
+
+
+def hitung_tunggakan(per_tanggal=None, jenis_id=None, kategori_id=None):
+    """
+    Return {
+        "per_tanggal": date,
+        "kelompok": {label: {"jumlah_pinjaman", "tunggakan", "sisa_pinjaman"}},
+        "rincian": [dict per pinjaman, urut dari yang paling lama menunggak],
+    }
+    """
+    per_tanggal = per_tanggal or date.today()
+    key = cache_key(per_tanggal, jenis_id, kategori_id)
+
+    hasil = cache.get(key)
+    if hasil is not None:
+        return hasil
+
+    jadwal = JadwalAngsuran.objects.filter(
+        status=JadwalAngsuran.BELUM,
+        jatuh_tempo__lt=per_tanggal,
+        pinjaman__status="aktif",
+    )
+    if jenis_id:
+        jadwal = jadwal.filter(pinjaman__id_jenis_pinjaman_id=jenis_id)
+    if kategori_id:
+        jadwal = jadwal.filter(pinjaman__id_kategori_jasa_id=kategori_id)
+
+    kelompok = OrderedDict(
+        (label, {"jumlah_pinjaman": 0, "tunggakan": 0, "sisa_pinjaman": 0})
+        for label, _, _ in KELOMPOK_UMUR
+    )
+    rincian = []
+
+    for row in (
+        jadwal.order_by()
+        .values(
+            "pinjaman_id",
+            "pinjaman__nomor_anggota_id",
+            "pinjaman__nomor_anggota__nama",
+            "pinjaman__id_jenis_pinjaman__nama_jenis",
+            "pinjaman__sisa_pinjaman",
+        )
+        .annotate(
+            tertua=Min("jatuh_tempo"),
+            bulan=Count("id"),
+            tunggakan=Sum(
+                F("pokok") - F("pokok_terbayar") + F("jasa") - F("jasa_terbayar")
+            ),
+        )
+        .iterator(chunk_size=2000)
+    ):
+        hari = (per_tanggal - row["tertua"]).days
+        label = kelompok_umur(hari)
+
+        total = kelompok[label]
+        total["jumlah_pinjaman"] += 1
+        total["tunggakan"] += row["tunggakan"]
+        total["sisa_pinjaman"] += row["pinjaman__sisa_pinjaman"]
+
+        rincian.append({
+            "id_pinjaman": row["pinjaman_id"],
+            "nomor_anggota": row["pinjaman__nomor_anggota_id"],
+            "nama": row["pinjaman__nomor_anggota__nama"],
+            "jenis": row["pinjaman__id_jenis_pinjaman__nama_jenis"],
+            "jatuh_tempo": row["tertua"],
+            "hari": hari,
+            "kelompok": label,
+            "bulan": row["bulan"],
+            "tunggakan": row["tunggakan"],
+            "sisa_pinjaman": row["pinjaman__sisa_pinjaman"],
+        })
+
+    rincian.sort(key=lambda r: (-r["hari"], r["nomor_anggota"]))
+
+    hasil = {"per_tanggal": per_tanggal, "kelompok": kelompok, "rincian": rincian}
+    # tanggal ikut key → entri lama kedaluwarsa sendiri
+    cache.set(key, hasil, 60 * 60 * 24)
+    return hasil
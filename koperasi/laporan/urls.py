@@ -0,0 +1,26 @@
+from django.urls import path
+from . import views
+
+app_name = "laporan"
+
+urlpatterns = [
+    # TUTUP BUKU
+    path("tutup-buku/", views.tutup_buku, name="tutup_buku"),
+    path("tutup-buku/<int:periode_id>/", views.rekap_periode, name="rekap_periode"),
+
+    # TUNGGAKAN PINJAMAN
+    path("tunggakan/", views.tunggakan, name="tunggakan"),
+
+    # SHU
+    path("shu/", views.shu, name="shu"),
+    path("shu/<int:perhitungan_id>/", views.shu_detail, name="shu_detail"),
+    path("shu/<int:perhitungan_id>/export/excel/", views.export_excel_shu, name="export_excel_shu"),
+
+    # DANA SOSIAL
+    path("dana-sosial/", views.dana_sosial, name="dana_sosial"),
+    path("dana-sosial/export/excel/", views.export_excel_dana_sosial, name="export_excel_dana_sosial"),
+
+    # REKENING KORAN
+    path("rekening-koran/", views.rekening_koran_semua, name="rekening_koran_semua"),
+    path("rekening-koran/<str:nomor_anggota>/", views.rekening_koran_anggota, name="rekening_koran_anggota"),
+]
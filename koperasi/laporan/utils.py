@@ -0,0 +1,156 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+
+CACHE_TUNGGAKAN_VERSI = "laporan:tunggakan_versi"
+
+
+def tutup_buku_terakhir():
+    """
+    TutupBuku terakhir (atau None). Selalu dibaca dari database (periode
+    unik, jadi ber-index) supaya kunci periode langsung berlaku di semua
+    worker begitu tutup buku di-commit.
+    """
+    from .models import TutupBuku
+
+    return TutupBuku.objects.order_by("-periode").first()
+
+
+# kunci bersama: transaksi mutasi tidak saling menunggu, hanya menunggu
+# (dan ditunggu) tutup_periode yang memegang kunci eksklusif
+KUNCI_BERSAMA = {
+    "postgresql": "FOR SHARE",
+    "mysql": "LOCK IN SHARE MODE",
+}
+
+
+def kunci_periode(eksklusif=False):
+    """
+    Kunci baris KunciPeriode lalu kembalikan TutupBuku terakhir.
+
+    Harus dipanggil di dalam transaction.atomic, sebelum mutasi ditulis.
+    Transaksi mutasi memegang kunci bersama, tutup_periode kunci eksklusif
+    (eksklusif=True) selama membuat snapshot: tutup buku menunggu mutasi
+    yang sedang berjalan commit, dan mutasi baru ke periode itu menunggu
+    lalu ditolak, tidak ikut commit setelah snapshot dibuat.
+    """
+    from .models import KunciPeriode
+
+    klausa = KUNCI_BERSAMA.get(connection.vendor)
+    if eksklusif or klausa is None:
+        ada = list(
+            KunciPeriode.objects.select_for_update().filter(pk=1).values_list("pk", flat=True)
+        )
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM {KunciPeriode._meta.db_table} WHERE id = %s {klausa}", [1]
+            )
+            ada = cursor.fetchall()
+
+    if not ada:
+        # baris dibuat migrasi 0003; buat ulang kalau tabel dikosongkan
+        KunciPeriode.objects.get_or_create(pk=1)
+        return kunci_periode(eksklusif)
+    return tutup_buku_terakhir()
+
+
+def periode_terkunci(tanggal, kunci=False):
+    terakhir = kunci_periode() if kunci else tutup_buku_terakhir()
+    return bool(terakhir and tanggal and tanggal <= terakhir.akhir_periode)
+
+
+def cek_periode_terbuka(tanggal, kunci=False):
+    """
+    ValidationError kalau `tanggal` ada di periode yang sudah ditutup.
+    kunci=True (di dalam transaksi yang menulis mutasi) sekaligus memegang
+    kunci periode sampai transaksi selesai; tanpa kunci hanya untuk
+    validasi form.
+    """
+    if periode_terkunci(tanggal, kunci=kunci):
+        raise ValidationError(
+            f"Periode {tanggal:%m-%Y} sudah ditutup, transaksi tidak bisa dicatat."
+        )
+
+
+def _cache():
+    # cache "laporan" (file) dipakai bersama semua proses, versi harus
+    # terlihat sama di setiap worker
+    return caches["laporan"]
+
+
+def versi_tunggakan():
+    """Versi cache laporan tunggakan, naik setiap ada angsuran baru."""
+    versi = _cache().get(CACHE_TUNGGAKAN_VERSI)
+    if versi is None:
+        versi = 1
+        _cache().set(CACHE_TUNGGAKAN_VERSI, versi, None)
+    return versi
+
+
+def reset_tunggakan():
+    """Buang cache laporan tunggakan setelah transaksi commit."""
+    def _naikkan():
+        try:
+            _cache().incr(CACHE_TUNGGAKAN_VERSI)
+        except ValueError:
+            _cache().set(CACHE_TUNGGAKAN_VERSI, 1, None)
+
+    transaction.on_commit(_naikkan)
+
+
+def snapshot_sebelum(tanggal):
+    """TutupBuku terakhir yang bulannya sudah lewat seluruhnya sebelum `tanggal`."""
+    from .models import TutupBuku
+
+    return (
+        TutupBuku.objects
+        .filter(periode__lt=tanggal.replace(day=1))
+        .order_by("-periode")
+        .first()
+    )
+
+
+def saldo_sebelum(tanggal, anggota_ids=None):
+    """
+    {(anggota_id, jenis_simpanan_id): saldo} sebelum `tanggal`:
+    snapshot tutup buku terakhir sebelum tanggal + mutasi history setelah
+    periode itu saja (tidak scan dari awal). `anggota_ids` None = semua.
+    """
+    from simpanan.models import HistoryTabungan
+
+    saldo = defaultdict(Decimal)
+    history = HistoryTabungan.objects.filter(
+        jenis_simpanan__isnull=False,
+        tanggal__lt=tanggal,
+    )
+    if anggota_ids is not None:
+        history = history.filter(anggota_id__in=anggota_ids)
+
+    snapshot = snapshot_sebelum(tanggal)
+    if snapshot:
+        rows = snapshot.saldo.all()
+        if anggota_ids is not None:
+            rows = rows.filter(anggota_id__in=anggota_ids)
+        for anggota_id, jenis_id, nilai in rows.values_list(
+            "anggota_id", "jenis_simpanan_id", "saldo"
+        ):
+            saldo[(anggota_id, jenis_id)] = nilai
+        history = history.filter(tanggal__gt=snapshot.akhir_periode)
+
+    for r in (
+        history.order_by()
+        .values("anggota_id", "jenis_simpanan_id")
+        .annotate(
+            setor=Sum("jumlah", filter=Q(jenis_transaksi=HistoryTabungan.SETOR)),
+            tarik=Sum("jumlah", filter=Q(jenis_transaksi=HistoryTabungan.TARIK)),
+        )
+    ):
+        saldo[(r["anggota_id"], r["jenis_simpanan_id"])] += (
+            (r["setor"] or 0) - (r["tarik"] or 0)
+        )
+    return saldo
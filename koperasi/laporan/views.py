@@ -1,3 +1,357 @@
-from django.shortcuts import render
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Count, Q, Sum
+from datetime import MAXYEAR, MINYEAR, date, datetime
 
-# Create your views here.
+from anggota.models import Anggota
+from pinjaman.models import JenisPinjaman, KategoriJasa
+from simpanan.models import DanaSosialAnggota, DanaSosialBulanan, JenisSimpanan
+from .export import export_xlsx, per_baris
+from .forms import SHUForm, TutupBukuForm
+from .models import PerhitunganSHU, SaldoPeriode, TutupBuku
+from .rekening_koran import nama_file, rekening_koran_pdf, stream_rekening_koran_zip
+from .services import tutup_periode
+from .shu import hitung_shu
+from .tunggakan import KELOMPOK_UMUR, hitung_tunggakan
+
+ROLE_TUTUP_BUKU = ["ketua", "bendahara"]
+ROLE_PENGURUS = ["ketua", "sekretaris", "bendahara"]
+
+
+def _rentang_tanggal(request):
+    dari = request.GET.get("dari") or None
+    sampai = request.GET.get("sampai") or None
+    try:
+        dari = datetime.strptime(dari, "%Y-%m-%d").date() if dari else None
+        sampai = datetime.strptime(sampai, "%Y-%m-%d").date() if sampai else None
+    except ValueError:
+        return None, None
+    return dari, sampai
+
+
+# ===============================
+# TUTUP BUKU
+# ===============================
+@login_required
+def tutup_buku(request):
+    if request.method == "POST":
+        if request.user.role not in ROLE_TUTUP_BUKU:
+            messages.error(request, "Tidak punya akses")
+            return redirect("laporan:tutup_buku")
+
+        form = TutupBukuForm(request.POST)
+        if form.is_valid():
+            try:
+                tutup = tutup_periode(form.cleaned_data["periode"], request.user)
+            except ValidationError as e:
+                form.add_error("periode", e)
+            else:
+                messages.success(request, f"Periode {tutup.periode:%m-%Y} berhasil ditutup")
+                return redirect("laporan:tutup_buku")
+    else:
+        form = TutupBukuForm()
+
+    paginator = Paginator(TutupBuku.objects.select_related("admin"), 12)
+    page_obj = paginator.get_page(request.GET.get("page"))
+
+    return render(request, "laporan/tutup_buku.html", {
+        "form": form,
+        "page_obj": page_obj,
+        "boleh_tutup": request.user.role in ROLE_TUTUP_BUKU,
+    })
+
+
+# ===============================
+# REKAP SALDO PERIODE (SUDAH DITUTUP)
+# ===============================
+@login_required
+def rekap_periode(request, periode_id):
+    tutup = get_object_or_404(TutupBuku, pk=periode_id)
+
+    # periode tertutup tidak bisa berubah lagi → cache tanpa kedaluwarsa
+    cache_key = f"laporan:rekap_periode:{tutup.pk}"
+    total_per_jenis = cache.get(cache_key)
+    if total_per_jenis is None:
+        nama_jenis = dict(JenisSimpanan.objects.values_list("id", "nama_jenis"))
+        total_per_jenis = [
+            {
+                "jenis": dict(JenisSimpanan.JENIS_CHOICES).get(
+                    nama_jenis.get(r["jenis_simpanan_id"]), "-"
+                ),
+                "total": r["total"] or 0,
+                "jumlah_anggota": r["jumlah_anggota"],
+            }
+            for r in (
+                SaldoPeriode.objects.filter(tutup_buku=tutup)
+                .order_by("jenis_simpanan_id")
+                .values("jenis_simpanan_id")
+                .annotate(total=Sum("saldo"), jumlah_anggota=Count("anggota_id"))
+            )
+        ]
+        cache.set(cache_key, total_per_jenis, None)
+
+    saldo_anggota = (
+        SaldoPeriode.objects.filter(tutup_buku=tutup)
+        .select_related("anggota", "jenis_simpanan")
+        .order_by("anggota_id", "jenis_simpanan_id")
+    )
+    paginator = Paginator(saldo_anggota, 20)
+    page_obj = paginator.get_page(request.GET.get("page"))
+
+    return render(request, "laporan/rekap_periode.html", {
+        "tutup": tutup,
+        "total_per_jenis": total_per_jenis,
+        "page_obj": page_obj,
+    })
+
+
+# ===============================
+# REKENING KORAN ANGGOTA
+# ===============================
+@login_required
+def rekening_koran_anggota(request, nomor_anggota):
+    if request.user.role not in ROLE_PENGURUS:
+        return redirect("dashboard")
+
+    anggota = get_object_or_404(Anggota, nomor_anggota=nomor_anggota)
+    dari, sampai = _rentang_tanggal(request)
+
+    response = HttpResponse(
+        rekening_koran_pdf(anggota, dari, sampai),
+        content_type="application/pdf"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{nama_file(anggota.pk)}"'
+    return response
+
+
+@login_required
+def rekening_koran_semua(request):
+    if request.user.role not in ROLE_PENGURUS:
+        return redirect("dashboard")
+
+    dari, sampai = _rentang_tanggal(request)
+
+    response = StreamingHttpResponse(
+        stream_rekening_koran_zip(Anggota.objects.all(), dari, sampai),
+        content_type="application/zip"
+    )
+    response["Content-Disposition"] = 'attachment; filename="rekening_koran.zip"'
+    return response
+
+
+# ===============================
+# UMUR TUNGGAKAN PINJAMAN
+# ===============================
+@login_required
+def tunggakan(request):
+    if request.user.role not in ROLE_PENGURUS:
+        return redirect("dashboard")
+
+    jenis_id = request.GET.get("jenis") or None
+    kategori_id = request.GET.get("kategori") or None
+    kelompok = request.GET.get("kelompok", "")
+    if jenis_id and not jenis_id.isdigit():
+        jenis_id = None
+    if kategori_id and not kategori_id.isdigit():
+        kategori_id = None
+
+    hasil = hitung_tunggakan(jenis_id=jenis_id, kategori_id=kategori_id)
+
+    rincian = hasil["rincian"]
+    if kelompok:
+        rincian = [r for r in rincian if r["kelompok"] == kelompok]
+    paginator = Paginator(rincian, 20)
+    page_obj = paginator.get_page(request.GET.get("page"))
+
+    return render(request, "laporan/tunggakan.html", {
+        "per_tanggal": hasil["per_tanggal"],
+        "data_kelompok": hasil["kelompok"].items(),
+        "total_tunggakan": sum(k["tunggakan"] for k in hasil["kelompok"].values()),
+        "page_obj": page_obj,
+        "jenis_list": JenisPinjaman.objects.all(),
+        "kategori_list": KategoriJasa.objects.all(),
+        "label_kelompok": [label for label, _, _ in KELOMPOK_UMUR],
+        "jenis_id": jenis_id or "",
+        "kategori_id": kategori_id or "",
+        "kelompok": kelompok,
+    })
+
+
+# ===============================
+# LAPORAN DANA SOSIAL
+# ===============================
+@login_required
+def dana_sosial(request):
+    if request.user.role not in ROLE_PENGURUS:
+        return redirect("dashboard")
+
+    # tahun di luar jangkauan date() (mis. ?tahun=0) → tahun berjalan
+    try:
+        tahun = int(request.GET.get("tahun", date.today().year))
+    except ValueError:
+        tahun = date.today().year
+    if not MINYEAR <= tahun <= MAXYEAR:
+        tahun = date.today().year
+    search_query = request.GET.get("search", "")
+
+    # saldo dana = total semua bulan (tabel rekap, bukan scan simpanan)
+    saldo_dana = DanaSosialBulanan.objects.aggregate(total=Sum("total"))["total"] or 0
+
+    per_bulan = {
+        r.periode.month: r
+        for r in DanaSosialBulanan.objects.filter(periode__year=tahun)
+    }
+    data_bulan = [
+        {
+            "periode": date(tahun, bulan, 1),
+            "total": per_bulan[bulan].total if bulan in per_bulan else 0,
+            "jumlah_transaksi": per_bulan[bulan].jumlah_transaksi if bulan in per_bulan else 0,
+        }
+        for bulan in range(1, 13)
+    ]
+
+    anggota_qs = DanaSosialAnggota.objects.select_related("anggota").order_by("anggota_id")
+    if search_query:
+        anggota_qs = anggota_qs.filter(
+            Q(anggota__nama__icontains=search_query) |
+            Q(anggota__nomor_anggota__icontains=search_query)
+        )
+    paginator = Paginator(anggota_qs, 20)
+    page_obj = paginator.get_page(request.GET.get("page"))
+
+    return render(request, "laporan/dana_sosial.html", {
+        "tahun": tahun,
+        "saldo_dana": saldo_dana,
+        "total_tahun": sum(b["total"] for b in data_bulan),
+        "data_bulan": data_bulan,
+        "page_obj": page_obj,
+        "search_query": search_query,
+    })
+
+
+@login_required
+def export_excel_dana_sosial(request):
+    if request.user.role not in ROLE_PENGURUS:
+        return redirect("dashboard")
+
+    per_bulan = (
+        (r.periode.strftime("%m-%Y"), r.jumlah_transaksi, r.total)
+        for r in per_baris(DanaSosialBulanan.objects.all(), ["periode"])
+    )
+    per_anggota = per_baris(
+        DanaSosialAnggota.objects.values_list(
+            "anggota_id", "anggota__nama", "jumlah_transaksi", "total", "terakhir", named=True,
+        ),
+        ["anggota_id"],
+    )
+
+    return export_xlsx("dana_sosial", [
+        ("Per Bulan", ["Periode", "Jumlah Transaksi", "Total Dana Sosial"], per_bulan),
+        ("Per Anggota", ["No. Anggota", "Nama", "Jumlah Transaksi", "Total Dana Sosial", "Terakhir Bayar"], per_anggota),
+    ])
+
+
+# ===============================
+# SHU AKHIR TAHUN
+# ===============================
+@login_required
+def shu(request):
+    if request.user.role not in ROLE_PENGURUS:
+        return redirect("dashboard")
+
+    if request.method == "POST":
+        if request.user.role not in ROLE_TUTUP_BUKU:
+            messages.error(request, "Tidak punya akses")
+            return redirect("laporan:shu")
+
+        form = SHUForm(request.POST)
+        if form.is_valid():
+            perhitungan = hitung_shu(
+                form.cleaned_data["tahun"],
+                form.cleaned_data["total_shu"],
+                form.cleaned_data["persen_jasa_simpanan"],
+                form.cleaned_data["persen_jasa_pinjaman"],
+                request.user,
+            )
+            messages.success(request, f"{perhitungan} berhasil dihitung")
+            return redirect("laporan:shu_detail", perhitungan.pk)
+    else:
+        form = SHUForm()
+
+    paginator = Paginator(PerhitunganSHU.objects.select_related("admin"), 12)
+    page_obj = paginator.get_page(request.GET.get("page"))
+
+    return render(request, "laporan/shu.html", {
+        "form": form,
+        "page_obj": page_obj,
+        "boleh_hitung": request.user.role in ROLE_TUTUP_BUKU,
+    })
+
+
+@login_required
+def shu_detail(request, perhitungan_id):
+    if request.user.role not in ROLE_PENGURUS:
+        return redirect("dashboard")
+
+    perhitungan = get_object_or_404(PerhitunganSHU, pk=perhitungan_id)
+    search_query = request.GET.get("search", "")
+
+    rincian = perhitungan.rincian.select_related("anggota")
+    if search_query:
+        rincian = rincian.filter(
+            Q(anggota__nama__icontains=search_query) |
+            Q(anggota__nomor_anggota__icontains=search_query)
+        )
+    paginator = Paginator(rincian, 20)
+    page_obj = paginator.get_page(request.GET.get("page"))
+
+    total = perhitungan.rincian.aggregate(
+        simpanan=Sum("shu_simpanan"),
+        pinjaman=Sum("shu_pinjaman"),
+        total=Sum("total"),
+    )
+
+    return render(request, "laporan/shu_detail.html", {
+        "perhitungan": perhitungan,
+        "page_obj": page_obj,
+        "search_query": search_query,
+        "total": total,
+    })
+
+
+@login_required
+def export_excel_shu(request, perhitungan_id):
+    if request.user.role not in ROLE_PENGURUS:
+        return redirect("dashboard")
+
+    perhitungan = get_object_or_404(PerhitunganSHU, pk=perhitungan_id)
+
+    parameter = [
+        ("Tahun", perhitungan.tahun),
+        ("Versi", perhitungan.versi),
+        ("SHU bagian anggota", perhitungan.total_shu),
+        ("Jasa simpanan (%)", perhitungan.persen_jasa_simpanan),
+        ("Jasa pinjaman (%)", perhitungan.persen_jasa_pinjaman),
+        ("Total saldo rata-rata", perhitungan.total_saldo_rata_rata),
+        ("Total jasa pinjaman", perhitungan.total_jasa_pinjaman),
+    ]
+    rincian = per_baris(
+        perhitungan.rincian.values_list(
+            "anggota_id", "anggota__nama", "saldo_rata_rata", "jasa_pinjaman",
+            "shu_simpanan", "shu_pinjaman", "total", named=True,
+        ),
+        ["anggota_id"],
+    )
+
+    return export_xlsx(f"shu_{perhitungan.tahun}_v{perhitungan.versi}", [
+        (f"SHU {perhitungan.tahun}", [
+            "No. Anggota", "Nama", "Saldo Rata-rata", "Jasa Pinjaman Dibayar",
+            "SHU Jasa Simpanan", "SHU Jasa Pinjaman", "Total SHU"
+        ], rincian),
+        ("Parameter", ["Keterangan", "Nilai"], parameter),
+    ])
@@ -1,6 +1,11 @@
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
 from django import forms
-from decimal import Decimal
-from .models import Pinjaman
+
+from anggota.models import Anggota
+from .models import Angsuran, Pinjaman
+from .utils import pilihan_form_pinjaman
 
 
 class PinjamanForm(forms.ModelForm):
@@ -49,6 +54,31 @@ class PinjamanForm(forms.ModelForm):
             }),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # anggota dipilih lewat select2 ajax: <select> hanya berisi
+        # anggota yang sedang dipilih, validasi cukup ambil satu baris
+        anggota_field = self.fields['nomor_anggota']
+        anggota_field.queryset = Anggota.objects.filter(status='aktif').only(
+            'nomor_anggota', 'nama'
+        )
+        anggota_field.error_messages['invalid_choice'] = (
+            'Anggota tidak ditemukan atau tidak aktif.'
+        )
+        anggota_field.choices = self._anggota_terpilih()
+
+        pilihan = pilihan_form_pinjaman()
+        self.fields['id_jenis_pinjaman'].choices = [('', '---------')] + pilihan['jenis']
+        self.fields['id_kategori_jasa'].choices = [('', '---------')] + pilihan['kategori']
+
+    def _anggota_terpilih(self):
+        nomor = self.data.get('nomor_anggota') if self.is_bound else self.initial.get('nomor_anggota')
+        if not nomor:
+            return []
+        anggota = Anggota.objects.filter(pk=nomor).only('nomor_anggota', 'nama').first()
+        return [(anggota.pk, str(anggota))] if anggota else []
+
     def clean_jumlah_pinjaman(self):
         value = self.cleaned_data.get('jumlah_pinjaman')
         return Decimal(str(value).replace('.', '').replace(',', ''))
@@ -66,3 +96,49 @@ class PinjamanForm(forms.ModelForm):
             cleaned['jasa_rupiah'] = jumlah * persen / Decimal('100')
 
         return cleaned
+
+
+class AngsuranForm(forms.Form):
+    tipe_bayar = forms.ChoiceField(
+        choices=Angsuran.TIPE_BAYAR_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    tanggal_bayar = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    jumlah_bayar = forms.CharField(
+        required=False,
+        help_text='Kosongkan untuk membayar sesuai jadwal',
+        widget=forms.TextInput(attrs={'class': 'form-control rupiah-input'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['tanggal_bayar'].initial = date.today()
+
+    def clean_jumlah_bayar(self):
+        value = self.cleaned_data.get('jumlah_bayar')
+        if not value:
+            return None
+        try:
+            return Decimal(str(value).replace('.', '').replace(',', ''))
+        except InvalidOperation:
+            raise forms.ValidationError('Jumlah bayar tidak valid.')
+
+
+class PostingAngsuranForm(forms.Form):
+    bulan = forms.DateField(
+        input_formats=['%Y-%m'],
+        widget=forms.DateInput(
+            attrs={'type': 'month', 'class': 'form-control'},
+            format='%Y-%m'
+        )
+    )
+    tanggal_bayar = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['bulan'].initial = date.today().replace(day=1)
+        self.fields['tanggal_bayar'].initial = date.today()
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:10
+
+import copy
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# model Pinjaman sudah lama memakai nama kolom baru, sedangkan 0001_initial
+# masih mencatat nama lama. Database yang dibuat dari 0001 punya kolom lama,
+# database produksi sudah memakai kolom baru → rename hanya kalau perlu.
+KOLOM = [
+    ('id_admin', 'id_admin', 'admin_id'),
+    ('id_jenis_pinjaman', 'id_jenis_pinjaman', 'jenis_pinjaman_id'),
+    ('id_kategori_jasa', 'id_kategori_jasa', 'kategori_jasa_id'),
+    ('nomor_anggota', 'nomor_anggota', 'anggota_id'),
+]
+
+
+def _rename_kolom(apps, schema_editor, maju):
+    Pinjaman = apps.get_model('pinjaman', 'Pinjaman')
+    with schema_editor.connection.cursor() as cursor:
+        kolom_ada = {
+            c.name
+            for c in schema_editor.connection.introspection.get_table_description(
+                cursor, Pinjaman._meta.db_table
+            )
+        }
+
+    for field_name, lama, baru in KOLOM:
+        dari, ke = (lama, baru) if maju else (baru, lama)
+        if dari not in kolom_ada or ke in kolom_ada:
+            continue
+
+        # copy (bukan clone) supaya relasi ke model tujuan tetap ter-resolve
+        field = Pinjaman._meta.get_field(field_name)
+        field_lama, field_baru = copy.copy(field), copy.copy(field)
+        for f, kolom in ((field_lama, dari), (field_baru, ke)):
+            f.db_column = kolom
+            f.set_attributes_from_name(field_name)
+        schema_editor.alter_field(Pinjaman, field_lama, field_baru)
+
+        # SQLite menyusun ulang tabel dari model: model historis harus ikut
+        # kolom yang sudah di-rename supaya rename berikutnya tidak membatalkannya
+        field.db_column = ke
+        field.set_attributes_from_name(field_name)
+
+
+def rename_kolom(apps, schema_editor):
+    _rename_kolom(apps, schema_editor, maju=True)
+
+
+def kembalikan_kolom(apps, schema_editor):
+    _rename_kolom(apps, schema_editor, maju=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0004_alter_anggota_nomor_anggota'),
+        ('pinjaman', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(rename_kolom, kembalikan_kolom),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='pinjaman',
+                    name='id_admin',
+                    field=models.ForeignKey(db_column='admin_id', on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='pinjaman',
+                    name='id_jenis_pinjaman',
+                    field=models.ForeignKey(db_column='jenis_pinjaman_id', on_delete=django.db.models.deletion.CASCADE, to='pinjaman.jenispinjaman'),
+                ),
+                migrations.AlterField(
+                    model_name='pinjaman',
+                    name='id_kategori_jasa',
+                    field=models.ForeignKey(db_column='kategori_jasa_id', default=1, on_delete=django.db.models.deletion.CASCADE, to='pinjaman.kategorijasa'),
+                ),
+                migrations.AlterField(
+                    model_name='pinjaman',
+                    name='nomor_anggota',
+                    field=models.ForeignKey(db_column='anggota_id', on_delete=django.db.models.deletion.CASCADE, to='anggota.anggota'),
+                ),
+            ],
+        ),
+    ]
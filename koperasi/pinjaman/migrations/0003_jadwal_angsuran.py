@@ -0,0 +1,65 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+from pinjaman.utils import hitung_jadwal
+
+
+def isi_jadwal(apps, schema_editor):
+    Pinjaman = apps.get_model('pinjaman', 'Pinjaman')
+    JadwalAngsuran = apps.get_model('pinjaman', 'JadwalAngsuran')
+
+    # pinjaman aktif: jadwal dibuat ulang, bulan yang sudah dicicil = lunas
+    pinjaman_aktif = Pinjaman.objects.filter(status='aktif').annotate(
+        sudah_dicicil=Count('angsuran', filter=Q(angsuran__tipe_bayar='cicilan'))
+    )
+
+    batch = []
+    for p in pinjaman_aktif.iterator(chunk_size=500):
+        for ke, jatuh_tempo, pokok, jasa in hitung_jadwal(
+            p.jumlah_pinjaman, p.jasa_rupiah, p.tanggal_meminjam, p.jatuh_tempo
+        ):
+            batch.append(JadwalAngsuran(
+                pinjaman_id=p.pk,
+                angsuran_ke=ke,
+                jatuh_tempo=jatuh_tempo,
+                pokok=pokok,
+                jasa=jasa,
+                status='lunas' if ke <= p.sudah_dicicil else 'belum',
+            ))
+        if len(batch) >= 1000:
+            JadwalAngsuran.objects.bulk_create(batch)
+            batch = []
+    JadwalAngsuran.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pinjaman', '0002_alter_pinjaman_id_admin_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JadwalAngsuran',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('angsuran_ke', models.PositiveSmallIntegerField()),
+                ('jatuh_tempo', models.DateField()),
+                ('pokok', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('jasa', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('status', models.CharField(choices=[('belum', 'Belum Bayar'), ('lunas', 'Lunas'), ('digabung', 'Digabung')], default='belum', max_length=10)),
+                ('tanggal_bayar', models.DateField(blank=True, null=True)),
+                ('pinjaman', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jadwal', to='pinjaman.pinjaman')),
+            ],
+            options={
+                'db_table': 'Jadwal_Angsuran',
+                'ordering': ['jatuh_tempo', 'pinjaman_id', 'angsuran_ke'],
+                'indexes': [models.Index(fields=['jatuh_tempo', 'status'], name='idx_jadwal_tempo_status')],
+                'constraints': [models.UniqueConstraint(fields=('pinjaman', 'angsuran_ke'), name='uniq_jadwal_pinjaman_ke')],
+            },
+        ),
+        migrations.RunPython(isi_jadwal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pinjaman', '0003_jadwal_angsuran'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jadwalangsuran',
+            name='pokok_terbayar',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Bagian pokok yang sudah dibayar (angsuran sebagian)', max_digits=18),
+        ),
+    ]
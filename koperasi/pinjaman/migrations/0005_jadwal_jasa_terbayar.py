@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-18 18:08
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def isi_jasa_terbayar(apps, schema_editor):
+    # jadwal yang sudah lunas dibayar cicilan + jasa
+    JadwalAngsuran = apps.get_model('pinjaman', 'JadwalAngsuran')
+    JadwalAngsuran.objects.filter(status='lunas').update(jasa_terbayar=F('jasa'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pinjaman', '0004_jadwal_pokok_terbayar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jadwalangsuran',
+            name='jasa_terbayar',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Jasa yang sudah dibayar (termasuk bayar jasa saja)', max_digits=18),
+        ),
+        migrations.RunPython(isi_jasa_terbayar, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from anggota.models import Anggota
 from admin_koperasi.models import User
 from django.conf import settings
+from laporan.utils import cek_periode_terbuka, reset_tunggakan
+from .utils import naikkan_versi_pilihan_pinjaman
 
 
 
@@ -18,6 +20,15 @@ class KategoriJasa(models.Model):
     def __str__(self):
         return self.kategori_jasa
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        naikkan_versi_pilihan_pinjaman()
+
+    def delete(self, *args, **kwargs):
+        hasil = super().delete(*args, **kwargs)
+        naikkan_versi_pilihan_pinjaman()
+        return hasil
+
 
 # =========================
 # JENIS PINJAMAN
@@ -38,6 +49,15 @@ class JenisPinjaman(models.Model):
     def __str__(self):
         return self.nama_jenis
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        naikkan_versi_pilihan_pinjaman()
+
+    def delete(self, *args, **kwargs):
+        hasil = super().delete(*args, **kwargs)
+        naikkan_versi_pilihan_pinjaman()
+        return hasil
+
 
 # =========================
 # PINJAMAN (MIRIP CONTOH)
@@ -162,3 +182,90 @@ class Angsuran(models.Model):
 
     def __str__(self):
         return f"Angsuran {self.id_pembayaran} - Pinjaman {self.id_pinjaman.id_pinjaman}"
+
+    def save(self, *args, **kwargs):
+        # biasanya sudah di dalam transaksi bayar_angsuran: tanpa savepoint
+        with transaction.atomic(savepoint=False):
+            cek_periode_terbuka(self.tanggal_bayar, kunci=True)
+            super().save(*args, **kwargs)
+            reset_tunggakan()
+
+
+# =========================
+# JADWAL ANGSURAN (AMORTISASI)
+# =========================
+class JadwalAngsuran(models.Model):
+    """
+    Satu baris per bulan per pinjaman, dibuat saat pinjaman disimpan.
+    Tagihan bulanan cukup range scan di (jatuh_tempo, status).
+    """
+    BELUM = 'belum'
+    LUNAS = 'lunas'
+    DIGABUNG = 'digabung'
+
+    STATUS_CHOICES = [
+        (BELUM, 'Belum Bayar'),
+        (LUNAS, 'Lunas'),
+        (DIGABUNG, 'Digabung'),
+    ]
+
+    pinjaman = models.ForeignKey(
+        Pinjaman,
+        on_delete=models.CASCADE,
+        related_name='jadwal'
+    )
+    angsuran_ke = models.PositiveSmallIntegerField()
+    jatuh_tempo = models.DateField()
+
+    pokok = models.DecimalField(max_digits=18, decimal_places=2)
+    jasa = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    pokok_terbayar = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=0,
+        help_text='Bagian pokok yang sudah dibayar (angsuran sebagian)'
+    )
+    jasa_terbayar = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=0,
+        help_text='Jasa yang sudah dibayar (termasuk bayar jasa saja)'
+    )
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=BELUM
+    )
+    tanggal_bayar = models.DateField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'Jadwal_Angsuran'
+        ordering = ['jatuh_tempo', 'pinjaman_id', 'angsuran_ke']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['pinjaman', 'angsuran_ke'],
+                name='uniq_jadwal_pinjaman_ke'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['jatuh_tempo', 'status'],
+                name='idx_jadwal_tempo_status'
+            )
+        ]
+
+    def __str__(self):
+        return f"Jadwal {self.angsuran_ke} - Pinjaman {self.pinjaman_id}"
+
+    @property
+    def sisa_pokok(self):
+        return self.pokok - self.pokok_terbayar
+
+    @property
+    def sisa_jasa(self):
+        return self.jasa - self.jasa_terbayar
+
+    @property
+    def total(self):
+        return self.sisa_pokok + self.sisa_jasa
@@ -0,0 +1,282 @@
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+
+from laporan.utils import cek_periode_terbuka, reset_tunggakan
+from .models import Angsuran, JadwalAngsuran, Pinjaman
+from .utils import hitung_jadwal, tambah_bulan
+
+CHUNK_SIZE = 500
+
+
+# ======================================================
+# JADWAL ANGSURAN
+# ======================================================
+def buat_jadwal(pinjaman):
+    """
+    (Re)generate jadwal angsuran satu pinjaman dari datanya sekarang.
+    Jadwal yang sudah lunas atau sudah dibayar sebagian tidak diubah.
+    """
+    with transaction.atomic():
+        pinjaman.jadwal.filter(
+            status=JadwalAngsuran.BELUM, pokok_terbayar=0, jasa_terbayar=0
+        ).delete()
+        sudah_lunas = set(
+            pinjaman.jadwal.values_list('angsuran_ke', flat=True)
+        )
+
+        JadwalAngsuran.objects.bulk_create([
+            JadwalAngsuran(
+                pinjaman=pinjaman,
+                angsuran_ke=ke,
+                jatuh_tempo=jatuh_tempo,
+                pokok=pokok,
+                jasa=jasa,
+            )
+            for ke, jatuh_tempo, pokok, jasa in hitung_jadwal(
+                pinjaman.jumlah_pinjaman,
+                pinjaman.jasa_rupiah,
+                pinjaman.tanggal_meminjam,
+                pinjaman.jatuh_tempo,
+            )
+            if ke not in sudah_lunas
+        ])
+
+
+def gabungkan_pinjaman(pinjaman_baru, pinjaman_lama):
+    """
+    Pinjaman aktif sejenis digabung ke pinjaman baru: sisa lama ditambahkan
+    ke pokok baru, jadwal lama yang belum dibayar ditutup (status digabung),
+    dan jadwal pinjaman baru dibuat dari jumlah gabungan.
+    """
+    with transaction.atomic():
+        lama_ids = list(
+            pinjaman_lama.select_for_update().values_list('id_pinjaman', flat=True)
+        )
+        total_sisa = sum(
+            Pinjaman.objects.filter(id_pinjaman__in=lama_ids)
+            .values_list('sisa_pinjaman', flat=True)
+        )
+
+        if lama_ids:
+            pinjaman_baru.jumlah_pinjaman += total_sisa
+            pinjaman_baru.sisa_pinjaman = pinjaman_baru.jumlah_pinjaman
+
+            Pinjaman.objects.filter(id_pinjaman__in=lama_ids).update(status='digabung')
+            JadwalAngsuran.objects.filter(
+                pinjaman_id__in=lama_ids,
+                status=JadwalAngsuran.BELUM
+            ).update(status=JadwalAngsuran.DIGABUNG)
+
+        pinjaman_baru.save()
+        buat_jadwal(pinjaman_baru)
+        reset_tunggakan()
+
+    return pinjaman_baru
+
+
+# ======================================================
+# POSTING ANGSURAN
+# ======================================================
+def bayar_angsuran(pinjaman_id, tipe_bayar, tanggal_bayar, admin, jumlah_bayar=None):
+    """
+    Catat satu pembayaran angsuran dengan mengunci baris pinjaman.
+
+    - cicilan: bayar sisa pokok + sisa jasa jadwal berikutnya (atau
+      `jumlah_bayar` kalau diisi: jasa dulu, sisanya mengurangi pokok),
+      sisa_pinjaman berkurang sebesar pokok
+    - jasa: bayar jasa jadwal pertama yang jasanya belum dibayar,
+      sisa_pinjaman tetap; jadwalnya tetap `belum` sampai pokoknya dibayar
+
+    Jasa yang dibayar dicatat di jasa_terbayar jadwalnya, jadi cicilan
+    berikutnya dan laporan tunggakan tidak menagihnya lagi.
+
+    Pokok dibagi ke jadwal `belum` berurutan (_bagi_pokok): jadwal yang
+    pokoknya tertutup penuh jadi lunas, yang tertutup sebagian mencatat
+    pokok_terbayar dan tetap `belum`.
+
+    Sisa nol → status pinjaman `lunas` dan jadwal sisanya ikut lunas.
+    """
+    with transaction.atomic():
+        pinjaman = (
+            Pinjaman.objects.select_for_update()
+            .filter(pk=pinjaman_id)
+            .first()
+        )
+        if pinjaman is None or pinjaman.status != 'aktif':
+            raise ValidationError("Pinjaman tidak aktif.")
+
+        jadwal_belum = pinjaman.jadwal.filter(
+            status=JadwalAngsuran.BELUM
+        ).order_by('angsuran_ke')
+        jadwal = jadwal_belum.first()
+
+        if tipe_bayar == 'jasa':
+            jadwal = jadwal_belum.filter(jasa_terbayar__lt=F('jasa')).first()
+            if jadwal is None and jadwal_belum.exists():
+                raise ValidationError("Jasa semua jadwal yang belum lunas sudah dibayar.")
+
+        jasa = jadwal.sisa_jasa if jadwal else (pinjaman.jasa_rupiah or Decimal('0'))
+
+        if tipe_bayar == 'jasa':
+            pokok = Decimal('0')
+            jumlah_bayar = jasa
+        else:
+            if jumlah_bayar is None:
+                pokok = jadwal.sisa_pokok if jadwal else pinjaman.sisa_pinjaman
+            else:
+                pokok = jumlah_bayar - jasa
+                if pokok < 0:
+                    raise ValidationError(
+                        f"Jumlah bayar kurang dari jasa Rp {jasa:,.0f}"
+                    )
+            pokok = min(pokok, pinjaman.sisa_pinjaman)
+            jumlah_bayar = pokok + jasa
+
+        angsuran = Angsuran(
+            id_pinjaman=pinjaman,
+            id_admin=admin,
+            jumlah_bayar=jumlah_bayar,
+            tanggal_bayar=tanggal_bayar,
+            tipe_bayar=tipe_bayar,
+        )
+        angsuran.save()
+
+        if jadwal and jasa:
+            JadwalAngsuran.objects.filter(pk=jadwal.pk).update(jasa_terbayar=F('jasa'))
+
+        if pokok:
+            Pinjaman.objects.filter(pk=pinjaman.pk).update(
+                sisa_pinjaman=F('sisa_pinjaman') - pokok
+            )
+            pinjaman.refresh_from_db(fields=['sisa_pinjaman'])
+
+            if pinjaman.sisa_pinjaman <= 0:
+                _tandai_lunas([pinjaman.pk], tanggal_bayar)
+            else:
+                _bagi_pokok(jadwal_belum, pokok, tanggal_bayar)
+
+    return angsuran
+
+
+def _bagi_pokok(jadwal_belum, pokok, tanggal_bayar):
+    """Lunasi jadwal berurutan sebesar `pokok`; sisanya dicatat di jadwal terakhir."""
+    diubah = []
+    for jadwal in jadwal_belum.iterator():
+        if pokok <= 0:
+            break
+        bayar = min(pokok, jadwal.sisa_pokok)
+        jadwal.pokok_terbayar += bayar
+        pokok -= bayar
+        if jadwal.sisa_pokok <= 0:
+            jadwal.status = JadwalAngsuran.LUNAS
+            jadwal.tanggal_bayar = tanggal_bayar
+        diubah.append(jadwal)
+
+    JadwalAngsuran.objects.bulk_update(
+        diubah, ['pokok_terbayar', 'status', 'tanggal_bayar'], batch_size=CHUNK_SIZE
+    )
+
+
+def _tandai_lunas(pinjaman_ids, tanggal_bayar):
+    Pinjaman.objects.filter(pk__in=pinjaman_ids).update(status='lunas')
+    JadwalAngsuran.objects.filter(
+        pinjaman_id__in=pinjaman_ids,
+        status=JadwalAngsuran.BELUM
+    ).update(
+        status=JadwalAngsuran.LUNAS,
+        pokok_terbayar=F('pokok'),
+        tanggal_bayar=tanggal_bayar,
+    )
+
+
+def posting_angsuran_bulanan(bulan, tanggal_bayar, admin):
+    """
+    Posting potongan gaji satu bulan: semua jadwal `belum` yang jatuh
+    tempo di bulan tsb (pinjaman aktif) dibayar cicilan + jasa.
+
+    Satu transaksi (gagal → tidak ada yang tercatat), diproses per
+    CHUNK_SIZE pinjaman: lock baris pinjaman, bulk_create angsuran,
+    bulk_update sisa pinjaman dan jadwal. Return jumlah angsuran.
+    """
+    awal = bulan.replace(day=1)
+    akhir = tambah_bulan(awal, 1)
+
+    jumlah = 0
+    with transaction.atomic():
+        cek_periode_terbuka(tanggal_bayar, kunci=True)
+
+        pinjaman_ids = list(
+            JadwalAngsuran.objects.filter(
+                jatuh_tempo__gte=awal,
+                jatuh_tempo__lt=akhir,
+                status=JadwalAngsuran.BELUM,
+                pinjaman__status='aktif',
+            )
+            .order_by('pinjaman_id')
+            .values_list('pinjaman_id', flat=True)
+            .distinct()
+        )
+
+        for i in range(0, len(pinjaman_ids), CHUNK_SIZE):
+            jumlah += _posting_chunk(
+                pinjaman_ids[i:i + CHUNK_SIZE], awal, akhir, tanggal_bayar, admin
+            )
+
+        # bulk_create tidak lewat Angsuran.save()
+        reset_tunggakan()
+
+    return jumlah
+
+
+def _posting_chunk(pinjaman_ids, awal, akhir, tanggal_bayar, admin):
+    pinjaman_map = {
+        p.pk: p
+        for p in Pinjaman.objects.select_for_update()
+        .filter(pk__in=pinjaman_ids, status='aktif')
+        .only('id_pinjaman', 'sisa_pinjaman', 'status')
+    }
+    jadwal_list = list(
+        JadwalAngsuran.objects.filter(
+            pinjaman_id__in=pinjaman_map.keys(),
+            jatuh_tempo__gte=awal,
+            jatuh_tempo__lt=akhir,
+            status=JadwalAngsuran.BELUM,
+        ).order_by('pinjaman_id', 'angsuran_ke')
+    )
+
+    angsuran_baru = []
+    for jadwal in jadwal_list:
+        pinjaman = pinjaman_map[jadwal.pinjaman_id]
+        pokok = min(jadwal.sisa_pokok, pinjaman.sisa_pinjaman)
+        pinjaman.sisa_pinjaman -= pokok
+
+        angsuran_baru.append(Angsuran(
+            id_pinjaman_id=pinjaman.pk,
+            id_admin=admin,
+            jumlah_bayar=pokok + jadwal.sisa_jasa,
+            tanggal_bayar=tanggal_bayar,
+            tipe_bayar='cicilan',
+        ))
+        jadwal.pokok_terbayar += pokok
+        jadwal.jasa_terbayar = jadwal.jasa
+        jadwal.status = JadwalAngsuran.LUNAS
+        jadwal.tanggal_bayar = tanggal_bayar
+
+    Angsuran.objects.bulk_create(angsuran_baru, batch_size=CHUNK_SIZE)
+    JadwalAngsuran.objects.bulk_update(
+        jadwal_list,
+        ['pokok_terbayar', 'jasa_terbayar', 'status', 'tanggal_bayar'],
+        batch_size=CHUNK_SIZE
+    )
+    Pinjaman.objects.bulk_update(
+        pinjaman_map.values(), ['sisa_pinjaman'], batch_size=CHUNK_SIZE
+    )
+
+    lunas = [p.pk for p in pinjaman_map.values() if p.sisa_pinjaman <= 0]
+    if lunas:
+        _tandai_lunas(lunas, tanggal_bayar)
+
+    return len(angsuran_baru)
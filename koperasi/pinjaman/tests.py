@@ -1,3 +1,235 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from admin_koperasi.models import User
+from anggota.models import Anggota
+from laporan.tunggakan import hitung_tunggakan
+from .models import Angsuran, JadwalAngsuran, JenisPinjaman, KategoriJasa, Pinjaman
+from .services import bayar_angsuran, buat_jadwal
+from .utils import hitung_jadwal, pilihan_form_pinjaman
+
+CACHE_TEST = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "laporan": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "pinjaman-test"},
+}
+
+
+# ======================================================
+# PEMBAYARAN ANGSURAN DIBAGI KE JADWAL BERURUTAN
+# (1.200.000 / 12 bulan → pokok 100.000 + jasa 10.000 per bulan)
+# ======================================================
+@override_settings(CACHES=CACHE_TEST)
+class BayarAngsuranTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user("bendahara", password="x", role="bendahara")
+        anggota = Anggota.objects.create(
+            nomor_anggota="NA 1", nama="Anggota 1", jenis_kelamin="Laki-laki"
+        )
+        self.pinjaman = Pinjaman.objects.create(
+            nomor_anggota=anggota,
+            id_jenis_pinjaman=JenisPinjaman.objects.create(nama_jenis="Reguler"),
+            id_kategori_jasa=KategoriJasa.objects.create(kategori_jasa="Umum"),
+            id_admin=self.admin,
+            jumlah_pinjaman=Decimal("1200000"),
+            angsuran_per_bulan=Decimal("100000"),
+            jasa_rupiah=Decimal("10000"),
+            tanggal_meminjam=datetime.date.today(),
+            jatuh_tempo=12,
+            sisa_pinjaman=Decimal("1200000"),
+            status="aktif",
+        )
+        buat_jadwal(self.pinjaman)
+
+    def _bayar(self, jumlah=None, tipe="cicilan"):
+        return bayar_angsuran(
+            self.pinjaman.pk, tipe, datetime.date.today(), self.admin, jumlah
+        )
+
+    def _jadwal(self):
+        return {
+            j.angsuran_ke: (j.status, j.pokok_terbayar)
+            for j in self.pinjaman.jadwal.all()
+        }
+
+    def _sisa(self):
+        self.pinjaman.refresh_from_db()
+        return self.pinjaman.sisa_pinjaman
+
+    def test_bayar_sebagian_tidak_melunasi_jadwal(self):
+        self._bayar(Decimal("60000"))
+
+        jadwal = self._jadwal()
+        self.assertEqual(jadwal[1], (JadwalAngsuran.BELUM, Decimal("50000")))
+        self.assertEqual(jadwal[2], (JadwalAngsuran.BELUM, Decimal("0")))
+        self.assertEqual(self._sisa(), Decimal("1150000"))
+
+        # jasa jadwal 1 sudah ikut dibayar → tinggal sisa pokoknya
+        angsuran = self._bayar()
+        self.assertEqual(angsuran.jumlah_bayar, Decimal("50000"))
+        self.assertEqual(self._jadwal()[1], (JadwalAngsuran.LUNAS, Decimal("100000")))
+        self.assertEqual(self._sisa(), Decimal("1100000"))
+
+    def test_bayar_lebih_dibagi_ke_jadwal_berikutnya(self):
+        self._bayar(Decimal("260000"))
+
+        jadwal = self._jadwal()
+        self.assertEqual(jadwal[1], (JadwalAngsuran.LUNAS, Decimal("100000")))
+        self.assertEqual(jadwal[2], (JadwalAngsuran.LUNAS, Decimal("100000")))
+        self.assertEqual(jadwal[3], (JadwalAngsuran.BELUM, Decimal("50000")))
+        self.assertEqual(jadwal[4], (JadwalAngsuran.BELUM, Decimal("0")))
+        self.assertEqual(self._sisa(), Decimal("950000"))
+
+    def test_pelunasan(self):
+        self._bayar(Decimal("60000"))
+        angsuran = self._bayar(Decimal("5000000"))
+
+        # pokok dibatasi sisa pinjaman, jasa jadwal 1 sudah dibayar
+        self.assertEqual(angsuran.jumlah_bayar, Decimal("1150000"))
+        self.assertEqual(self._sisa(), Decimal("0"))
+        self.assertEqual(self.pinjaman.status, "lunas")
+        self.assertFalse(self.pinjaman.jadwal.filter(status=JadwalAngsuran.BELUM).exists())
+        self.assertEqual(
+            sum(j.pokok_terbayar for j in self.pinjaman.jadwal.all()),
+            Decimal("1200000"),
+        )
+
+    def test_bayar_jasa_saja_dan_kurang_dari_jasa(self):
+        with self.assertRaises(ValidationError):
+            self._bayar(Decimal("5000"))
+        self.assertFalse(Angsuran.objects.exists())
+
+        self._bayar(tipe="jasa")
+        self.assertEqual(self._jadwal()[1], (JadwalAngsuran.BELUM, Decimal("0")))
+        self.assertEqual(self._sisa(), Decimal("1200000"))
+
+    def test_bayar_jasa_lalu_cicilan_tidak_menagih_jasa_lagi(self):
+        jasa = self._bayar(tipe="jasa")
+        self.assertEqual(jasa.jumlah_bayar, Decimal("10000"))
+
+        jadwal = self.pinjaman.jadwal.get(angsuran_ke=1)
+        self.assertEqual(jadwal.status, JadwalAngsuran.BELUM)
+        self.assertEqual(jadwal.jasa_terbayar, Decimal("10000"))
+
+        # jadwal 1 lewat jatuh tempo: yang menunggak tinggal pokoknya
+        lewat = jadwal.jatuh_tempo + datetime.timedelta(days=1)
+        rincian = hitung_tunggakan(lewat)["rincian"]
+        self.assertEqual(rincian[0]["tunggakan"], Decimal("100000"))
+
+        # bayar jasa lagi → jasa jadwal 2, bukan jadwal 1 dua kali
+        self._bayar(tipe="jasa")
+        self.assertEqual(
+            self.pinjaman.jadwal.get(angsuran_ke=2).jasa_terbayar, Decimal("10000")
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cicilan = self._bayar()
+        self.assertEqual(cicilan.jumlah_bayar, Decimal("100000"))
+        self.assertEqual(self._jadwal()[1], (JadwalAngsuran.LUNAS, Decimal("100000")))
+        self.assertEqual(self._sisa(), Decimal("1100000"))
+        self.assertEqual(hitung_tunggakan(lewat)["rincian"], [])
+
+
+# ======================================================
+# PILIHAN FORM PINJAMAN (CACHE PER VERSI)
+# ======================================================
+@override_settings(CACHES=CACHE_TEST)
+class PilihanFormPinjamanTest(TestCase):
+    def test_perubahan_jenis_dan_kategori_langsung_terlihat(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            jenis = JenisPinjaman.objects.create(nama_jenis="Reguler")
+        self.assertEqual(pilihan_form_pinjaman()["jenis"], [(jenis.pk, "Reguler")])
+        with self.assertNumQueries(0):
+            pilihan_form_pinjaman()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            kategori = KategoriJasa.objects.create(kategori_jasa="Umum")
+            jenis.nama_jenis = "Khusus"
+            jenis.save()
+        pilihan = pilihan_form_pinjaman()
+        self.assertEqual(pilihan["jenis"], [(jenis.pk, "Khusus")])
+        self.assertEqual(pilihan["kategori"], [(kategori.pk, "Umum")])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            kategori.delete()
+        self.assertEqual(pilihan_form_pinjaman()["kategori"], [])
+
+
+# ======================================================
+# DAFTAR PINJAMAN: SISA PER JENIS DARI SATU QUERY GROUPED
+# ======================================================
+@override_settings(CACHES=CACHE_TEST)
+class DaftarPinjamanTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user("bendahara", password="x", role="bendahara")
+        jenis = {
+            nama: JenisPinjaman.objects.create(nama_jenis=nama)
+            for nama in ("Reguler", "Khusus", "Barang")
+        }
+        kategori = KategoriJasa.objects.create(kategori_jasa="Umum")
+        anggota = {
+            nomor: Anggota.objects.create(nomor_anggota=nomor, nama=nama, jenis_kelamin="Laki-laki")
+            for nomor, nama in (("NA 1", "Citra"), ("NA 2", "Budi"), ("NA 3", "Ani"))
+        }
+        for nomor, nama_jenis, sisa, status in (
+            ("NA 1", "Reguler", 500000, "aktif"),
+            ("NA 1", "Reguler", 250000, "aktif"),
+            ("NA 1", "Barang", 300000, "aktif"),
+            ("NA 1", "Khusus", 900000, "lunas"),  # lunas tidak dihitung
+            ("NA 2", "Khusus", 0, "lunas"),
+        ):
+            Pinjaman.objects.create(
+                nomor_anggota=anggota[nomor],
+                id_jenis_pinjaman=jenis[nama_jenis],
+                id_kategori_jasa=kategori,
+                id_admin=self.admin,
+                jumlah_pinjaman=Decimal("1000000"),
+                angsuran_per_bulan=Decimal("100000"),
+                tanggal_meminjam=datetime.date(2024, 1, 1),
+                jatuh_tempo=10,
+                sisa_pinjaman=Decimal(sisa),
+                status=status,
+            )
+        self.client.force_login(self.admin)
+
+    def _baris(self, **params):
+        response = self.client.get("/pinjaman/", params)
+        return [
+            (d["nomor_anggota"], d["reguler"], d["khusus"], d["barang"], d["total"])
+            for d in response.context["page_obj"].object_list
+        ]
+
+    def test_sisa_per_jenis_urut_nama(self):
+        self.assertEqual(self._baris(sort="nama"), [
+            ("NA 3", 0, 0, 0, 0),
+            ("NA 2", 0, 0, 0, 0),
+            ("NA 1", Decimal("750000"), 0, Decimal("300000"), Decimal("1050000")),
+        ])
+
+    def test_hanya_anggota_dengan_pinjaman_aktif(self):
+        self.assertEqual([baris[0] for baris in self._baris(aktif="1")], ["NA 1"])
+
+
+# ======================================================
+# JADWAL ANGSURAN (AMORTISASI)
+# ======================================================
+class HitungJadwalTest(SimpleTestCase):
+    def test_total_pokok_sama_dengan_jumlah_pinjaman(self):
+        for jumlah, tenor in (("1000000", 3), ("1200000", 12), ("999999.99", 7), ("100", 36)):
+            with self.subTest(jumlah=jumlah, tenor=tenor):
+                jadwal = hitung_jadwal(Decimal(jumlah), Decimal("1000"), datetime.date(2024, 1, 15), tenor)
+
+                self.assertEqual([ke for ke, *_ in jadwal], list(range(1, tenor + 1)))
+                self.assertEqual(sum(pokok for _, _, pokok, _ in jadwal), Decimal(jumlah))
+                self.assertTrue(all(pokok >= 0 for _, _, pokok, _ in jadwal))
+                self.assertEqual({jasa for *_, jasa in jadwal}, {Decimal("1000.00")})
+
+    def test_jatuh_tempo_tanggal_akhir_bulan(self):
+        jadwal = hitung_jadwal(Decimal("300000"), 0, datetime.date(2024, 1, 31), 3)
+
+        self.assertEqual(
+            [jatuh_tempo for _, jatuh_tempo, _, _ in jadwal],
+            [datetime.date(2024, 2, 29), datetime.date(2024, 3, 31), datetime.date(2024, 4, 30)],
+        )
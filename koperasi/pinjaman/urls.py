@@ -6,5 +6,9 @@ app_name = 'pinjaman'
 urlpatterns = [
     path('', views.pinjaman_list, name='pinjaman_list'),
     path('tambah/', views.tambah_pinjaman, name='pinjaman_form'),
+    path('export/', views.export_pinjaman, name='export_pinjaman'),
+    path('tagihan/', views.tagihan_bulanan, name='tagihan_bulanan'),
+    path('tagihan/posting/', views.posting_angsuran, name='posting_angsuran'),
+    path('<int:id_pinjaman>/bayar/', views.bayar_angsuran, name='bayar_angsuran'),
     path("autocomplete-anggota/", views.autocomplete_anggota, name="autocomplete_anggota"),
 ]
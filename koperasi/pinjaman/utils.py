@@ -0,0 +1,78 @@
+import calendar
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache, caches
+from django.db import transaction
+
+CACHE_PILIHAN_PINJAMAN = "pinjaman:pilihan_form"
+CACHE_VERSI_PILIHAN = "pinjaman:versi_pilihan"
+
+
+def tambah_bulan(tanggal, bulan):
+    """Tanggal + n bulan; tanggal 29-31 dipotong ke akhir bulan."""
+    bulan_total = tanggal.month - 1 + bulan
+    tahun = tanggal.year + bulan_total // 12
+    bulan_baru = bulan_total % 12 + 1
+    hari = min(tanggal.day, calendar.monthrange(tahun, bulan_baru)[1])
+    return date(tahun, bulan_baru, hari)
+
+
+def hitung_jadwal(jumlah_pinjaman, jasa_per_bulan, tanggal_meminjam, tenor):
+    """
+    Rincian amortisasi: list (angsuran_ke, jatuh_tempo, pokok, jasa).
+
+    Pokok dibagi rata per bulan, bulan terakhir mengambil sisa pembulatan
+    supaya total pokok = jumlah pinjaman. Jasa flat per bulan.
+    """
+    tenor = max(int(tenor or 1), 1)
+    jumlah_pinjaman = Decimal(jumlah_pinjaman or 0)
+    jasa = Decimal(jasa_per_bulan or 0).quantize(Decimal('0.01'))
+    pokok_bulanan = (jumlah_pinjaman / tenor).quantize(Decimal('0.01'))
+
+    jadwal = []
+    sisa = jumlah_pinjaman
+    for ke in range(1, tenor + 1):
+        pokok = sisa if ke == tenor else min(pokok_bulanan, sisa)
+        sisa -= pokok
+        jadwal.append((ke, tambah_bulan(tanggal_meminjam, ke), pokok, jasa))
+    return jadwal
+
+
+def versi_pilihan_pinjaman():
+    """Versi pilihan form pinjaman, naik setiap JenisPinjaman / KategoriJasa berubah."""
+    # cache "laporan" (file) dipakai bersama semua proses
+    versi = caches["laporan"].get(CACHE_VERSI_PILIHAN)
+    if versi is None:
+        versi = 1
+        caches["laporan"].set(CACHE_VERSI_PILIHAN, versi, None)
+    return versi
+
+
+def naikkan_versi_pilihan_pinjaman():
+    def _naikkan():
+        try:
+            caches["laporan"].incr(CACHE_VERSI_PILIHAN)
+        except ValueError:
+            caches["laporan"].set(CACHE_VERSI_PILIHAN, 1, None)
+
+    transaction.on_commit(_naikkan)
+
+
+def pilihan_form_pinjaman():
+    """
+    Pilihan jenis pinjaman + kategori jasa untuk PinjamanForm.
+    Tabelnya kecil dan jarang berubah → disimpan di cache (LocMem, per
+    proses) per versi pilihan, jadi perubahan langsung terlihat di semua worker.
+    """
+    from .models import JenisPinjaman, KategoriJasa
+
+    key = f"{CACHE_PILIHAN_PINJAMAN}:{versi_pilihan_pinjaman()}"
+    pilihan = cache.get(key)
+    if pilihan is None:
+        pilihan = {
+            "jenis": [(j.pk, str(j)) for j in JenisPinjaman.objects.all()],
+            "kategori": [(k.pk, str(k)) for k in KategoriJasa.objects.all()],
+        }
+        cache.set(key, pilihan, 60 * 60)
+    return pilihan
@@ -1,49 +1,97 @@
-from decimal import Decimal
+from datetime import date, datetime, timedelta
 
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.http import JsonResponse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Sum, Q
+from django.db.models import Exists, F, OuterRef, Sum, Q
 
-from .models import Pinjaman
-from .forms import PinjamanForm
+from .models import JadwalAngsuran, Pinjaman
+from .forms import AngsuranForm, PinjamanForm, PostingAngsuranForm
+from .services import bayar_angsuran as bayar_angsuran_service
+from .services import gabungkan_pinjaman, posting_angsuran_bulanan
+from .utils import tambah_bulan
+from laporan.export import export_response, per_halaman
 from admin_koperasi.models import User
 from anggota.models import Anggota
+from anggota.search import cari_anggota, filter_anggota
+from koperasi.query_budget import query_budget
 
+@query_budget(7)
 @login_required
 def pinjaman_list(request):
-    data_list = []
-
     search_query = request.GET.get('search', '')
     sort_by = request.GET.get('sort', 'nomor')
+    hanya_aktif = request.GET.get('aktif') == '1'
+
+    anggotas = _anggota_pinjaman(search_query, sort_by, hanya_aktif)
+
+    paginator = Paginator(anggotas, 10)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    # satu query grouped untuk sisa pinjaman per jenis, anggota di halaman ini
+    page_obj.object_list = _sisa_pinjaman(page_obj.object_list)
+
+    return render(request, 'pinjaman_list.html', {
+        'page_obj': page_obj,
+        'search_query': search_query,
+        'sort_by': sort_by,
+        'hanya_aktif': hanya_aktif,
+    })
 
+
+def _anggota_pinjaman(search_query, sort_by, hanya_aktif):
     anggotas = Anggota.objects.all()
 
     if search_query:
+        anggotas = filter_anggota(anggotas, search_query)
+
+    # hanya anggota yang masih punya pinjaman aktif
+    if hanya_aktif:
         anggotas = anggotas.filter(
-            Q(nama__icontains=search_query) |
-            Q(nomor_anggota__icontains=search_query)
+            Exists(Pinjaman.objects.filter(
+                nomor_anggota=OuterRef('pk'),
+                status='aktif',
+                sisa_pinjaman__gt=0
+            ))
         )
 
-    for anggota in anggotas:
+    # sorting + LIMIT/OFFSET di database
+    anggotas = anggotas.order_by(*_urutan_pinjaman(sort_by))
+
+    return anggotas.only('nomor_anggota', 'nama')
+
+
+def _urutan_pinjaman(sort_by):
+    return ['nama', 'nomor_anggota'] if sort_by == 'nama' else ['nomor_anggota']
 
-        def total_pinjaman(jenis):
-            return (
-                Pinjaman.objects.filter(
-                    nomor_anggota=anggota,  # ✅ FIX UTAMA
-                    id_jenis_pinjaman__nama_jenis=jenis,
-                    status='aktif'
-                ).aggregate(total=Sum('sisa_pinjaman'))['total'] or 0
-            )
 
-        reguler = total_pinjaman('Reguler')
-        khusus = total_pinjaman('Khusus')
-        barang = total_pinjaman('Barang')
+def _sisa_pinjaman(anggota_list):
+    nomor_list = [a.nomor_anggota for a in anggota_list]
+    totals = {
+        row['nomor_anggota_id']: row
+        for row in (
+            Pinjaman.objects
+            .filter(nomor_anggota_id__in=nomor_list, status='aktif')
+            .order_by()
+            .values('nomor_anggota_id')
+            .annotate(
+                reguler=Sum('sisa_pinjaman', filter=Q(id_jenis_pinjaman__nama_jenis='Reguler')),
+                khusus=Sum('sisa_pinjaman', filter=Q(id_jenis_pinjaman__nama_jenis='Khusus')),
+                barang=Sum('sisa_pinjaman', filter=Q(id_jenis_pinjaman__nama_jenis='Barang')),
+            )
+        )
+    }
 
-        total = reguler + khusus + barang
+    data_list = []
+    for anggota in anggota_list:
+        total = totals.get(anggota.nomor_anggota, {})
+        reguler = total.get('reguler') or 0
+        khusus = total.get('khusus') or 0
+        barang = total.get('barang') or 0
 
         data_list.append({
             'nomor_anggota': anggota.nomor_anggota,
@@ -51,23 +99,33 @@ def pinjaman_list(request):
             'reguler': reguler,
             'khusus': khusus,
             'barang': barang,
-            'total': total,
+            'total': reguler + khusus + barang,
         })
+    return data_list
 
-    if sort_by == 'nama':
-        data_list.sort(key=lambda x: x['nama'])
-    else:
-        data_list.sort(key=lambda x: x['nomor_anggota'])
 
-    paginator = Paginator(data_list, 10)
-    page_obj = paginator.get_page(request.GET.get('page'))
+@query_budget(6)
+@login_required
+def export_pinjaman(request):
+    sort_by = request.GET.get('sort', 'nomor')
+    anggotas = _anggota_pinjaman(
+        request.GET.get('search', ''),
+        sort_by,
+        request.GET.get('aktif') == '1',
+    )
 
-    return render(request, 'pinjaman_list.html', {
-        'page_obj': page_obj,
-        'search_query': search_query,
-        'sort_by': sort_by,
-    })
+    def rows():
+        for chunk in per_halaman(anggotas, _urutan_pinjaman(sort_by)):
+            for d in _sisa_pinjaman(chunk):
+                yield [
+                    d['nomor_anggota'], d['nama'], d['reguler'],
+                    d['khusus'], d['barang'], d['total'],
+                ]
+
+    headers = ["No. Anggota", "Nama", "Reguler", "Khusus", "Barang", "Total"]
+    return export_response(request, 'daftar_pinjaman', headers, rows(), 'Daftar Pinjaman')
 
+@query_budget(get=8, post=27)
 @login_required
 @transaction.atomic
 def tambah_pinjaman(request):
@@ -92,24 +150,13 @@ def tambah_pinjaman(request):
             # SISA PINJAMAN AWAL
             pinjaman_baru.sisa_pinjaman = pinjaman_baru.jumlah_pinjaman
 
-            # CEK PINJAMAN AKTIF SEJENIS
+            # PINJAMAN AKTIF SEJENIS DIGABUNG + JADWAL ANGSURAN
             pinjaman_lama = Pinjaman.objects.filter(
                 nomor_anggota=pinjaman_baru.nomor_anggota,
                 id_jenis_pinjaman=pinjaman_baru.id_jenis_pinjaman,
                 status='aktif'
             )
-
-            if pinjaman_lama.exists():
-                total_sisa = pinjaman_lama.aggregate(
-                    total=Sum('sisa_pinjaman')
-                )['total'] or Decimal('0')
-
-                pinjaman_baru.jumlah_pinjaman += total_sisa
-                pinjaman_baru.sisa_pinjaman = pinjaman_baru.jumlah_pinjaman
-
-                pinjaman_lama.update(status='digabung')
-
-            pinjaman_baru.save()
+            gabungkan_pinjaman(pinjaman_baru, pinjaman_lama)
 
             messages.success(request, 'Pinjaman berhasil ditambahkan.')
             return redirect('pinjaman:pinjaman_list')
@@ -123,21 +170,131 @@ def tambah_pinjaman(request):
     }
     return render(request, 'form/pinjaman_form.html', context)
 
+@query_budget(6)
 @login_required
-def autocomplete_anggota(request):
-    term = request.GET.get('term', '')
+def tagihan_bulanan(request):
+    """Angsuran yang jatuh tempo di satu bulan (range scan jadwal)."""
+    try:
+        awal = datetime.strptime(request.GET.get('bulan', ''), '%Y-%m').date()
+    except ValueError:
+        awal = date.today().replace(day=1)
+    akhir = tambah_bulan(awal, 1) - timedelta(days=1)
+
+    tampil_semua = request.GET.get('semua') == '1'
+
+    jadwal = JadwalAngsuran.objects.filter(jatuh_tempo__range=(awal, akhir))
+    if not tampil_semua:
+        jadwal = jadwal.filter(status=JadwalAngsuran.BELUM)
+
+    ringkasan = jadwal.aggregate(
+        total_pokok=Sum(F('pokok') - F('pokok_terbayar')),
+        total_jasa=Sum(F('jasa') - F('jasa_terbayar')),
+    )
+
+    paginator = Paginator(
+        jadwal.select_related(
+            'pinjaman__nomor_anggota',
+            'pinjaman__id_jenis_pinjaman'
+        ),
+        20
+    )
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    return render(request, 'tagihan_bulanan.html', {
+        'page_obj': page_obj,
+        'bulan': awal,
+        'tampil_semua': tampil_semua,
+        'total_pokok': ringkasan['total_pokok'] or 0,
+        'total_jasa': ringkasan['total_jasa'] or 0,
+    })
 
-    anggota_list = Anggota.objects.filter(
-        nama__icontains=term,
-        status='aktif'
-    )[:10]
+@query_budget(get=6, post=16)
+@login_required
+def bayar_angsuran(request, id_pinjaman):
+    user = request.user
+
+    if user.role not in ['admin', 'ketua', 'bendahara']:
+        messages.error(request, 'Anda tidak memiliki hak akses.')
+        return redirect('pinjaman:pinjaman_list')
 
+    pinjaman = get_object_or_404(
+        Pinjaman.objects.select_related('nomor_anggota', 'id_jenis_pinjaman'),
+        pk=id_pinjaman
+    )
+    jadwal_berikut = (
+        pinjaman.jadwal.filter(status=JadwalAngsuran.BELUM)
+        .order_by('angsuran_ke')
+        .first()
+    )
+
+    if request.method == 'POST':
+        form = AngsuranForm(request.POST)
+        if form.is_valid():
+            try:
+                bayar_angsuran_service(
+                    pinjaman.pk,
+                    form.cleaned_data['tipe_bayar'],
+                    form.cleaned_data['tanggal_bayar'],
+                    user,
+                    form.cleaned_data['jumlah_bayar'],
+                )
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                messages.success(request, 'Angsuran berhasil dicatat.')
+                return redirect('pinjaman:tagihan_bulanan')
+    else:
+        form = AngsuranForm()
+
+    return render(request, 'form/angsuran_form.html', {
+        'form': form,
+        'pinjaman': pinjaman,
+        'jadwal_berikut': jadwal_berikut,
+    })
+
+
+@query_budget(get=4, post=13)
+@login_required
+def posting_angsuran(request):
+    """Posting potongan gaji satu bulan untuk semua pinjaman aktif."""
+    user = request.user
+
+    if user.role not in ['ketua', 'bendahara']:
+        messages.error(request, 'Anda tidak memiliki hak akses.')
+        return redirect('pinjaman:pinjaman_list')
+
+    if request.method == 'POST':
+        form = PostingAngsuranForm(request.POST)
+        if form.is_valid():
+            try:
+                jumlah = posting_angsuran_bulanan(
+                    form.cleaned_data['bulan'],
+                    form.cleaned_data['tanggal_bayar'],
+                    user,
+                )
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                messages.success(
+                    request,
+                    f'{jumlah} angsuran bulan '
+                    f'{form.cleaned_data["bulan"]:%m-%Y} berhasil diposting.'
+                )
+                return redirect('pinjaman:tagihan_bulanan')
+    else:
+        form = PostingAngsuranForm()
+
+    return render(request, 'form/posting_angsuran_form.html', {'form': form})
+
+@query_budget(5)
+@login_required
+def autocomplete_anggota(request):
     return JsonResponse({
         "results": [
             {
-                "id": a.pk,
-                "text": f"{a.nomor_anggota} - {a.nama}"
+                "id": nomor,
+                "text": f"{nomor} - {nama}"
             }
-            for a in anggota_list
+            for nomor, nama in cari_anggota(request.GET.get('term', ''))
         ]
     })
\ No newline at end of file
@@ -1,8 +1,8 @@
 from django import forms
-from django.db.models import Sum
 
-from .utils import hitung_saldo
-from .models import HistoryTabungan, Simpanan, Penarikan
+from laporan.utils import cek_periode_terbuka
+from .utils import hitung_saldo, jenis_wajib_id
+from .models import BulanWajib, HistoryTabungan, Simpanan, Penarikan
 import datetime
 import re
 
@@ -61,6 +61,11 @@ class SimpananForm(forms.ModelForm):
 
         return jumlah
 
+    def clean_tanggal(self):
+        tanggal = self.cleaned_data.get('tanggal')
+        cek_periode_terbuka(tanggal)
+        return tanggal
+
     def clean_dana_sosial(self):
         dana = self.cleaned_data.get('dana_sosial')
         return self._to_int(dana)
@@ -76,13 +81,8 @@ class SimpananForm(forms.ModelForm):
         if not anggota or not jenis or not tanggal:
             return cleaned
 
-        if jenis.pk == 2:
-            sudah_bayar = Simpanan.objects.filter(
-                anggota=anggota,
-                jenis_simpanan=jenis,
-                tanggal__month=tanggal.month,
-                tanggal__year=tanggal.year
-            ).exists()
+        if jenis.pk == jenis_wajib_id():
+            sudah_bayar = BulanWajib.sudah_bayar(anggota.pk, tanggal)
 
             if not sudah_bayar and dana_sosial <= 0:
                 raise forms.ValidationError(
@@ -93,6 +93,23 @@ class SimpananForm(forms.ModelForm):
 
 # ======================================================
 
+class UploadSetoranForm(forms.Form):
+    file = forms.FileField(
+        label="File setoran (.xlsx / .csv)",
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.xlsx,.csv'
+        })
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data.get('file')
+        if not file.name.lower().endswith(('.xlsx', '.csv')):
+            raise forms.ValidationError("Format file harus .xlsx atau .csv")
+        return file
+
+# ======================================================
+
 class PenarikanForm(forms.ModelForm):
     class Meta:
         model = Penarikan
@@ -110,12 +127,19 @@ class PenarikanForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         self.anggota = kwargs.pop("anggota", None)
         self.jenis_simpanan = kwargs.pop("jenis_simpanan", None)
+        # saldo yang sudah dihitung view, biar tidak query dua kali
+        self.saldo = kwargs.pop("saldo", None)
         super().__init__(*args, **kwargs)
 
         # ⬅️ samain dengan SimpananForm
         if not self.instance.pk:
             self.fields["tanggal"].initial = datetime.date.today()
 
+    def clean_tanggal(self):
+        tanggal = self.cleaned_data.get("tanggal")
+        cek_periode_terbuka(tanggal)
+        return tanggal
+
     def clean_jumlah(self):
         jumlah = self.cleaned_data.get("jumlah")
 
@@ -123,7 +147,9 @@ class PenarikanForm(forms.ModelForm):
             raise forms.ValidationError("Jumlah penarikan harus lebih dari 0")
 
         if self.anggota and self.jenis_simpanan:
-            saldo = hitung_saldo(self.anggota, self.jenis_simpanan)
+            saldo = self.saldo
+            if saldo is None:
+                saldo = hitung_saldo(self.anggota, self.jenis_simpanan)
             if jumlah > saldo:
                 raise forms.ValidationError(
                     f"Saldo tidak mencukupi. Sisa saldo Rp {saldo:,.0f}"
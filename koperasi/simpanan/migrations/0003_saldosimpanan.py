@@ -0,0 +1,62 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def isi_saldo_awal(apps, schema_editor):
+    HistoryTabungan = apps.get_model('simpanan', 'HistoryTabungan')
+    SaldoSimpanan = apps.get_model('simpanan', 'SaldoSimpanan')
+
+    rekap = (
+        HistoryTabungan.objects
+        .filter(jenis_simpanan__isnull=False)
+        .order_by()
+        .values('anggota_id', 'jenis_simpanan_id')
+        .annotate(
+            setor=Sum('jumlah', filter=Q(jenis_transaksi='SETOR')),
+            tarik=Sum('jumlah', filter=Q(jenis_transaksi='TARIK')),
+        )
+    )
+
+    SaldoSimpanan.objects.bulk_create(
+        [
+            SaldoSimpanan(
+                anggota_id=r['anggota_id'],
+                jenis_simpanan_id=r['jenis_simpanan_id'],
+                total_setor=r['setor'] or 0,
+                total_tarik=r['tarik'] or 0,
+                saldo=(r['setor'] or 0) - (r['tarik'] or 0),
+            )
+            for r in rekap
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0004_alter_anggota_nomor_anggota'),
+        ('simpanan', '0002_remove_penarikan_petugas_remove_simpanan_petugas_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoSimpanan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_setor', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_tarik', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('anggota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldo_simpanan', to='anggota.anggota')),
+                ('jenis_simpanan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='simpanan.jenissimpanan')),
+            ],
+            options={
+                'db_table': 'saldo_simpanan',
+                'constraints': [models.UniqueConstraint(fields=('anggota', 'jenis_simpanan'), name='uniq_saldo_anggota_jenis')],
+            },
+        ),
+        migrations.RunPython(isi_saldo_awal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0004_alter_anggota_nomor_anggota'),
+        ('simpanan', '0003_saldosimpanan'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historytabungan',
+            index=models.Index(fields=['anggota', 'jenis_simpanan', 'tanggal', 'id'], name='idx_history_anggota_jenis_tgl'),
+        ),
+    ]
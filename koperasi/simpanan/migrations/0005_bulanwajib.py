@@ -0,0 +1,52 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:06
+
+import django.db.models.deletion
+from collections import defaultdict
+from django.db import migrations, models
+
+
+def isi_bulan_wajib(apps, schema_editor):
+    Simpanan = apps.get_model('simpanan', 'Simpanan')
+    BulanWajib = apps.get_model('simpanan', 'BulanWajib')
+
+    masks = defaultdict(int)
+    for anggota_id, tanggal in (
+        Simpanan.objects
+        .filter(jenis_simpanan__nama_jenis='WAJIB')
+        .values_list('anggota_id', 'tanggal')
+        .iterator(chunk_size=2000)
+    ):
+        masks[(anggota_id, tanggal.year)] |= 1 << (tanggal.month - 1)
+
+    BulanWajib.objects.bulk_create(
+        [
+            BulanWajib(anggota_id=anggota_id, tahun=tahun, bulan_bayar=mask)
+            for (anggota_id, tahun), mask in masks.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0004_alter_anggota_nomor_anggota'),
+        ('simpanan', '0004_history_tabungan_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulanWajib',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tahun', models.PositiveSmallIntegerField()),
+                ('bulan_bayar', models.PositiveIntegerField(default=0)),
+                ('anggota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='anggota.anggota')),
+            ],
+            options={
+                'db_table': 'bulan_wajib',
+                'constraints': [models.UniqueConstraint(fields=('anggota', 'tahun'), name='uniq_bulan_wajib_anggota_tahun')],
+            },
+        ),
+        migrations.RunPython(isi_bulan_wajib, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncMonth
+
+
+def isi_rekap_dana_sosial(apps, schema_editor):
+    Simpanan = apps.get_model('simpanan', 'Simpanan')
+    DanaSosialBulanan = apps.get_model('simpanan', 'DanaSosialBulanan')
+    DanaSosialAnggota = apps.get_model('simpanan', 'DanaSosialAnggota')
+
+    ada_dana = Simpanan.objects.filter(dana_sosial__gt=0).order_by()
+
+    DanaSosialBulanan.objects.bulk_create(
+        [
+            DanaSosialBulanan(periode=r['periode'], total=r['total'], jumlah_transaksi=r['jumlah'])
+            for r in ada_dana.annotate(periode=TruncMonth('tanggal'))
+            .values('periode')
+            .annotate(total=Sum('dana_sosial'), jumlah=Count('id'))
+        ],
+        batch_size=1000,
+    )
+    DanaSosialAnggota.objects.bulk_create(
+        [
+            DanaSosialAnggota(
+                anggota_id=r['anggota_id'],
+                total=r['total'],
+                jumlah_transaksi=r['jumlah'],
+                terakhir=r['terakhir'],
+            )
+            for r in ada_dana.values('anggota_id')
+            .annotate(total=Sum('dana_sosial'), jumlah=Count('id'), terakhir=Max('tanggal'))
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anggota', '0004_alter_anggota_nomor_anggota'),
+        ('simpanan', '0005_bulanwajib'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DanaSosialAnggota',
+            fields=[
+                ('anggota', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dana_sosial', serialize=False, to='anggota.anggota')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('jumlah_transaksi', models.PositiveIntegerField(default=0)),
+                ('terakhir', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'dana_sosial_anggota',
+            },
+        ),
+        migrations.CreateModel(
+            name='DanaSosialBulanan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periode', models.DateField(help_text='Tanggal 1 bulan', unique=True)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('jumlah_transaksi', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'dana_sosial_bulanan',
+                'ordering': ['-periode'],
+            },
+        ),
+        migrations.RunPython(isi_rekap_dana_sosial, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from anggota.models import Anggota
 from admin_koperasi.models import User
+from koperasi.upsert import BITOR, MAKS, TAMBAH, upsert
+from laporan.utils import cek_periode_terbuka
 import datetime
 
 # ======================
@@ -62,15 +64,27 @@ class Simpanan(models.Model):
         return f"{self.anggota} - {self.jenis_simpanan}"
 
     def save(self, *args, **kwargs):
-        # Simpan transaksi
-        super().save(*args, **kwargs)
-        HistoryTabungan.objects.create(
-            anggota=self.anggota,
-            jenis_simpanan=self.jenis_simpanan,
-            tanggal=self.tanggal,
-            jenis_transaksi="SETOR",
-            jumlah=self.jumlah
-        )
+        # Simpan transaksi + history + saldo dalam satu transaksi
+        with transaction.atomic():
+            cek_periode_terbuka(self.tanggal, kunci=True)
+            super().save(*args, **kwargs)
+            HistoryTabungan.objects.create(
+                anggota=self.anggota,
+                jenis_simpanan=self.jenis_simpanan,
+                tanggal=self.tanggal,
+                jenis_transaksi="SETOR",
+                jumlah=self.jumlah
+            )
+            SaldoSimpanan.catat(
+                self.anggota_id,
+                self.jenis_simpanan_id,
+                HistoryTabungan.SETOR,
+                self.jumlah
+            )
+            if self.jenis_simpanan and self.jenis_simpanan.nama_jenis == JenisSimpanan.WAJIB:
+                BulanWajib.tandai(self.anggota_id, self.tanggal)
+            if self.dana_sosial:
+                catat_dana_sosial([(self.anggota_id, self.tanggal, self.dana_sosial)])
 
 
 # ======================
@@ -104,14 +118,22 @@ class Penarikan(models.Model):
         return f"{self.anggota.nama} - tarik {self.jumlah}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        HistoryTabungan.objects.create(
-            anggota=self.anggota,
-            jenis_simpanan=self.jenis_simpanan,
-            tanggal=self.tanggal,
-            jenis_transaksi="TARIK",
-            jumlah=self.jumlah
-        )
+        with transaction.atomic():
+            cek_periode_terbuka(self.tanggal, kunci=True)
+            super().save(*args, **kwargs)
+            HistoryTabungan.objects.create(
+                anggota=self.anggota,
+                jenis_simpanan=self.jenis_simpanan,
+                tanggal=self.tanggal,
+                jenis_transaksi="TARIK",
+                jumlah=self.jumlah
+            )
+            SaldoSimpanan.catat(
+                self.anggota_id,
+                self.jenis_simpanan_id,
+                HistoryTabungan.TARIK,
+                self.jumlah
+            )
 
 
 # ======================
@@ -137,6 +159,221 @@ class HistoryTabungan(models.Model):
     class Meta:
         db_table = "history_tabungan"
         ordering = ["-tanggal"]
+        indexes = [
+            # riwayat per anggota + jenis, urut (tanggal, id) untuk keyset pagination
+            models.Index(
+                fields=["anggota", "jenis_simpanan", "tanggal", "id"],
+                name="idx_history_anggota_jenis_tgl"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.anggota.nama} - {self.jenis_transaksi} {self.jumlah}"
+
+
+
+# ======================
+# Model Saldo Simpanan
+# ======================
+class SaldoSimpanan(models.Model):
+    """
+    Ringkasan saldo per anggota per jenis simpanan.
+    Diupdate setiap Simpanan / Penarikan disimpan, jadi baca saldo
+    cukup satu lookup (tanpa SUM ke history_tabungan).
+    """
+    anggota = models.ForeignKey(
+        Anggota,
+        on_delete=models.CASCADE,
+        related_name="saldo_simpanan"
+    )
+    jenis_simpanan = models.ForeignKey(JenisSimpanan, on_delete=models.CASCADE)
+    total_setor = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total_tarik = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    saldo = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "saldo_simpanan"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["anggota", "jenis_simpanan"],
+                name="uniq_saldo_anggota_jenis"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.anggota_id} - {self.jenis_simpanan_id}: {self.saldo}"
+
+    @classmethod
+    def catat(cls, anggota_id, jenis_simpanan_id, jenis_transaksi, jumlah):
+        # history tanpa jenis simpanan tidak punya saldo
+        if jenis_simpanan_id is None:
+            return
+
+        if jenis_transaksi == HistoryTabungan.SETOR:
+            rekap = (jumlah, 0)
+        elif jenis_transaksi == HistoryTabungan.TARIK:
+            rekap = (0, jumlah)
+        else:
+            return
+
+        cls.catat_banyak({(anggota_id, jenis_simpanan_id): rekap})
+
+    @classmethod
+    def catat_banyak(cls, rekap, batch_size=500):
+        """
+        Versi massal dari `catat` untuk posting bulk_create, satu upsert
+        per batch (baris baru di-INSERT, yang sudah ada ditambah).
+        rekap: {(anggota_id, jenis_simpanan_id): (total_setor, total_tarik)}
+        """
+        upsert(
+            cls,
+            ["anggota_id", "jenis_simpanan_id"],
+            [
+                {
+                    "anggota_id": anggota_id,
+                    "jenis_simpanan_id": jenis_id,
+                    "total_setor": setor,
+                    "total_tarik": tarik,
+                    "saldo": setor - tarik,
+                }
+                for (anggota_id, jenis_id), (setor, tarik) in rekap.items()
+                if jenis_id is not None
+            ],
+            {"total_setor": TAMBAH, "total_tarik": TAMBAH, "saldo": TAMBAH},
+            batch_size=batch_size,
+        )
+
+
+# ======================
+# Model Bulan Wajib (bulan yang sudah bayar simpanan wajib)
+# ======================
+class BulanWajib(models.Model):
+    """
+    Satu baris per anggota per tahun, `bulan_bayar` = bitmask 12 bit
+    (bit 0 = Januari). Cek "sudah bayar wajib bulan ini" cukup satu lookup.
+    """
+    anggota = models.ForeignKey(Anggota, on_delete=models.CASCADE)
+    tahun = models.PositiveSmallIntegerField()
+    bulan_bayar = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "bulan_wajib"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["anggota", "tahun"],
+                name="uniq_bulan_wajib_anggota_tahun"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.anggota_id} - {self.tahun}: {self.bulan_bayar:012b}"
+
+    @staticmethod
+    def bit(bulan):
+        return 1 << (bulan - 1)
+
+    @classmethod
+    def mask(cls, anggota_id, tahun):
+        # dibaca langsung dari tabel (unik per anggota + tahun, satu lookup
+        # index) supaya setoran yang baru di-commit worker lain langsung terlihat
+        return cls.objects.filter(
+            anggota_id=anggota_id,
+            tahun=tahun
+        ).values_list("bulan_bayar", flat=True).first() or 0
+
+    @classmethod
+    def sudah_bayar(cls, anggota_id, tanggal):
+        return bool(cls.mask(anggota_id, tanggal.year) & cls.bit(tanggal.month))
+
+    @classmethod
+    def tandai(cls, anggota_id, tanggal):
+        cls.tandai_banyak({(anggota_id, tanggal.year): cls.bit(tanggal.month)})
+
+    @classmethod
+    def tandai_banyak(cls, masks, batch_size=500):
+        """masks: {(anggota_id, tahun): bitmask bulan yang dibayar}, satu upsert per batch"""
+        upsert(
+            cls,
+            ["anggota_id", "tahun"],
+            [
+                {"anggota_id": anggota_id, "tahun": tahun, "bulan_bayar": bits}
+                for (anggota_id, tahun), bits in masks.items()
+            ],
+            {"bulan_bayar": BITOR},
+            batch_size=batch_size,
+        )
+
+
+# ======================
+# Rekap Dana Sosial (diupdate inkremental dari Simpanan.save)
+# ======================
+class DanaSosialBulanan(models.Model):
+    periode = models.DateField(unique=True, help_text="Tanggal 1 bulan")
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    jumlah_transaksi = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "dana_sosial_bulanan"
+        ordering = ["-periode"]
+
+    def __str__(self):
+        return f"Dana sosial {self.periode:%m-%Y}: {self.total}"
+
+
+class DanaSosialAnggota(models.Model):
+    anggota = models.OneToOneField(
+        Anggota,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="dana_sosial"
+    )
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    jumlah_transaksi = models.PositiveIntegerField(default=0)
+    terakhir = models.DateField(null=True, blank=True)
+
+    class Meta:
+        db_table = "dana_sosial_anggota"
+
+    def __str__(self):
+        return f"Dana sosial {self.anggota_id}: {self.total}"
+
+
+def catat_dana_sosial(transaksi, batch_size=500):
+    """
+    Tambahkan dana sosial ke rekap bulanan dan rekap per anggota.
+    transaksi: iterable (anggota_id, tanggal, dana_sosial).
+    Satu upsert per tabel rekap (total dan jumlah ditambah di database),
+    jadi aman dipanggil bersamaan dari beberapa teller.
+    """
+    per_bulan = {}
+    per_anggota = {}
+    for anggota_id, tanggal, dana in transaksi:
+        if not dana:
+            continue
+        periode = tanggal.replace(day=1)
+        total, jumlah = per_bulan.get(periode, (0, 0))
+        per_bulan[periode] = (total + dana, jumlah + 1)
+
+        total, jumlah, terakhir = per_anggota.get(anggota_id, (0, 0, tanggal))
+        per_anggota[anggota_id] = (total + dana, jumlah + 1, max(terakhir, tanggal))
+
+    upsert(
+        DanaSosialBulanan,
+        ["periode"],
+        [
+            {"periode": periode, "total": total, "jumlah_transaksi": jumlah}
+            for periode, (total, jumlah) in per_bulan.items()
+        ],
+        {"total": TAMBAH, "jumlah_transaksi": TAMBAH},
+        batch_size=batch_size,
+    )
+    upsert(
+        DanaSosialAnggota,
+        ["anggota_id"],
+        [
+            {"anggota_id": anggota_id, "total": total, "jumlah_transaksi": jumlah, "terakhir": terakhir}
+            for anggota_id, (total, jumlah, terakhir) in per_anggota.items()
+        ],
+        {"total": TAMBAH, "jumlah_transaksi": TAMBAH, "terakhir": MAKS},
+        batch_size=batch_size,
+    )
@@ -0,0 +1,323 @@
+import csv
+import io
+import re
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from openpyxl import load_workbook
+
+from anggota.models import Anggota
+from laporan.utils import kunci_periode, tutup_buku_terakhir
+from .models import (
+    BulanWajib,
+    HistoryTabungan,
+    JenisSimpanan,
+    Penarikan,
+    SaldoSimpanan,
+    Simpanan,
+    catat_dana_sosial,
+)
+
+
+# ======================================================
+# RINGKASAN SIMPANAN PER ANGGOTA
+# ======================================================
+def ringkasan_simpanan(anggota):
+    """
+    Saldo + id transaksi terakhir per jenis simpanan untuk satu anggota,
+    dalam satu query (subquery ke saldo_simpanan dan history_tabungan).
+    Dipakai halaman simpanan anggota, dashboard, dan export.
+    """
+    anggota_id = getattr(anggota, "pk", anggota)
+
+    saldo = SaldoSimpanan.objects.filter(
+        anggota_id=anggota_id,
+        jenis_simpanan=OuterRef("pk")
+    ).values("saldo")[:1]
+
+    last_transaksi = HistoryTabungan.objects.filter(
+        anggota_id=anggota_id,
+        jenis_simpanan=OuterRef("pk")
+    ).order_by("-id").values("id")[:1]
+
+    return [
+        {
+            "jenis": jenis.get_nama_jenis_display(),
+            "jenis_id": jenis.id,
+            "saldo": jenis.saldo or 0,
+            "last_id": jenis.last_id,
+        }
+        for jenis in JenisSimpanan.objects.annotate(
+            saldo=Subquery(saldo),
+            last_id=Subquery(last_transaksi),
+        ).order_by("id")
+    ]
+
+
+# ======================================================
+# PENARIKAN (LOCK PER ANGGOTA + JENIS)
+# ======================================================
+def tarik_simpanan(anggota, jenis_simpanan, jumlah, tanggal, admin):
+    """
+    Catat penarikan dengan mengunci baris saldo_simpanan anggota + jenis
+    (SELECT ... FOR UPDATE), lalu cek ulang saldo di dalam lock.
+    Teller lain yang menarik dari anggota/jenis yang sama menunggu,
+    anggota lain tidak terpengaruh.
+    """
+    with transaction.atomic():
+        saldo = (
+            SaldoSimpanan.objects.select_for_update()
+            .filter(anggota=anggota, jenis_simpanan=jenis_simpanan)
+            .values_list("saldo", flat=True)
+            .first()
+        ) or 0
+
+        if jumlah > saldo:
+            raise ValidationError(
+                f"Saldo tidak mencukupi. Sisa saldo Rp {saldo:,.0f}"
+            )
+
+        penarikan = Penarikan(
+            anggota=anggota,
+            jenis_simpanan=jenis_simpanan,
+            tanggal=tanggal,
+            jumlah=jumlah,
+            admin=admin,
+        )
+        penarikan.save()
+
+    return penarikan
+
+
+# ======================================================
+# BULK SETORAN (POTONGAN GAJI BULANAN)
+# ======================================================
+KOLOM_SETORAN = ["nomor_anggota", "jenis", "jumlah", "dana_sosial", "tanggal"]
+CHUNK_SIZE = 500
+
+
+def baca_file_setoran(upload):
+    """
+    Baca file .xlsx / .csv setoran. Baris pertama = header
+    (nomor_anggota, jenis, jumlah, dana_sosial, tanggal).
+    Return list dict per baris + nomor baris aslinya.
+    """
+    nama = (upload.name or "").lower()
+
+    if nama.endswith(".csv"):
+        text = io.TextIOWrapper(upload.file, encoding="utf-8-sig")
+        rows = csv.reader(text)
+    else:
+        wb = load_workbook(upload, read_only=True, data_only=True)
+        rows = wb.active.iter_rows(values_only=True)
+
+    header = None
+    hasil = []
+    for nomor_baris, row in enumerate(rows, start=1):
+        if header is None:
+            header = [str(c or "").strip().lower() for c in row]
+            continue
+
+        if not any(c not in (None, "") for c in row):
+            continue
+
+        data = dict(zip(header, row))
+        data["baris"] = nomor_baris
+        hasil.append(data)
+
+    return hasil
+
+
+ANGKA_RIBUAN = re.compile(r"-?\d{1,3}(\.\d{3})+(,\d+)?")
+ANGKA_KOMA = re.compile(r"-?\d+,\d+")
+
+
+def _ke_decimal(value):
+    """
+    Angka dari sel Excel / CSV. Teks boleh diawali "Rp" dan memakai format
+    Indonesia (1.250.000 atau 1.250.000,50); selain itu harus angka biasa
+    (1250000 / 1250000.50). Teks lain → InvalidOperation. Tanda minus
+    dipertahankan, penolakannya di validasi baris.
+    """
+    if value is None:
+        return Decimal("0")
+    if isinstance(value, (int, float, Decimal)):
+        hasil = Decimal(str(value))
+    else:
+        teks = re.sub(r"\s", "", str(value))
+        teks = re.sub(r"^rp\.?", "", teks, flags=re.IGNORECASE)
+        if teks in ("", "-"):
+            return Decimal("0")
+        if ANGKA_RIBUAN.fullmatch(teks):
+            teks = teks.replace(".", "").replace(",", ".")
+        elif ANGKA_KOMA.fullmatch(teks):
+            teks = teks.replace(",", ".")
+        hasil = Decimal(teks)
+
+    if not hasil.is_finite():
+        raise InvalidOperation(value)
+    return hasil
+
+
+def _ke_tanggal(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = str(value or "").strip()
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(value)
+
+
+def posting_setoran_massal(rows, admin):
+    """
+    Validasi seluruh baris dengan sekali prefetch, lalu tulis Simpanan,
+    HistoryTabungan dan SaldoSimpanan via bulk_create dalam satu transaksi.
+
+    Semua-atau-tidak-sama-sekali: kalau ada baris error, tidak ada yang
+    disimpan, supaya file bisa diperbaiki lalu diupload ulang utuh.
+    Return (jumlah_tersimpan, errors) dengan errors = [(baris, pesan)].
+    """
+    errors = []
+
+    # ===== PREFETCH =====
+    nomor_set = {str(r.get("nomor_anggota") or "").strip() for r in rows}
+    anggota_ada = set(
+        Anggota.objects.filter(nomor_anggota__in=nomor_set)
+        .values_list("nomor_anggota", flat=True)
+    )
+
+    jenis_map = {}
+    for jenis in JenisSimpanan.objects.all():
+        jenis_map[jenis.nama_jenis] = jenis
+        jenis_map[str(jenis.pk)] = jenis
+    wajib = jenis_map.get(JenisSimpanan.WAJIB)
+    tutup_terakhir = tutup_buku_terakhir()
+
+    # ===== VALIDASI =====
+    valid = []
+    for r in rows:
+        baris = r["baris"]
+        nomor = str(r.get("nomor_anggota") or "").strip()
+        jenis = jenis_map.get(str(r.get("jenis") or "").strip().upper())
+
+        if nomor not in anggota_ada:
+            errors.append((baris, f"Anggota '{nomor}' tidak ditemukan"))
+            continue
+        if jenis is None:
+            errors.append((baris, f"Jenis simpanan '{r.get('jenis')}' tidak dikenal"))
+            continue
+
+        try:
+            jumlah = _ke_decimal(r.get("jumlah"))
+            dana_sosial = _ke_decimal(r.get("dana_sosial"))
+        except InvalidOperation:
+            errors.append((baris, "Jumlah / dana sosial bukan angka"))
+            continue
+        if jumlah <= 0:
+            errors.append((baris, "Jumlah simpanan harus lebih dari 0"))
+            continue
+        if dana_sosial < 0:
+            errors.append((baris, "Dana sosial tidak boleh negatif"))
+            continue
+
+        try:
+            tanggal = _ke_tanggal(r.get("tanggal"))
+        except ValueError:
+            errors.append((baris, f"Tanggal '{r.get('tanggal')}' tidak valid"))
+            continue
+        if tutup_terakhir and tanggal <= tutup_terakhir.akhir_periode:
+            errors.append((baris, f"Periode {tanggal:%m-%Y} sudah ditutup"))
+            continue
+
+        valid.append((baris, nomor, jenis, jumlah, dana_sosial, tanggal))
+
+    # ===== CEK WAJIB BULAN INI (SEKALI QUERY) =====
+    bulan_wajib = defaultdict(int)
+    if wajib and valid:
+        sudah_bayar = {
+            (anggota_id, tahun): mask
+            for anggota_id, tahun, mask in BulanWajib.objects.filter(
+                anggota_id__in={v[1] for v in valid},
+                tahun__in={v[5].year for v in valid},
+            ).values_list("anggota_id", "tahun", "bulan_bayar")
+        }
+
+        for baris, nomor, jenis, jumlah, dana_sosial, tanggal in valid:
+            if jenis != wajib:
+                continue
+            key = (nomor, tanggal.year)
+            bit = BulanWajib.bit(tanggal.month)
+            mask = sudah_bayar.get(key, 0) | bulan_wajib[key]
+            if not mask & bit and dana_sosial <= 0:
+                errors.append((
+                    baris,
+                    "Dana sosial wajib diisi karena simpanan wajib bulan ini belum dibayar."
+                ))
+            # baris berikutnya di file untuk bulan yang sama sudah dianggap bayar
+            bulan_wajib[key] |= bit
+
+    if errors:
+        errors.sort()
+        return 0, errors
+
+    # ===== TULIS (BULK, SATU TRANSAKSI) =====
+    rekap = defaultdict(lambda: (Decimal("0"), Decimal("0")))
+    with transaction.atomic():
+        # cek ulang di bawah kunci periode: tutup buku yang commit sejak
+        # validasi di atas menolak baris di periodenya
+        tutup_terakhir = kunci_periode()
+        if tutup_terakhir:
+            errors = [
+                (baris, f"Periode {tanggal:%m-%Y} sudah ditutup")
+                for baris, _, _, _, _, tanggal in valid
+                if tanggal <= tutup_terakhir.akhir_periode
+            ]
+            if errors:
+                return 0, errors
+
+        for i in range(0, len(valid), CHUNK_SIZE):
+            chunk = valid[i:i + CHUNK_SIZE]
+
+            Simpanan.objects.bulk_create([
+                Simpanan(
+                    anggota_id=nomor,
+                    admin=admin,
+                    jenis_simpanan=jenis,
+                    tanggal=tanggal,
+                    jumlah=jumlah,
+                    dana_sosial=dana_sosial,
+                )
+                for _, nomor, jenis, jumlah, dana_sosial, tanggal in chunk
+            ])
+            HistoryTabungan.objects.bulk_create([
+                HistoryTabungan(
+                    anggota_id=nomor,
+                    jenis_simpanan=jenis,
+                    tanggal=tanggal,
+                    jenis_transaksi=HistoryTabungan.SETOR,
+                    jumlah=jumlah,
+                )
+                for _, nomor, jenis, jumlah, _, tanggal in chunk
+            ])
+
+            for _, nomor, jenis, jumlah, _, _ in chunk:
+                setor, tarik = rekap[(nomor, jenis.pk)]
+                rekap[(nomor, jenis.pk)] = (setor + jumlah, tarik)
+
+        SaldoSimpanan.catat_banyak(rekap, batch_size=CHUNK_SIZE)
+        BulanWajib.tandai_banyak(bulan_wajib, batch_size=CHUNK_SIZE)
+        catat_dana_sosial(
+            [(nomor, tanggal, dana_sosial) for _, nomor, _, _, dana_sosial, tanggal in valid],
+            batch_size=CHUNK_SIZE
+        )
+
+    return len(valid), []
@@ -1,3 +1,434 @@
-from django.test import TestCase
+import datetime
+import threading
+from decimal import Decimal, InvalidOperation
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import Q, Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, skipUnlessDBFeature
+
+from admin_koperasi.models import User
+from anggota.models import Anggota
+from .forms import SimpananForm
+from .models import (
+    BulanWajib, DanaSosialAnggota, DanaSosialBulanan, HistoryTabungan, JenisSimpanan,
+    Penarikan, SaldoSimpanan, Simpanan,
+)
+from .services import (
+    _ke_decimal, baca_file_setoran, posting_setoran_massal, ringkasan_simpanan, tarik_simpanan,
+)
+from .utils import hitung_saldo, keyset_page
+
+
+# ======================================================
+# PENARIKAN BERSAMAAN (butuh DB dengan SELECT ... FOR UPDATE,
+# mis. MySQL lokal; di SQLite test ini dilewati)
+# ======================================================
+@skipUnlessDBFeature("has_select_for_update")
+class PenarikanBersamaanTest(TransactionTestCase):
+    JUMLAH_TELLER = 20
+
+    def setUp(self):
+        self.jenis = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.SUKARELA)
+        self.anggota = [
+            Anggota.objects.create(
+                nomor_anggota=f"NA {i}",
+                nama=f"Anggota {i}",
+                jenis_kelamin="Laki-laki"
+            )
+            for i in range(1, 6)
+        ]
+        for anggota in self.anggota:
+            Simpanan.objects.create(
+                anggota=anggota,
+                jenis_simpanan=self.jenis,
+                jumlah=Decimal("100000")
+            )
+
+    def _serbu(self, daftar_anggota, jumlah):
+        """Jalankan tarik_simpanan dari banyak thread sekaligus."""
+        berhasil, ditolak, error = [], [], []
+        start = threading.Barrier(len(daftar_anggota))
+
+        def teller(anggota):
+            try:
+                start.wait()
+                tarik_simpanan(anggota, self.jenis, jumlah, datetime.date.today(), None)
+                berhasil.append(anggota.pk)
+            except ValidationError:
+                ditolak.append(anggota.pk)
+            except Exception as e:
+                error.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=teller, args=(a,)) for a in daftar_anggota]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(error, [])
+        return berhasil, ditolak
+
+    def test_saldo_tidak_pernah_minus(self):
+        anggota = self.anggota[0]
+
+        berhasil, ditolak = self._serbu(
+            [anggota] * self.JUMLAH_TELLER,
+            Decimal("30000")
+        )
+
+        # 100.000 hanya cukup untuk 3 x 30.000
+        self.assertEqual(len(berhasil), 3)
+        self.assertEqual(len(ditolak), self.JUMLAH_TELLER - 3)
+
+        saldo = SaldoSimpanan.objects.get(anggota=anggota, jenis_simpanan=self.jenis)
+        self.assertEqual(saldo.saldo, Decimal("10000"))
+        self.assertEqual(saldo.total_tarik, Decimal("90000"))
+        self.assertEqual(Penarikan.objects.filter(anggota=anggota).count(), 3)
+
+    def test_anggota_berbeda_tidak_saling_blokir(self):
+        daftar = [a for a in self.anggota for _ in range(4)]
+
+        berhasil, ditolak = self._serbu(daftar, Decimal("25000"))
+
+        self.assertEqual(len(berhasil), len(daftar))
+        self.assertEqual(ditolak, [])
+        for anggota in self.anggota:
+            self.assertEqual(
+                SaldoSimpanan.objects.get(anggota=anggota, jenis_simpanan=self.jenis).saldo,
+                Decimal("0")
+            )
+
+
+# ======================================================
+# ANGKA DARI FILE SETORAN
+# ======================================================
+class KeDecimalTest(SimpleTestCase):
+    def test_format_yang_diterima(self):
+        for nilai, hasil in [
+            (None, "0"),
+            ("", "0"),
+            ("-", "0"),
+            (150000, "150000"),
+            (150000.5, "150000.5"),
+            ("150000", "150000"),
+            ("150000.50", "150000.50"),
+            ("1.250.000", "1250000"),
+            ("1.250.000,50", "1250000.50"),
+            ("Rp 1.250.000", "1250000"),
+            ("Rp.5.000", "5000"),
+            ("2500,5", "2500.5"),
+            ("-5000", "-5000"),
+        ]:
+            with self.subTest(nilai=nilai):
+                self.assertEqual(_ke_decimal(nilai), Decimal(hasil))
+
+    def test_bukan_angka_ditolak(self):
+        for nilai in ["abc", "1,250,000", "12a", "NaN", "Infinity"]:
+            with self.subTest(nilai=nilai):
+                with self.assertRaises(InvalidOperation):
+                    _ke_decimal(nilai)
+
+
+# ======================================================
+# BULK SETORAN DARI FILE CSV
+# ======================================================
+class SetoranMassalTest(TestCase):
+    def setUp(self):
+        JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.SUKARELA)
+        for i in (1, 2):
+            Anggota.objects.create(
+                nomor_anggota=f"NA {i}", nama=f"Anggota {i}", jenis_kelamin="Laki-laki"
+            )
+
+    def _rows(self, *baris):
+        isi = "nomor_anggota,jenis,jumlah,dana_sosial,tanggal\n" + "\n".join(baris)
+        return baca_file_setoran(SimpleUploadedFile("setoran.csv", isi.encode()))
+
+    def test_setoran_tersimpan(self):
+        rows = self._rows(
+            'NA 1,SUKARELA,"Rp 1.250.000",,2024-01-10',
+            "NA 2,SUKARELA,150000.50,0,10-01-2024",
+        )
+        self.assertEqual(posting_setoran_massal(rows, None), (2, []))
+
+        saldo = dict(SaldoSimpanan.objects.values_list("anggota_id", "saldo"))
+        self.assertEqual(saldo, {"NA 1": Decimal("1250000"), "NA 2": Decimal("150000.50")})
+
+    def test_angka_salah_jadi_error_per_baris(self):
+        rows = self._rows(
+            "NA 1,SUKARELA,-5000,0,2024-01-10",
+            "NA 1,SUKARELA,lima ribu,0,2024-01-10",
+            "NA 2,SUKARELA,5000,-100,2024-01-10",
+            "NA 2,SUKARELA,5000,0,2024-01-10",
+        )
+        jumlah, errors = posting_setoran_massal(rows, None)
+
+        self.assertEqual(jumlah, 0)
+        self.assertEqual([baris for baris, _ in errors], [2, 3, 4])
+        self.assertFalse(Simpanan.objects.exists())
+
+
+# ======================================================
+# DANA SOSIAL WAJIB SEKALI PER BULAN
+# ======================================================
+class DanaSosialWajibTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        # id jenis WAJIB sengaja bukan 2
+        self.wajib = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.WAJIB)
+        JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.POKOK)
+        self.anggota = Anggota.objects.create(
+            nomor_anggota="NA 1", nama="Anggota 1", jenis_kelamin="Laki-laki"
+        )
+
+    def _form(self, dana_sosial=""):
+        return SimpananForm(data={
+            "anggota": self.anggota.pk,
+            "jenis_simpanan": self.wajib.pk,
+            "tanggal": "2024-01-10",
+            "jumlah": "50000",
+            "dana_sosial": dana_sosial,
+        })
+
+    def test_dana_sosial_hanya_bulan_pertama(self):
+        self.assertFalse(self._form().is_valid())
+        self.assertTrue(self._form("5000").is_valid())
+
+        Simpanan.objects.create(
+            anggota=self.anggota, jenis_simpanan=self.wajib,
+            jumlah=Decimal("50000"), dana_sosial=Decimal("5000"),
+            tanggal=datetime.date(2024, 1, 10),
+        )
+        self.assertTrue(BulanWajib.sudah_bayar(self.anggota.pk, datetime.date(2024, 1, 10)))
+        self.assertTrue(self._form().is_valid())
+
+
+# ======================================================
+# REKAP SALDO / BULAN WAJIB / DANA SOSIAL (UPSERT)
+# ======================================================
+class RekapUpsertTest(TestCase):
+    def setUp(self):
+        self.wajib = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.WAJIB)
+        self.anggota = Anggota.objects.create(
+            nomor_anggota="NA 1", nama="Anggota 1", jenis_kelamin="Laki-laki"
+        )
+
+    def _setor(self, tanggal, jumlah, dana_sosial=0):
+        Simpanan.objects.create(
+            anggota=self.anggota, jenis_simpanan=self.wajib,
+            jumlah=Decimal(jumlah), dana_sosial=Decimal(dana_sosial), tanggal=tanggal,
+        )
+
+    def test_rekap_ditambah_bukan_ditimpa(self):
+        self._setor(datetime.date(2024, 3, 5), 50000, 5000)
+        self._setor(datetime.date(2024, 1, 5), 50000, 5000)
+        self._setor(datetime.date(2024, 1, 20), 20000)
+        Penarikan.objects.create(
+            anggota=self.anggota, jenis_simpanan=self.wajib,
+            jumlah=Decimal("30000"), tanggal=datetime.date(2024, 3, 10),
+        )
+
+        saldo = SaldoSimpanan.objects.get()
+        self.assertEqual(
+            (saldo.total_setor, saldo.total_tarik, saldo.saldo),
+            (Decimal("120000"), Decimal("30000"), Decimal("90000")),
+        )
+        self.assertEqual(BulanWajib.mask(self.anggota.pk, 2024), 0b101)
+
+        self.assertEqual(
+            dict(DanaSosialBulanan.objects.values_list("periode", "total")),
+            {datetime.date(2024, 1, 1): Decimal("5000"), datetime.date(2024, 3, 1): Decimal("5000")},
+        )
+        dana = DanaSosialAnggota.objects.get()
+        # terakhir tidak mundur walau setoran lama dicatat belakangan
+        self.assertEqual(
+            (dana.total, dana.jumlah_transaksi, dana.terakhir),
+            (Decimal("10000"), 2, datetime.date(2024, 3, 5)),
+        )
+
+
+# ======================================================
+# SALDO SIMPANAN = SETOR - TARIK DI HISTORY
+# ======================================================
+class SaldoSimpananTest(TestCase):
+    def setUp(self):
+        self.wajib = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.WAJIB)
+        self.sukarela = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.SUKARELA)
+        self.anggota = Anggota.objects.create(
+            nomor_anggota="NA 1", nama="Anggota 1", jenis_kelamin="Laki-laki"
+        )
+
+    def _saldo_history(self, jenis):
+        return HistoryTabungan.objects.filter(
+            anggota=self.anggota, jenis_simpanan=jenis
+        ).aggregate(
+            saldo=Sum("jumlah", filter=Q(jenis_transaksi=HistoryTabungan.SETOR), default=0)
+            - Sum("jumlah", filter=Q(jenis_transaksi=HistoryTabungan.TARIK), default=0)
+        )["saldo"]
+
+    def test_saldo_sama_dengan_jumlah_history(self):
+        for bulan, jumlah in enumerate((50000, 75000, 20000), start=1):
+            for jenis in (self.wajib, self.sukarela):
+                Simpanan.objects.create(
+                    anggota=self.anggota, jenis_simpanan=jenis,
+                    jumlah=Decimal(jumlah), tanggal=datetime.date(2024, bulan, 10),
+                )
+        tarik_simpanan(self.anggota, self.sukarela, Decimal("60000"), datetime.date(2024, 4, 1), None)
+        tarik_simpanan(self.anggota, self.sukarela, Decimal("15000.50"), datetime.date(2024, 4, 2), None)
+
+        for jenis, harapan in ((self.wajib, Decimal("145000")), (self.sukarela, Decimal("69999.50"))):
+            with self.subTest(jenis=jenis.nama_jenis):
+                self.assertEqual(self._saldo_history(jenis), harapan)
+                with self.assertNumQueries(1):
+                    self.assertEqual(hitung_saldo(self.anggota, jenis), harapan)
+
+    def test_tarik_melebihi_saldo_tidak_mengubah_saldo(self):
+        Simpanan.objects.create(
+            anggota=self.anggota, jenis_simpanan=self.sukarela,
+            jumlah=Decimal("10000"), tanggal=datetime.date(2024, 1, 10),
+        )
+        with self.assertRaises(ValidationError):
+            tarik_simpanan(self.anggota, self.sukarela, Decimal("10000.01"), datetime.date(2024, 1, 11), None)
+
+        self.assertEqual(hitung_saldo(self.anggota, self.sukarela), Decimal("10000"))
+        self.assertEqual(self._saldo_history(self.sukarela), Decimal("10000"))
+
+
+# ======================================================
+# DAFTAR SIMPANAN: SORT + PAGINATION DI DATABASE
+# ======================================================
+class DaftarSimpananTest(TestCase):
+    def setUp(self):
+        pokok = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.POKOK)
+        sukarela = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.SUKARELA)
+        # nama urut terbalik dari nomor, supaya sort nama ≠ sort nomor
+        for i in range(1, 13):
+            anggota = Anggota.objects.create(
+                nomor_anggota=f"NA {i:02d}", nama=f"Anggota {13 - i:02d}", jenis_kelamin="Laki-laki"
+            )
+            for jenis, jumlah in ((pokok, 100000), (sukarela, 1000 * i), (sukarela, 500)):
+                Simpanan.objects.create(
+                    anggota=anggota, jenis_simpanan=jenis, jumlah=Decimal(jumlah),
+                    tanggal=datetime.date(2024, 1, 10),
+                )
+        Anggota.objects.create(
+            nomor_anggota="NA 99", nama="Anggota 00", jenis_kelamin="Laki-laki", status="nonaktif"
+        )
+        self.client.force_login(User.objects.create_user("bendahara", password="x", role="bendahara"))
+
+    def test_halaman_kedua_urut_nama(self):
+        response = self.client.get("/simpanan/", {"sort": "nama", "page": 2})
+        page = response.context["page_obj"]
+
+        # 12 anggota aktif (NA 99 nonaktif tidak ikut), 10 per halaman
+        self.assertEqual(page.paginator.count, 12)
+        self.assertEqual(
+            [(a.nama, a.nomor_anggota) for a in page],
+            [("Anggota 11", "NA 02"), ("Anggota 12", "NA 01")],
+        )
+        self.assertEqual(
+            [(a.total_pokok, a.total_sukarela, a.total_wajib) for a in page],
+            [(Decimal("100000"), Decimal("2500"), 0), (Decimal("100000"), Decimal("1500"), 0)],
+        )
+
+    def test_jumlah_query_sama_di_setiap_halaman(self):
+        # session + user + COUNT + satu query halaman, berapa pun anggotanya
+        for page in (1, 2):
+            with self.subTest(page=page), self.assertNumQueries(4):
+                self.client.get("/simpanan/", {"page": page})
+
+
+# ======================================================
+# RIWAYAT SIMPANAN: KEYSET PAGINATION (tanggal, id)
+# ======================================================
+class KeysetRiwayatTest(TestCase):
+    def setUp(self):
+        self.jenis = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.WAJIB)
+        self.anggota = Anggota.objects.create(
+            nomor_anggota="NA 1", nama="Anggota 1", jenis_kelamin="Laki-laki"
+        )
+        # beberapa transaksi di tanggal yang sama, dan id tidak urut tanggal
+        for hari in (5, 1, 5, 3, 5, 2, 1, 4, 3, 5, 2):
+            Simpanan.objects.create(
+                anggota=self.anggota, jenis_simpanan=self.jenis,
+                jumlah=Decimal("1000"), tanggal=datetime.date(2024, 1, hari),
+            )
+        self.history = HistoryTabungan.objects.filter(anggota=self.anggota, jenis_simpanan=self.jenis)
+        self.urut = list(self.history.order_by("-tanggal", "-id").values_list("id", flat=True))
+
+    def test_halaman_berurutan_tidak_tumpang_tindih_dan_tidak_melompat(self):
+        halaman, cursor = [], None
+        while True:
+            page = keyset_page(self.history, 4, sebelum=cursor)
+            halaman.append([h.id for h in page["object_list"]])
+            if not page["has_next"]:
+                break
+            cursor = page["next_cursor"]
+
+        self.assertEqual([len(h) for h in halaman], [4, 4, 3])
+        self.assertEqual([i for h in halaman for i in h], self.urut)
+
+        # kembali dari halaman terakhir memberi halaman yang sama persis
+        page = keyset_page(self.history, 4, sesudah=page["previous_cursor"])
+        self.assertEqual([h.id for h in page["object_list"]], halaman[1])
+        page = keyset_page(self.history, 4, sesudah=page["previous_cursor"])
+        self.assertEqual([h.id for h in page["object_list"]], halaman[0])
+        self.assertFalse(page["has_previous"])
+
+    def test_filter_rentang_tanggal(self):
+        self.client.force_login(User.objects.create_user("bendahara", password="x", role="bendahara"))
+        response = self.client.get(
+            f"/simpanan/detail/NA%201/{self.jenis.pk}/", {"dari": "2024-01-02", "sampai": "2024-01-03"}
+        )
+
+        tanggal = [h.tanggal.day for h in response.context["history"]]
+        self.assertEqual(tanggal, [3, 3, 2, 2])
+
+
+# ======================================================
+# RINGKASAN SIMPANAN ANGGOTA (SATU QUERY)
+# ======================================================
+class RingkasanSimpananTest(TestCase):
+    def setUp(self):
+        self.pokok = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.POKOK)
+        self.wajib = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.WAJIB)
+        self.sukarela = JenisSimpanan.objects.create(nama_jenis=JenisSimpanan.SUKARELA)
+        self.anggota, lain = [
+            Anggota.objects.create(nomor_anggota=f"NA {i}", nama=f"Anggota {i}", jenis_kelamin="Laki-laki")
+            for i in (1, 2)
+        ]
+        for anggota, jenis, jumlah, hari in (
+            (self.anggota, self.wajib, 50000, 1),
+            (self.anggota, self.sukarela, 30000, 2),
+            (self.anggota, self.wajib, 50000, 3),
+            (lain, self.pokok, 100000, 4),  # anggota lain tidak ikut dihitung
+        ):
+            Simpanan.objects.create(
+                anggota=anggota, jenis_simpanan=jenis,
+                jumlah=Decimal(jumlah), tanggal=datetime.date(2024, 1, hari),
+            )
+        tarik_simpanan(self.anggota, self.sukarela, Decimal("10000"), datetime.date(2024, 1, 5), None)
+
+    def test_saldo_dan_transaksi_terakhir_per_jenis(self):
+        terakhir = {
+            jenis.pk: HistoryTabungan.objects.filter(anggota=self.anggota, jenis_simpanan=jenis)
+            .order_by("-id").values_list("id", flat=True).first()
+            for jenis in (self.pokok, self.wajib, self.sukarela)
+        }
+
+        with self.assertNumQueries(1):
+            ringkasan = ringkasan_simpanan(self.anggota)
+
+        self.assertEqual(
+            [(r["jenis_id"], r["saldo"], r["last_id"]) for r in ringkasan],
+            [
+                (self.pokok.pk, 0, None),
+                (self.wajib.pk, Decimal("100000"), terakhir[self.wajib.pk]),
+                (self.sukarela.pk, Decimal("20000"), terakhir[self.sukarela.pk]),
+            ],
+        )
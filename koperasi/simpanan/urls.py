@@ -10,9 +10,14 @@ urlpatterns = [
 
     # TAMBAH
     path('tambah/', views.tambah_simpanan, name='simpanan_form'),
+    path('tambah/batch/', views.upload_setoran, name='upload_setoran'),
     path("cek-dana-sosial/", views.cek_dana_sosial, name="cek_dana_sosial"),
     path("autocomplete-anggota/", views.autocomplete_anggota, name="autocomplete_anggota"),
 
+    # EXPORT (sebelum <str:nomor_anggota>/ supaya tidak tertangkap)
+    path("export/", views.export_daftar_simpanan, name="export_daftar_simpanan"),
+    path("export/riwayat/", views.export_history, name="export_history"),
+
     #SIMPANAN PER ANGGOTA
     path("<str:nomor_anggota>/",views.simpanan_anggota,name="simpanan_anggota"),
 
@@ -20,7 +25,7 @@ urlpatterns = [
     path("penarikan/<str:nomor_anggota>/<int:jenis>/",views.tambah_penarikan,name="tambah_penarikan"),
 
     # DETAIL SIMPANAN PER ANGGOTA
-    # path("detail/<str:nomor_anggota>/<int:jenis_id>/",views.detail_simpanan,name="detail_simpanan"),
+    path("detail/<str:nomor_anggota>/<int:jenis_id>/",views.detail_simpanan,name="detail_simpanan"),
 
     # # EDIT
     # path('<str:kode_anggota>/edit/', views.edit_simpanan, name='edit_simpanan'),
@@ -1,17 +1,76 @@
-from django.db.models import Sum
-from .models import HistoryTabungan
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import JenisSimpanan, SaldoSimpanan
 
 def hitung_saldo(anggota, jenis_simpanan):
-    setor = HistoryTabungan.objects.filter(
+    saldo = SaldoSimpanan.objects.filter(
         anggota=anggota,
-        jenis_simpanan=jenis_simpanan,
-        jenis_transaksi="SETOR"
-    ).aggregate(total=Sum("jumlah"))["total"] or 0
+        jenis_simpanan=jenis_simpanan
+    ).values_list("saldo", flat=True).first()
 
-    tarik = HistoryTabungan.objects.filter(
-        anggota=anggota,
-        jenis_simpanan=jenis_simpanan,
-        jenis_transaksi="TARIK"
-    ).aggregate(total=Sum("jumlah"))["total"] or 0
+    return saldo or 0
+
+
+def jenis_wajib_id():
+    # id jenis WAJIB praktis tidak pernah berubah → cache lama
+    jenis_id = cache.get("simpanan:jenis_wajib_id")
+    if jenis_id is None:
+        jenis_id = JenisSimpanan.objects.filter(
+            nama_jenis=JenisSimpanan.WAJIB
+        ).values_list("id", flat=True).first()
+        if jenis_id is not None:
+            cache.set("simpanan:jenis_wajib_id", jenis_id, 60 * 60 * 24)
+    return jenis_id
+
+
+# ======================
+# Keyset pagination (tanggal, id)
+# ======================
+def encode_cursor(obj):
+    return f"{obj.tanggal:%Y-%m-%d}_{obj.pk}"
+
+
+def decode_cursor(cursor):
+    try:
+        tanggal_str, pk = cursor.split("_", 1)
+        return datetime.strptime(tanggal_str, "%Y-%m-%d").date(), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def keyset_page(queryset, per_page, sebelum=None, sesudah=None):
+    """
+    Ambil satu halaman dari queryset urut (-tanggal, -id) tanpa OFFSET.
+    `sebelum` = cursor baris terakhir halaman sekarang (halaman berikutnya),
+    `sesudah` = cursor baris pertama halaman sekarang (halaman sebelumnya).
+    """
+    posisi = decode_cursor(sesudah) if sesudah else None
+    if posisi:
+        tanggal, pk = posisi
+        rows = list(
+            queryset.filter(Q(tanggal__gt=tanggal) | Q(tanggal=tanggal, id__gt=pk))
+            .order_by("tanggal", "id")[:per_page + 1]
+        )
+        ada_lebih = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next, has_prev = True, ada_lebih
+    else:
+        posisi = decode_cursor(sebelum) if sebelum else None
+        if posisi:
+            tanggal, pk = posisi
+            queryset = queryset.filter(Q(tanggal__lt=tanggal) | Q(tanggal=tanggal, id__lt=pk))
+        rows = list(queryset.order_by("-tanggal", "-id")[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = posisi is not None
 
-    return setor - tarik
+    return {
+        "object_list": rows,
+        "has_next": has_next and bool(rows),
+        "has_previous": has_prev and bool(rows),
+        "next_cursor": encode_cursor(rows[-1]) if rows else None,
+        "previous_cursor": encode_cursor(rows[0]) if rows else None,
+    }
@@ -1,83 +1,119 @@
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import Sum, Q
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from django.utils import timezone
 from datetime import datetime
-from .utils import hitung_saldo
+from .utils import hitung_saldo, jenis_wajib_id, keyset_page
+from laporan.export import export_response, per_baris
+from anggota.search import cari_anggota, filter_anggota
 
-from .models import Penarikan, Simpanan, JenisSimpanan, HistoryTabungan, Anggota
+from .models import BulanWajib, Penarikan, Simpanan, JenisSimpanan, HistoryTabungan, Anggota
 from django.core.paginator import Paginator
-from .forms import SimpananForm, PenarikanForm
-
-
+from .forms import SimpananForm, PenarikanForm, UploadSetoranForm
+from .services import (
+    KOLOM_SETORAN,
+    baca_file_setoran,
+    posting_setoran_massal,
+    ringkasan_simpanan,
+    tarik_simpanan,
+)
+from koperasi.query_budget import query_budget
+
+
+@query_budget(6)
 @login_required
 def daftar_simpanan(request):
-    data_list = []
-
     # 🔑 AMBIL PARAM GET (KONSISTEN)
     search_query = request.GET.get('search', '')
     sort_by = request.GET.get('sort', 'nomor')
 
+    # 📄 PAGINATION (LIMIT/OFFSET di database), total per jenis ikut
+    # dianotasi di query halaman yang sama
+    paginator = Paginator(_anggota_daftar_simpanan(search_query, sort_by), 10)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    return render(request, "daftar_simpanan.html", {
+        'data': page_obj,
+        'page_obj': page_obj,
+        'search_query': search_query,
+        'sort_by': sort_by,
+    })
+
+
+def _anggota_daftar_simpanan(search_query, sort_by):
     # 🔍 BASE QUERY
     anggotas = Anggota.objects.filter(status__iexact='aktif')
 
     # 🔍 SEARCH
     if search_query:
-        anggotas = anggotas.filter(
-            Q(nama__icontains=search_query) |
-            Q(nomor_anggota__icontains=search_query)
-        )
+        anggotas = filter_anggota(anggotas, search_query)
 
-    # 🔁 LOOP DATA
-    for anggota in anggotas:
+    # 🔃 SORTING (di database)
+    anggotas = anggotas.order_by(*_urutan_simpanan(sort_by))
 
-        def get_saldo(jenis_id):
-            return (
-                Simpanan.objects.filter(
-                    anggota=anggota,
-                    jenis_simpanan_id=jenis_id
-                ).aggregate(total=Sum('jumlah'))['total'] or 0
-            )
+    return anggotas.only('nomor_anggota', 'nama').with_total_per_jenis()
 
-        total_pokok = get_saldo(1)
-        total_wajib = get_saldo(2)
-        total_sukarela = get_saldo(3)
 
-        total_dana_sosial = (
-            Simpanan.objects.filter(anggota=anggota)
-            .aggregate(total=Sum('dana_sosial'))['total'] or 0
-        )
+def _urutan_simpanan(sort_by):
+    return ['nama', 'nomor_anggota'] if sort_by == 'nama' else ['nomor_anggota']
 
-        data_list.append({
-            'nomor_anggota': anggota.nomor_anggota,
-            'nama_anggota': anggota.nama,
-            'total_pokok': total_pokok,
-            'total_wajib': total_wajib,
-            'total_sukarela': total_sukarela,
-            'total_dana_sosial': total_dana_sosial,
-        })
-
-    # 🔃 SORTING
-    if sort_by == 'nama':
-        data_list.sort(key=lambda x: x['nama_anggota'])
-    else:
-        data_list.sort(key=lambda x: x['nomor_anggota'])
 
-    # 📄 PAGINATION
-    paginator = Paginator(data_list, 10)
-    page_obj = paginator.get_page(request.GET.get('page'))
+@query_budget(6)
+@login_required
+def export_daftar_simpanan(request):
+    sort_by = request.GET.get('sort', 'nomor')
+    anggotas = _anggota_daftar_simpanan(request.GET.get('search', ''), sort_by)
 
-    return render(request, "daftar_simpanan.html", {
-        'data': page_obj,
-        'page_obj': page_obj,
-        'search_query': search_query,
-        'sort_by': sort_by,
-    })
+    def rows():
+        for a in per_baris(anggotas, _urutan_simpanan(sort_by)):
+            yield [
+                a.nomor_anggota, a.nama, a.total_pokok,
+                a.total_wajib, a.total_sukarela, a.total_dana_sosial,
+            ]
+
+    headers = [
+        "No. Anggota", "Nama", "Simpanan Pokok", "Simpanan Wajib",
+        "Simpanan Sukarela", "Dana Sosial",
+    ]
+    return export_response(request, "daftar_simpanan", headers, rows(), "Daftar Simpanan")
 
+
+@query_budget(5)
+@login_required
+def export_history(request):
+    """Riwayat transaksi simpanan, filter ?anggota= &jenis= &dari= &sampai=."""
+    history = HistoryTabungan.objects.all()
+
+    if request.GET.get("anggota"):
+        history = history.filter(anggota_id=request.GET["anggota"])
+    if request.GET.get("jenis", "").isdigit():
+        history = history.filter(jenis_simpanan_id=request.GET["jenis"])
+    for lookup, key in (("tanggal__gte", "dari"), ("tanggal__lte", "sampai")):
+        if request.GET.get(key):
+            try:
+                history = history.filter(**{lookup: datetime.strptime(request.GET[key], "%Y-%m-%d").date()})
+            except ValueError:
+                pass
+
+    rows = (
+        r[1:]
+        for r in per_baris(
+            history.values_list(
+                "id", "tanggal", "anggota_id", "anggota__nama",
+                "jenis_simpanan__nama_jenis", "jenis_transaksi", "jumlah",
+                named=True,
+            ),
+            ["tanggal", "id"],
+        )
+    )
+    headers = ["Tanggal", "No. Anggota", "Nama", "Jenis Simpanan", "Transaksi", "Jumlah"]
+    return export_response(request, "riwayat_simpanan", headers, rows, "Riwayat Simpanan")
+
+@query_budget(get=7, post=23)
 @login_required
 @transaction.atomic
 def tambah_simpanan(request):
@@ -103,6 +139,46 @@ def tambah_simpanan(request):
 
 
 
+@query_budget(get=4, post=14)
+@login_required
+def upload_setoran(request):
+    if request.user.role not in ["bendahara", "ketua"]:
+        messages.error(request, "Tidak punya akses")
+        return redirect("dashboard")
+
+    errors = []
+
+    if request.method == "POST":
+        form = UploadSetoranForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                rows = baca_file_setoran(form.cleaned_data["file"])
+            except Exception:
+                rows = None
+                messages.error(request, "File setoran tidak bisa dibaca")
+
+            if rows is not None:
+                tersimpan, errors = posting_setoran_massal(rows, request.user)
+
+                if not errors:
+                    messages.success(request, f"{tersimpan} setoran berhasil diposting")
+                    return redirect("simpanan:daftar_simpanan")
+
+                messages.error(
+                    request,
+                    f"{len(errors)} baris bermasalah, tidak ada setoran yang disimpan"
+                )
+    else:
+        form = UploadSetoranForm()
+
+    return render(request, "form/setoran_batch_form.html", {
+        "form": form,
+        "errors": errors,
+        "kolom": KOLOM_SETORAN,
+    })
+
+
+@query_budget(5)
 @login_required
 def cek_dana_sosial(request):
     anggota_id = request.GET.get('anggota')
@@ -112,51 +188,27 @@ def cek_dana_sosial(request):
     if not anggota_id or not jenis_id or not tanggal_str:
         return JsonResponse({'wajib': False})
 
-    tanggal = datetime.strptime(tanggal_str, "%Y-%m-%d").date()
+    try:
+        tanggal = datetime.strptime(tanggal_str, "%Y-%m-%d").date()
+    except ValueError:
+        return JsonResponse({'wajib': False})
+
+    # dana sosial hanya untuk simpanan wajib
+    if jenis_id != str(jenis_wajib_id()):
+        return JsonResponse({'wajib': False})
 
-    sudah_bayar = Simpanan.objects.filter(
-        anggota_id=anggota_id,
-        jenis_simpanan_id=jenis_id,
-        tanggal__month=tanggal.month,
-        tanggal__year=tanggal.year
-    ).exists()
+    sudah_bayar = BulanWajib.sudah_bayar(anggota_id, tanggal)
 
     return JsonResponse({
         'wajib': not sudah_bayar
     })
 
+@query_budget(6)
 @login_required
 def simpanan_anggota(request, nomor_anggota):
     anggota = get_object_or_404(Anggota, nomor_anggota=nomor_anggota)
 
-    data_saldo = []
-
-    for jenis in JenisSimpanan.objects.all():
-        total_setor = HistoryTabungan.objects.filter(
-            anggota=anggota,
-            jenis_simpanan=jenis,
-            jenis_transaksi='SETOR'
-        ).aggregate(total=Sum('jumlah'))['total'] or 0
-
-        total_tarik = HistoryTabungan.objects.filter(
-            anggota=anggota,
-            jenis_simpanan=jenis,
-            jenis_transaksi='TARIK'
-        ).aggregate(total=Sum('jumlah'))['total'] or 0
-
-        saldo = total_setor - total_tarik
-
-        last_transaksi = HistoryTabungan.objects.filter(
-            anggota=anggota,
-            jenis_simpanan=jenis
-        ).order_by('-id').first()
-
-        data_saldo.append({
-            'jenis': jenis.get_nama_jenis_display(),
-            'jenis_id': jenis.id,
-            'saldo': saldo,
-            'last_id': last_transaksi.id if last_transaksi else None
-        })
+    data_saldo = ringkasan_simpanan(anggota)
 
     return render(request, "simpanan_anggota.html", {
         'username': request.user.username,
@@ -165,6 +217,7 @@ def simpanan_anggota(request, nomor_anggota):
         'data_saldo': data_saldo,
     })
 
+@query_budget(8)
 @login_required
 def detail_simpanan(request, nomor_anggota, jenis_id):
     # ======================
@@ -181,38 +234,41 @@ def detail_simpanan(request, nomor_anggota, jenis_id):
     )
 
     # ======================
-    # Filter tanggal (opsional)
+    # Filter rentang tanggal (opsional)
     # ======================
-    tanggal_filter = request.GET.get("tanggal")
+    tanggal_dari = request.GET.get("dari", "")
+    tanggal_sampai = request.GET.get("sampai", "")
+
+    # kompatibel dengan filter lama ?tanggal=YYYY-MM-DD
+    if request.GET.get("tanggal"):
+        tanggal_dari = tanggal_sampai = request.GET["tanggal"]
 
     history = HistoryTabungan.objects.filter(
         anggota=anggota,
         jenis_simpanan=jenis_simpanan
     )
 
-    if tanggal_filter:
-        try:
-            tanggal = datetime.strptime(tanggal_filter, "%Y-%m-%d").date()
-            history = history.filter(tanggal=tanggal)
-        except ValueError:
-            pass
+    for lookup, value in (("tanggal__gte", tanggal_dari), ("tanggal__lte", tanggal_sampai)):
+        if value:
+            try:
+                history = history.filter(**{lookup: datetime.strptime(value, "%Y-%m-%d").date()})
+            except ValueError:
+                pass
 
     # ======================
-    # Hitung saldo
+    # Keyset pagination (tanpa OFFSET / COUNT)
     # ======================
-    total_setor = HistoryTabungan.objects.filter(
-        anggota=anggota,
-        jenis_simpanan=jenis_simpanan,
-        jenis_transaksi="SETOR"
-    ).aggregate(total=Sum("jumlah"))["total"] or 0
-
-    total_tarik = HistoryTabungan.objects.filter(
-        anggota=anggota,
-        jenis_simpanan=jenis_simpanan,
-        jenis_transaksi="TARIK"
-    ).aggregate(total=Sum("jumlah"))["total"] or 0
+    page = keyset_page(
+        history,
+        20,
+        sebelum=request.GET.get("sebelum"),
+        sesudah=request.GET.get("sesudah"),
+    )
 
-    saldo_jenis = total_setor - total_tarik
+    # ======================
+    # Saldo (dari tabel saldo_simpanan)
+    # ======================
+    saldo_jenis = hitung_saldo(anggota, jenis_simpanan)
 
     context = {
         # dibungkus supaya template kamu tetap kepakai
@@ -220,14 +276,19 @@ def detail_simpanan(request, nomor_anggota, jenis_id):
             "anggota": anggota,
             "jenis_simpanan": jenis_simpanan,
         },
-        "history": history,
+        "anggota": anggota,
+        "jenis_simpanan": jenis_simpanan,
+        "history": page["object_list"],
+        "page": page,
+        "tanggal_dari": tanggal_dari,
+        "tanggal_sampai": tanggal_sampai,
         "saldo_jenis": saldo_jenis,
     }
 
     return render(request, "detail/detail_simpanan.html", context)
 
+@query_budget(get=7, post=18)
 @login_required
-@transaction.atomic
 def tambah_penarikan(request, nomor_anggota, jenis):
 
     if request.user.role not in ["bendahara", "ketua"]:
@@ -243,23 +304,31 @@ def tambah_penarikan(request, nomor_anggota, jenis):
         form = PenarikanForm(
             request.POST,
             anggota=anggota,
-            jenis_simpanan=jenis_obj
+            jenis_simpanan=jenis_obj,
+            saldo=saldo
         )
 
         if form.is_valid():
-            penarikan = form.save(commit=False)
-            penarikan.anggota = anggota
-            penarikan.jenis_simpanan = jenis_obj
-            penarikan.admin = request.user
-            penarikan.save()
-
-            messages.success(request, "Penarikan berhasil")
-            return redirect("simpanan:simpanan_anggota", nomor_anggota)
+            # cek saldo diulang di dalam lock baris saldo anggota + jenis
+            try:
+                tarik_simpanan(
+                    anggota,
+                    jenis_obj,
+                    form.cleaned_data["jumlah"],
+                    form.cleaned_data["tanggal"],
+                    request.user
+                )
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                messages.success(request, "Penarikan berhasil")
+                return redirect("simpanan:simpanan_anggota", nomor_anggota)
 
     else:
         form = PenarikanForm(
             anggota=anggota,
-            jenis_simpanan=jenis_obj
+            jenis_simpanan=jenis_obj,
+            saldo=saldo
         )
 
     return render(request, "form/penarikan_form.html", {
@@ -268,21 +337,15 @@ def tambah_penarikan(request, nomor_anggota, jenis):
         "saldo": saldo,
     })
 
+@query_budget(5)
 @login_required
 def autocomplete_anggota(request):
-    term = request.GET.get('term', '')
-
-    anggota_list = Anggota.objects.filter(
-        nama__icontains=term,
-        status='aktif'
-    )[:10]
-
     return JsonResponse({
         "results": [
             {
-                "id": a.pk,
-                "text": f"{a.nomor_anggota} - {a.nama}"
+                "id": nomor,
+                "text": f"{nomor} - {nama}"
             }
-            for a in anggota_list
+            for nomor, nama in cari_anggota(request.GET.get('term', ''))
         ]
     })
\ No newline at end of file